@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.api_v1.endpoints import problems, submissions, users, auth, system_config, test_cases
+from app.api.api_v1.endpoints import problems, submissions, users, auth, system_config, test_cases, llm, leaderboard
 
 api_router = APIRouter()
 
@@ -9,3 +9,5 @@ api_router.include_router(problems.router, prefix="/problems", tags=["problems"]
 api_router.include_router(submissions.router, prefix="/submissions", tags=["submissions"])
 api_router.include_router(system_config.router, prefix="/system-config", tags=["system-config"])
 api_router.include_router(test_cases.router, prefix="/test-cases", tags=["test-cases"])
+api_router.include_router(llm.router, prefix="/llm", tags=["llm"])
+api_router.include_router(leaderboard.router, prefix="/leaderboard", tags=["leaderboard"])
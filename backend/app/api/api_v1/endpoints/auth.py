@@ -6,7 +6,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 from bson.objectid import ObjectId
 
 from app.db.mongodb import db
-from app.core.security import create_access_token, verify_password, get_password_hash
+from app.core.security import create_access_token, password_hasher
 from app.core.config import settings
 from app.schemas.token import Token
 from app.schemas.user import UserCreate
@@ -21,7 +21,7 @@ async def login_access_token(form_data: OAuth2PasswordRequestForm = Depends()) -
     users_collection = db.db.users
     user = await users_collection.find_one({"username": form_data.username})
     
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    if not user or not await password_hasher.verify(form_data.password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -69,7 +69,7 @@ async def create_user_signup(user_in: UserCreate) -> Any:
         )
     
     user_data = user_in.dict(exclude={"password"})
-    user_data["hashed_password"] = get_password_hash(user_in.password)
+    user_data["hashed_password"] = await password_hasher.hash(user_in.password)
     
     # Add timestamps
     current_time = datetime.utcnow()
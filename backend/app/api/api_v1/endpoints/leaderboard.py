@@ -0,0 +1,65 @@
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+
+from app.db.leaderboard import leaderboard, GLOBAL_SCOPE, tag_scope
+from app.db.pagination import set_next_cursor
+from app.api.deps import get_current_active_user, get_current_admin_user
+from app.schemas.leaderboard import LeaderboardEntry, LeaderboardRebuildResult
+from app.core.config import settings
+
+router = APIRouter()
+
+def _scope(tag: Optional[str]) -> str:
+    return tag_scope(tag) if tag else GLOBAL_SCOPE
+
+@router.get("/", response_model=List[LeaderboardEntry])
+async def read_leaderboard(
+    response: Response,
+    limit: int = Query(50, ge=1),
+    cursor: Optional[str] = None,
+    tag: Optional[str] = None,
+    current_user = Depends(get_current_active_user)
+) -> Any:
+    """
+    Retrieve the ranking of users by solved problems, globally or for one tag.
+    
+    Users with the same number of solved problems share a rank. The
+    X-Next-Cursor response header holds the cursor of the next page and
+    X-Total-Count the number of ranked users. Results may lag behind new
+    accepted submissions by up to LEADERBOARD_CACHE_TTL seconds.
+    """
+    if limit > settings.LEADERBOARD_MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"limit must not exceed {settings.LEADERBOARD_MAX_PAGE_SIZE}"
+        )
+    
+    page = await leaderboard.get_page(_scope(tag), limit, cursor)
+    
+    response.headers["X-Total-Count"] = str(page["total"])
+    set_next_cursor(response, page["next_cursor"])
+    return page["entries"]
+
+@router.get("/me", response_model=LeaderboardEntry)
+async def read_leaderboard_me(
+    tag: Optional[str] = None,
+    current_user = Depends(get_current_active_user)
+) -> Any:
+    """
+    Get the current user's rank, globally or for one tag.
+    """
+    entry = await leaderboard.get_user_entry(_scope(tag), current_user["id"])
+    if entry is None:
+        # 还没有通过任何题目，不参与排名
+        return {"user_id": current_user["id"], "username": current_user.get("username")}
+    return entry
+
+@router.post("/rebuild", response_model=LeaderboardRebuildResult)
+async def rebuild_leaderboard(current_user = Depends(get_current_admin_user)) -> Any:
+    """
+    Recompute all rankings from the users' solved problems. Only admin users can access this endpoint.
+    
+    Needed once for data from before the leaderboard existed, and to apply
+    edited problem tags to earlier solves.
+    """
+    return await leaderboard.rebuild()
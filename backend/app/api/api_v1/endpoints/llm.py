@@ -0,0 +1,28 @@
+from typing import Any, Dict
+from fastapi import APIRouter, Depends
+
+from app.api.deps import get_current_admin_user
+from app.judge.llm_evaluator import evaluation_cache, similarity_index, llm_scheduler, llm_router, llm_replay
+from app.judge.llm_queue import llm_evaluation_queue
+from app.judge.llm_policy import evaluation_policy
+from app.judge.llm_stream import llm_stream_broker
+
+router = APIRouter()
+
+@router.get("/stats")
+async def read_llm_stats(
+    current_user = Depends(get_current_admin_user)
+) -> Dict[str, Any]:
+    """
+    Get LLM evaluation pipeline statistics (policy, queue, cache, near-duplicate reuse, scheduler, endpoints, streams, replay). Only admin users can access this endpoint.
+    """
+    return {
+        "policy": evaluation_policy.stats(),
+        "queue": llm_evaluation_queue.stats(),
+        "cache": evaluation_cache.stats(),
+        "similarity": similarity_index.stats(),
+        "scheduler": llm_scheduler.stats(),
+        "endpoints": llm_router.stats(),
+        "streams": llm_stream_broker.stats(),
+        "replay": llm_replay.stats()
+    }
@@ -1,14 +1,38 @@
+import json
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
 from bson.objectid import ObjectId
 from datetime import datetime
 
 from app.db.mongodb import db
+from app.db.problem_cache import problem_cache, problem_visible_to
+from app.db.pagination import PROBLEM_SORT, fetch_page, set_next_cursor
 from app.api.deps import get_current_active_user, get_current_admin_user
-from app.schemas.problem import Problem, ProblemCreate, ProblemUpdate
+from app.schemas.problem import Problem, ProblemCreate, ProblemUpdate, ProblemSummary
 
 router = APIRouter()
 
+# 列表只读取ProblemSummary需要的字段，题目描述、测试数据和特判代码只在详情接口返回
+PROBLEM_SUMMARY_PROJECTION = {
+    "custom_id": 1,
+    "title": 1,
+    "difficulty": 1,
+    "tags": 1,
+    "is_public": 1,
+    "submission_count": 1,
+    "accepted_count": 1
+}
+
+# 面向用户的接口从不读取隐藏的测试数据和特判代码，管理员通过 /{problem_id}/test-data 获取
+PROBLEM_DETAIL_PROJECTION = {
+    "test_cases": 0,
+    "special_judge_code": 0
+}
+
+# 流式返回测试数据时每批从数据库读取的测试用例数
+TEST_DATA_BATCH_SIZE = 16
+
 @router.post("/", response_model=Problem)
 async def create_problem(
     problem_in: ProblemCreate,
@@ -20,7 +44,7 @@ async def create_problem(
     problems_collection = db.db.problems
     
     # 检查自定义ID是否已存在
-    existing_problem = await problems_collection.find_one({"custom_id": problem_in.custom_id})
+    existing_problem = await problems_collection.find_one({"custom_id": problem_in.custom_id}, {"_id": 1})
     if existing_problem:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -36,7 +60,7 @@ async def create_problem(
     
     result = await problems_collection.insert_one(problem_dict)
     
-    created_problem = await problems_collection.find_one({"_id": result.inserted_id})
+    created_problem = await problems_collection.find_one({"_id": result.inserted_id}, PROBLEM_DETAIL_PROJECTION)
     created_problem["id"] = str(created_problem.pop("_id"))
     
     return created_problem
@@ -52,7 +76,7 @@ async def update_problem(
     """
     problems_collection = db.db.problems
     
-    problem = await problems_collection.find_one({"_id": ObjectId(problem_id)})
+    problem = await problems_collection.find_one({"_id": ObjectId(problem_id)}, {"_id": 1})
     if not problem:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -67,7 +91,7 @@ async def update_problem(
         existing = await problems_collection.find_one({
             "custom_id": update_data["custom_id"],
             "_id": {"$ne": ObjectId(problem_id)}
-        })
+        }, {"_id": 1})
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -90,7 +114,9 @@ async def update_problem(
         {"$set": update_data}
     )
     
-    updated_problem = await problems_collection.find_one({"_id": ObjectId(problem_id)})
+    problem_cache.invalidate(problem_id)
+    
+    updated_problem = await problems_collection.find_one({"_id": ObjectId(problem_id)}, PROBLEM_DETAIL_PROJECTION)
     updated_problem["id"] = str(updated_problem.pop("_id"))
     
     return updated_problem
@@ -102,31 +128,20 @@ async def read_problem(
 ) -> Any:
     """
     Get a specific problem by id or custom_id.
-    """
-    problems_collection = db.db.problems
     
-    # 尝试先使用自定义ID查询
-    problem = await problems_collection.find_one({
-        "custom_id": problem_id,
-        "$or": [
-            {"is_public": True},
-            {"author_id": current_user["id"]}
-        ]
-    })
+    Hidden test cases and the special judge code are not returned; admins
+    load them through GET /problems/{problem_id}/test-data.
+    """
+    # 处理自定义ID和系统ID；按系统ID读取时直接命中缓存，不再先查询自定义ID。
+    # 24位十六进制的自定义ID也是合法的系统ID，按系统ID找不到时再按自定义ID查询
+    problem = None
+    if ObjectId.is_valid(problem_id):
+        problem = await problem_cache.get(problem_id)
+    if problem is None:
+        problem = await problem_cache.get_by_custom_id(problem_id)
     
-    # 如果没有找到，尝试使用系统内部ID查询
-    if not problem:
-        try:
-            problem = await problems_collection.find_one({
-                "_id": ObjectId(problem_id),
-                "$or": [
-                    {"is_public": True},
-                    {"author_id": current_user["id"]}
-                ]
-            })
-        except:
-            # 如果传入的ID不是一个有效的ObjectId
-            pass
+    if problem and not problem_visible_to(problem, current_user["id"]):
+        problem = None
     
     if not problem:
         raise HTTPException(
@@ -137,16 +152,73 @@ async def read_problem(
     problem["id"] = str(problem.pop("_id"))
     return problem
 
-@router.get("/", response_model=List[Problem])
+@router.get("/{problem_id}/test-data")
+async def read_problem_test_data(
+    problem_id: str,
+    current_user = Depends(get_current_admin_user)
+) -> Any:
+    """
+    Get the test cases and special judge code of a problem. Only admin users can access this endpoint.
+    
+    The response is a JSON object streamed one batch of test cases at a time,
+    so large test data is never held in memory as a whole.
+    """
+    problems_collection = db.db.problems
+    
+    if not ObjectId.is_valid(problem_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Problem not found"
+        )
+    
+    problem = await problems_collection.find_one(
+        {"_id": ObjectId(problem_id)},
+        {"has_special_judge": 1, "special_judge_code": 1}
+    )
+    if not problem:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Problem not found"
+        )
+    
+    async def test_data_stream():
+        header = {
+            "id": problem_id,
+            "has_special_judge": problem.get("has_special_judge", False),
+            "special_judge_code": problem.get("special_judge_code")
+        }
+        yield json.dumps(header, ensure_ascii=False)[:-1] + ', "test_cases": ['
+        
+        # 展开测试用例数组，游标每次只取一批
+        cursor = problems_collection.aggregate([
+            {"$match": {"_id": ObjectId(problem_id)}},
+            {"$unwind": "$test_cases"},
+            {"$replaceRoot": {"newRoot": "$test_cases"}}
+        ], batchSize=TEST_DATA_BATCH_SIZE)
+        
+        separator = ""
+        async for test_case in cursor:
+            yield separator + json.dumps(test_case, ensure_ascii=False, default=str)
+            separator = ", "
+        yield "]}"
+    
+    return StreamingResponse(test_data_stream(), media_type="application/json")
+
+@router.get("/", response_model=List[ProblemSummary])
 async def read_problems(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     difficulty: Optional[str] = None,
     tags: Optional[List[str]] = Query(None),
     current_user = Depends(get_current_active_user)
 ) -> Any:
     """
-    Retrieve problems with optional filtering.
+    Retrieve problem summaries with optional filtering.
+    
+    Use GET /problems/{problem_id} for the full problem. The X-Next-Cursor
+    response header holds the cursor of the next page.
     """
     problems_collection = db.db.problems
     
@@ -160,8 +232,11 @@ async def read_problems(
         query["tags"] = {"$all": tags}
     
     # Execute query
-    cursor = problems_collection.find(query).skip(skip).limit(limit)
-    problems = await cursor.to_list(length=limit)
+    problems, next_cursor = await fetch_page(
+        problems_collection, query, PROBLEM_SORT, limit,
+        cursor=cursor, skip=skip, projection=PROBLEM_SUMMARY_PROJECTION
+    )
+    set_next_cursor(response, next_cursor)
     
     # Convert MongoDB _id to string
     for problem in problems:
@@ -179,7 +254,7 @@ async def delete_problem(
     """
     problems_collection = db.db.problems
     
-    problem = await problems_collection.find_one({"_id": ObjectId(problem_id)})
+    problem = await problems_collection.find_one({"_id": ObjectId(problem_id)}, {"_id": 1})
     if not problem:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -187,3 +262,4 @@ async def delete_problem(
         )
     
     await problems_collection.delete_one({"_id": ObjectId(problem_id)})
+    problem_cache.invalidate(problem_id)
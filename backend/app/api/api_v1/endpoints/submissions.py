@@ -1,16 +1,37 @@
+import json
+import asyncio
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Response
+from fastapi.responses import StreamingResponse
 from bson.objectid import ObjectId
 from datetime import datetime
 
 from app.db.mongodb import db
+from app.db.problem_cache import problem_cache, problem_visible_to
+from app.db.pagination import SUBMISSION_SORT, fetch_page, set_next_cursor
 from app.api.deps import get_current_active_user, get_current_admin_user
 from app.schemas.submission import Submission, SubmissionCreate, SubmissionList
-from app.models.submission import JudgeStatus
+from app.core.config import settings
+from app.models.submission import JudgeStatus, LLMEvaluationStatus
 from app.judge.judge_service import judge_submission
+from app.judge.llm_stream import llm_stream_broker, EVALUATION_IN_PROGRESS_STATUSES
+from app.judge.llm_queue import llm_evaluation_queue
+from app.judge.llm_policy import evaluation_policy
+from app.judge.submission_events import submission_event_broker, is_final_status
 
 router = APIRouter()
 
+# 列表只读取SubmissionList需要的字段，代码、测试点结果和LLM评估只在详情接口返回
+SUBMISSION_LIST_PROJECTION = {
+    "problem_id": 1,
+    "user_id": 1,
+    "language": 1,
+    "submitted_at": 1,
+    "status": 1,
+    "time_used": 1,
+    "memory_used": 1
+}
+
 @router.post("/", response_model=Submission)
 async def create_submission(
     submission_in: SubmissionCreate,
@@ -23,29 +44,13 @@ async def create_submission(
     submissions_collection = db.db.submissions
     problems_collection = db.db.problems
     
-    # 处理自定义ID和系统ID
-    query = {}
-    try:
-        # 尝试作为ObjectId处理
-        if ObjectId.is_valid(submission_in.problem_id):
-            query["_id"] = ObjectId(submission_in.problem_id)
-        else:
-            # 尝试作为自定义ID处理
-            query["custom_id"] = submission_in.problem_id
-    except Exception:
-        # 作为自定义ID处理
-        query["custom_id"] = submission_in.problem_id
-            
-    # 添加权限过滤
-    query["$or"] = [
-        {"is_public": True},
-        {"author_id": current_user["id"]}
-    ]
-    
-    # 查询问题
-    problem = await problems_collection.find_one(query)
-    
-    if not problem:
+    # 处理自定义ID和系统ID；题目信息来自缓存，不读取测试数据
+    if ObjectId.is_valid(submission_in.problem_id):
+        problem = await problem_cache.get(submission_in.problem_id)
+    else:
+        problem = await problem_cache.get_by_custom_id(submission_in.problem_id)
+    
+    if not problem or not problem_visible_to(problem, current_user["id"]):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Problem not found or access denied"
@@ -110,17 +115,193 @@ async def read_submission(
     submission["id"] = str(submission.pop("_id"))
     return submission
 
+@router.post("/{submission_id}/llm-evaluation")
+async def request_llm_evaluation(
+    submission_id: str,
+    current_user = Depends(get_current_active_user)
+) -> Any:
+    """
+    Start the LLM evaluation of a submission deferred by the evaluation policy.
+    
+    Called when the submission is first viewed. Idempotent: submissions already
+    queued or evaluated just report their status. Skipped submissions can only
+    be evaluated on request of an admin.
+    """
+    submissions_collection = db.db.submissions
+    is_admin = current_user.get("role") == "admin"
+    
+    query = {"_id": ObjectId(submission_id)}
+    if not is_admin:
+        query["user_id"] = current_user["id"]
+    
+    submission = await submissions_collection.find_one(query, {"llm_evaluation_status": 1, "user_id": 1})
+    
+    if not submission:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Submission not found or access denied"
+        )
+    
+    current_status = submission.get("llm_evaluation_status")
+    if current_status == LLMEvaluationStatus.SKIPPED and not is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="AI evaluation is disabled for this submission"
+        )
+    if current_status not in (LLMEvaluationStatus.ON_DEMAND, LLMEvaluationStatus.SKIPPED):
+        return {"llm_evaluation_status": current_status}
+    
+    if not is_admin and await evaluation_policy.quota_exceeded(submission["user_id"]):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Daily AI evaluation quota exceeded"
+        )
+    
+    # 条件更新保证同时打开的多个页面只触发一次评估
+    claimed = await submissions_collection.update_one(
+        {"_id": ObjectId(submission_id), "llm_evaluation_status": current_status},
+        {"$set": {"llm_evaluation_status": LLMEvaluationStatus.PENDING}}
+    )
+    if claimed.modified_count:
+        await llm_evaluation_queue.enqueue(submission_id)
+    
+    submission = await submissions_collection.find_one({"_id": ObjectId(submission_id)}, {"llm_evaluation_status": 1})
+    return {"llm_evaluation_status": submission.get("llm_evaluation_status")}
+
+def _sse_event(event: str, data: Any) -> str:
+    """Format a server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+@router.get("/{submission_id}/llm-stream")
+async def stream_llm_evaluation(
+    submission_id: str,
+    current_user = Depends(get_current_active_user)
+) -> Any:
+    """
+    Stream the LLM evaluation of a submission as server-sent events.
+    
+    Events: "step" when an LLM call starts (clients discard text of that step
+    received before), "token" with generated text, "section" with a parsed
+    part of the evaluation, and "result" with the final stored evaluation,
+    after which the stream ends.
+    """
+    submissions_collection = db.db.submissions
+    
+    query = {"_id": ObjectId(submission_id)}
+    if current_user.get("role") != "admin":
+        query["user_id"] = current_user["id"]
+    
+    projection = {"llm_evaluation_status": 1, "llm_evaluation": 1}
+    submission = await submissions_collection.find_one(query, projection)
+    
+    if not submission:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Submission not found or access denied"
+        )
+    
+    async def event_stream():
+        if submission.get("llm_evaluation_status") not in EVALUATION_IN_PROGRESS_STATUSES:
+            yield _sse_event("result", {
+                "llm_evaluation_status": submission.get("llm_evaluation_status"),
+                "llm_evaluation": submission.get("llm_evaluation")
+            })
+            return
+        
+        # 评估在其他工作进程中完成时，由每个提交共享的轮询任务发送数据库中的结果
+        queue = llm_stream_broker.subscribe(submission_id)
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=settings.LLM_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                yield _sse_event(event, data)
+                if event == "result":
+                    return
+        finally:
+            llm_stream_broker.unsubscribe(submission_id, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/{submission_id}/events")
+async def stream_submission_events(
+    submission_id: str,
+    current_user = Depends(get_current_active_user)
+) -> Any:
+    """
+    Stream the status of a submission as server-sent events.
+    
+    A "status" event with the status (and, once judged, time_used,
+    memory_used and error_message) is sent right away and on every change,
+    and a "progress" event with the completed and total test counts after
+    each test case. The stream ends after the verdict; fetch the submission
+    then for the per-test results.
+    """
+    submissions_collection = db.db.submissions
+    
+    query = {"_id": ObjectId(submission_id)}
+    if current_user.get("role") != "admin":
+        query["user_id"] = current_user["id"]
+    
+    submission = await submissions_collection.find_one(query, {"_id": 1})
+    
+    if not submission:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Submission not found or access denied"
+        )
+    
+    async def event_stream():
+        # 事件来自代理：本进程评测时实时发布，否则由代理为所有订阅者共同轮询数据库
+        queue = submission_event_broker.subscribe(submission_id)
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=settings.LLM_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # 保持连接
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                yield _sse_event(event, data)
+                if event == "status" and is_final_status(data.get("status")):
+                    break
+        finally:
+            submission_event_broker.unsubscribe(submission_id, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/", response_model=List[SubmissionList])
 async def read_submissions(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     problem_id: Optional[str] = None,
     user_id: Optional[str] = None,
     status: Optional[str] = None,
     current_user = Depends(get_current_active_user)
 ) -> Any:
     """
-    Retrieve submissions with optional filtering.
+    Retrieve submission summaries with optional filtering, newest first.
+    
+    Use GET /submissions/{submission_id} for the code, per-test results and
+    the LLM evaluation.
+    
+    Pages are linked by continuation tokens: the X-Next-Cursor response
+    header holds the cursor of the next page and is absent on the last page.
+    skip is still accepted for the first request but gets slower on deep pages.
     """
     submissions_collection = db.db.submissions
     
@@ -144,7 +325,7 @@ async def read_submissions(
             else:
                 # 如果不是有效的ObjectId，则可能是自定义ID
                 problems_collection = db.db.problems
-                problem = await problems_collection.find_one({"custom_id": problem_id})
+                problem = await problems_collection.find_one({"custom_id": problem_id}, {"_id": 1})
                 if problem:
                     query["problem_id"] = str(problem["_id"])
                 else:
@@ -158,8 +339,11 @@ async def read_submissions(
         query["status"] = status
     
     # Execute query
-    cursor = submissions_collection.find(query).sort("submitted_at", -1).skip(skip).limit(limit)
-    submissions = await cursor.to_list(length=limit)
+    submissions, next_cursor = await fetch_page(
+        submissions_collection, query, SUBMISSION_SORT, limit,
+        cursor=cursor, skip=skip, projection=SUBMISSION_LIST_PROJECTION
+    )
+    set_next_cursor(response, next_cursor)
     
     # Convert MongoDB _id to string
     for submission in submissions:
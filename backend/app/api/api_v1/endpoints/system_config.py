@@ -1,11 +1,15 @@
-from typing import Any
+from typing import Any, Dict
 from fastapi import APIRouter, Depends, HTTPException, status
 from datetime import datetime
 from bson.objectid import ObjectId
 
 from app.db.mongodb import db
+from app.db.indexes import explain_query_shapes
 from app.api.deps import get_current_admin_user
+from app.core.security import password_hasher
 from app.schemas.system_config import SystemConfig, SystemConfigUpdate
+from app.judge.config_reload import system_config_reloader
+from app.judge.llm_policy import EvaluationPolicy
 
 router = APIRouter()
 
@@ -48,8 +52,11 @@ async def update_system_config(
     """
     configs_collection = db.db.system_configs
     
-    # 将输入数据转换为字典，排除空值
-    update_data = {k: v for k, v in config_in.dict(exclude_unset=True).items() if v is not None}
+    # 将输入数据转换为字典，排除空值；评估策略字段为null时保存null，恢复环境变量中的默认值
+    update_data = {
+        k: v for k, v in config_in.dict(exclude_unset=True).items()
+        if v is not None or k in EvaluationPolicy.CONFIG_FIELDS
+    }
     
     if not update_data:
         raise HTTPException(
@@ -69,21 +76,49 @@ async def update_system_config(
             "_id": CONFIG_ID,
             "allow_signup": True,
             "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
+            "updated_at": datetime.utcnow(),
+            "revision": 1
         }
         # 更新默认配置
         default_config.update(update_data)
         await configs_collection.insert_one(default_config)
         config = default_config
     else:
-        # 更新现有配置
+        # 更新现有配置，递增版本号使其他进程重新加载
         await configs_collection.update_one(
             {"_id": CONFIG_ID},
-            {"$set": update_data}
+            {"$set": update_data, "$inc": {"revision": 1}}
         )
         config = await configs_collection.find_one({"_id": CONFIG_ID})
     
+    # 热更新LLM配置，共享的评估器会在下次调用时使用新配置；
+    # 其他工作进程在SYSTEM_CONFIG_RELOAD_INTERVAL秒内检测到新版本后重新加载
+    system_config_reloader.apply(config)
+    
     # 将_id转换为id以符合Schema
     config["id"] = config.pop("_id")
     
     return config
+
+@router.get("/query-plans")
+async def read_query_plans(
+    current_user = Depends(get_current_admin_user)
+) -> Dict[str, Any]:
+    """
+    检查各接口查询的执行计划，标记全表扫描和内存排序（仅管理员可用）
+    """
+    plans = await explain_query_shapes()
+    return {
+        "collection_scans": [plan["name"] for plan in plans if plan["collection_scan"]],
+        "in_memory_sorts": [plan["name"] for plan in plans if plan["in_memory_sort"]],
+        "plans": plans
+    }
+
+@router.get("/password-hashing")
+async def read_password_hashing_stats(
+    current_user = Depends(get_current_admin_user)
+) -> Dict[str, Any]:
+    """
+    查看密码哈希线程池的排队情况（仅管理员可用）
+    """
+    return password_hasher.stats()
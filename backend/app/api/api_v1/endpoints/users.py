@@ -1,19 +1,41 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+import io
+import csv
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Response, File, UploadFile
 from bson.objectid import ObjectId
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
 
 from app.db.mongodb import db
+from app.db.user_cache import user_cache
+from app.db.pagination import USER_SORT, fetch_page, set_next_cursor
 from app.api.deps import get_current_active_user, get_current_admin_user
-from app.schemas.user import User, UserCreate, UserUpdate
+from app.schemas.user import User, UserCreate, UserUpdate, UserImportError, UserImportResult
+from app.core.config import settings
+from app.core.security import password_hasher
 
 router = APIRouter()
 
+# 唯一索引冲突的错误码
+DUPLICATE_KEY_ERROR = 11000
+
 @router.get("/me", response_model=User)
 async def read_user_me(current_user = Depends(get_current_active_user)) -> Any:
     """
     Get current user.
     """
-    return current_user
+    # current_user只有鉴权字段，这里读取完整的用户信息
+    user = await db.db.users.find_one({"_id": ObjectId(current_user["id"])}, {"hashed_password": 0})
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    user["id"] = str(user["_id"])
+    return user
 
 @router.put("/me", response_model=User)
 async def update_user_me(
@@ -29,13 +51,14 @@ async def update_user_me(
     update_data = user_in.dict(exclude_unset=True)
     
     if "password" in update_data:
-        from app.core.security import get_password_hash
-        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+        from app.core.security import password_hasher
+        update_data["hashed_password"] = await password_hasher.hash(update_data.pop("password"))
     
     await users_collection.update_one(
         {"_id": user_id},
         {"$set": update_data}
     )
+    user_cache.invalidate(current_user["id"])
     
     updated_user = await users_collection.find_one({"_id": user_id})
     updated_user["id"] = str(updated_user["_id"])
@@ -62,22 +85,23 @@ async def read_user_by_id(
 
 @router.get("/", response_model=List[User])
 async def read_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_admin_user)
 ) -> Any:
     """
     Retrieve users. Only admin users can access this endpoint.
-    """
-    from fastapi import Response
     
+    The X-Next-Cursor response header holds the cursor of the next page.
+    """
     users_collection = db.db.users
     
     # 获取用户总数
     total_count = await users_collection.count_documents({})
     
-    cursor = users_collection.find().skip(skip).limit(limit)
-    users = await cursor.to_list(length=limit)
+    users, next_cursor = await fetch_page(users_collection, {}, USER_SORT, limit, cursor=cursor, skip=skip)
     
     # Convert MongoDB _id to string
     for user in users:
@@ -85,6 +109,140 @@ async def read_users(
         del user["_id"]  # 删除_id字段，因为已经复制到id字段
     
     # 设置响应头并返回用户列表
-    response = Response()
     response.headers["X-Total-Count"] = str(total_count)
+    set_next_cursor(response, next_cursor)
     return users
+
+@router.post("/import", response_model=UserImportResult)
+async def import_users(
+    file: UploadFile = File(...),
+    current_user = Depends(get_current_admin_user)
+) -> Any:
+    """
+    Create users in bulk from a CSV or JSON file. Only admin users can access this endpoint.
+    
+    A CSV file has a header row with the columns username, email, password and
+    optionally full_name, role and is_active. A JSON file holds a list of
+    objects with the same fields. Valid rows are created even if other rows
+    fail; every failed row is reported with its error.
+    """
+    users_collection = db.db.users
+    
+    try:
+        rows = _parse_import_file(file.filename or "", await file.read())
+    except (ValueError, csv.Error) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not read the import file: {e}"
+        )
+    
+    if len(rows) > settings.USER_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many users, at most {settings.USER_IMPORT_MAX_ROWS} can be imported at once"
+        )
+    
+    errors: List[UserImportError] = []
+    valid = []
+    seen_usernames, seen_emails = set(), set()
+    
+    # 校验每一行，以及文件内部的重复
+    for row_number, row in enumerate(rows, start=1):
+        username = row.get("username") if isinstance(row.get("username"), str) else None
+        try:
+            user_in = UserCreate(**row)
+        except ValidationError as e:
+            message = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            )
+            errors.append(UserImportError(row=row_number, username=username, error=message))
+            continue
+        
+        if user_in.username in seen_usernames:
+            errors.append(UserImportError(row=row_number, username=username, error="Duplicate username in file"))
+            continue
+        if user_in.email in seen_emails:
+            errors.append(UserImportError(row=row_number, username=username, error="Duplicate email in file"))
+            continue
+        seen_usernames.add(user_in.username)
+        seen_emails.add(user_in.email)
+        valid.append((row_number, user_in))
+    
+    # 一次查询找出已注册的用户名和邮箱
+    taken_usernames, taken_emails = set(), set()
+    if valid:
+        cursor = users_collection.find(
+            {"$or": [
+                {"username": {"$in": [user_in.username for _, user_in in valid]}},
+                {"email": {"$in": [user_in.email for _, user_in in valid]}}
+            ]},
+            {"username": 1, "email": 1}
+        )
+        async for existing in cursor:
+            taken_usernames.add(existing.get("username"))
+            taken_emails.add(existing.get("email"))
+    
+    accepted = []
+    for row_number, user_in in valid:
+        if user_in.username in taken_usernames:
+            errors.append(UserImportError(row=row_number, username=user_in.username, error="Username already registered"))
+        elif user_in.email in taken_emails:
+            errors.append(UserImportError(row=row_number, username=user_in.username, error="Email already registered"))
+        else:
+            accepted.append((row_number, user_in))
+    
+    created = 0
+    if accepted:
+        hashed_passwords = await password_hasher.hash_many([user_in.password for _, user_in in accepted])
+        
+        current_time = datetime.utcnow()
+        documents = []
+        for (_, user_in), hashed_password in zip(accepted, hashed_passwords):
+            user_data = user_in.dict(exclude={"password"})
+            user_data["hashed_password"] = hashed_password
+            user_data["created_at"] = current_time
+            user_data["updated_at"] = current_time
+            user_data["solved_problems"] = []
+            documents.append(user_data)
+        
+        # 无序插入：一行失败（例如并发注册了同名用户）不影响其他行
+        try:
+            result = await users_collection.insert_many(documents, ordered=False)
+            created = len(result.inserted_ids)
+        except BulkWriteError as e:
+            created = e.details.get("nInserted", 0)
+            for write_error in e.details.get("writeErrors", []):
+                row_number, user_in = accepted[write_error["index"]]
+                if write_error.get("code") == DUPLICATE_KEY_ERROR:
+                    message = "Username or email already registered"
+                else:
+                    message = write_error.get("errmsg", "Insert failed")
+                errors.append(UserImportError(row=row_number, username=user_in.username, error=message))
+    
+    errors.sort(key=lambda error: error.row)
+    return {"total": len(rows), "created": created, "errors": errors}
+
+def _parse_import_file(filename: str, content: bytes) -> List[Dict[str, Any]]:
+    """
+    解析上传的CSV或JSON文件，返回每一行的字段
+    """
+    # utf-8-sig兼容Excel导出的带BOM文件
+    text = content.decode("utf-8-sig")
+    extension = filename.rsplit(".", 1)[-1].lower()
+    
+    if extension == "json":
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("users")
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise ValueError("expected a list of user objects")
+        return data
+    
+    if extension == "csv":
+        # 空单元格视为未填写，使用默认值
+        return [
+            {key.strip(): value.strip() for key, value in row.items() if key and isinstance(value, str) and value.strip()}
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+    
+    raise ValueError("upload a .csv or .json file")
@@ -1,11 +1,10 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from bson.objectid import ObjectId
 from typing import Generator, Optional
 
 from app.core.config import settings
-from app.db.mongodb import db
+from app.db.user_cache import user_cache
 from app.schemas.token import TokenPayload
 from app.models.user import UserRole
 
@@ -31,18 +30,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
     
-    users_collection = db.db.users
-    user = await users_collection.find_one({"_id": ObjectId(token_data.sub)})
+    # 只包含鉴权所需字段（id、username、role、is_active），完整文档见 GET /users/me
+    user = await user_cache.get(token_data.sub)
     
     if user is None:
         raise credentials_exception
     
-    # 创建一个新的字典，确保不修改原始用户文档
-    user_data = dict(user)
-    # 始终确保id字段存在并正确设置（即使它已经存在）
-    user_data["id"] = str(user_data["_id"])
-    
-    return user_data
+    return user
 
 async def get_current_active_user(current_user = Depends(get_current_user)):
     """
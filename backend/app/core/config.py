@@ -9,6 +9,13 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
+    # bcrypt runs in a thread pool so it does not block the event loop
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))  # concurrent hash operations
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 256))  # waiting operations before 503, 0 = unlimited
+    
+    # Admin bulk user import
+    USER_IMPORT_MAX_ROWS: int = int(os.getenv("USER_IMPORT_MAX_ROWS", 5000))
+    USER_IMPORT_HASH_PROCESSES: int = int(os.getenv("USER_IMPORT_HASH_PROCESSES", os.cpu_count() or 1))  # processes hashing passwords
     
     # MongoDB settings
     MONGO_HOST: str = os.getenv("MONGO_HOST", "localhost")
@@ -44,6 +51,11 @@ class Settings(BaseSettings):
     # Judge settings
     JUDGE_TIMEOUT: int = 10  # seconds
     JUDGE_MEMORY_LIMIT: int = 512  # MB
+    # Per-test progress is pushed to watchers immediately but written to MongoDB at most once per interval
+    JUDGE_PROGRESS_WRITE_INTERVAL: float = float(os.getenv("JUDGE_PROGRESS_WRITE_INTERVAL", 1.0))  # seconds
+    # Watchers of a submission judged by another worker share one database read per interval
+    SUBMISSION_EVENTS_POLL_INTERVAL: float = float(os.getenv("SUBMISSION_EVENTS_POLL_INTERVAL", 2.0))  # seconds
+    SUBMISSION_EVENTS_QUEUE_SIZE: int = int(os.getenv("SUBMISSION_EVENTS_QUEUE_SIZE", 64))  # events buffered per watcher
     
     # Storage paths
     PROBLEMS_DIR: Path = Path("/root/online-judge/problems")
@@ -52,6 +64,90 @@ class Settings(BaseSettings):
     # LLM Integration
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY", "")
     OPENAI_API_BASE: Optional[str] = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+    # JSON list of OpenAI-compatible endpoints, see app/judge/llm_evaluator/router.py; empty = OPENAI_API_BASE only
+    LLM_ENDPOINTS: str = os.getenv("LLM_ENDPOINTS", "")
+    
+    # LLM evaluation queue
+    LLM_EVALUATION_WORKERS: int = int(os.getenv("LLM_EVALUATION_WORKERS", 2))  # concurrent evaluations
+    LLM_EVALUATION_QUEUE_SIZE: int = int(os.getenv("LLM_EVALUATION_QUEUE_SIZE", 1000))
+    LLM_REQUEST_TIMEOUT: float = float(os.getenv("LLM_REQUEST_TIMEOUT", 60))  # seconds per LLM call
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", 20))  # shared HTTP pool size
+    LLM_STREAM_KEEPALIVE: float = float(os.getenv("LLM_STREAM_KEEPALIVE", 15.0))  # seconds between SSE keep-alives
+    # seconds between reads of an evaluation running in another worker process, shared by its watchers
+    LLM_STREAM_POLL_INTERVAL: float = float(os.getenv("LLM_STREAM_POLL_INTERVAL", 5.0))
+    LLM_STREAM_QUEUE_SIZE: int = int(os.getenv("LLM_STREAM_QUEUE_SIZE", 256))  # events buffered per stream client
+    # seconds between checks for system config changes saved by another worker process
+    SYSTEM_CONFIG_RELOAD_INTERVAL: float = float(os.getenv("SYSTEM_CONFIG_RELOAD_INTERVAL", 10.0))
+    
+    # LLM call scheduling
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", 4))  # LLM requests in flight
+    LLM_REQUESTS_PER_MINUTE: int = int(os.getenv("LLM_REQUESTS_PER_MINUTE", 60))  # 0 = unlimited
+    LLM_TOKENS_PER_MINUTE: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", 90000))  # 0 = unlimited
+    LLM_RESPONSE_TOKEN_ESTIMATE: int = int(os.getenv("LLM_RESPONSE_TOKEN_ESTIMATE", 800))  # completion tokens per call
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", 3))
+    LLM_RETRY_BASE_DELAY: float = float(os.getenv("LLM_RETRY_BASE_DELAY", 1.0))  # seconds
+    LLM_RETRY_MAX_DELAY: float = float(os.getenv("LLM_RETRY_MAX_DELAY", 30.0))  # seconds
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", 5))  # consecutive failures
+    LLM_CIRCUIT_RECOVERY_TIME: float = float(os.getenv("LLM_CIRCUIT_RECOVERY_TIME", 60.0))  # seconds
+    
+    LLM_EVALUATION_MODE: str = os.getenv("LLM_EVALUATION_MODE", "two_step")  # "two_step" or "single_call"
+    # Verdicts evaluated with a single call even in two_step mode, e.g. "accepted,compilation_error"
+    LLM_SINGLE_CALL_VERDICTS: str = os.getenv("LLM_SINGLE_CALL_VERDICTS", "")
+    
+    # LLM prompt budget
+    LLM_PROMPT_TOKEN_BUDGET: int = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", 6000))  # tokens per request
+    LLM_PROMPT_IO_WINDOW: int = int(os.getenv("LLM_PROMPT_IO_WINDOW", 400))  # chars kept per test input/output
+    LLM_PROMPT_PASSING_CASES: int = int(os.getenv("LLM_PROMPT_PASSING_CASES", 2))  # passing cases shown
+    LLM_PROMPT_DESCRIPTION_TOKENS: int = int(os.getenv("LLM_PROMPT_DESCRIPTION_TOKENS", 1500))
+    
+    # LLM evaluation cache
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_TTL: int = int(os.getenv("LLM_CACHE_TTL", 60 * 60 * 24 * 7))  # 7 days
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 50000))
+    
+    # LLM evaluation policy: "eager", "lazy" (on first view) or "none"
+    LLM_POLICY_DEFAULT: str = os.getenv("LLM_POLICY_DEFAULT", "eager")
+    # Per-verdict overrides as "verdict:decision" pairs, e.g. "accepted:lazy,system_error:none"
+    LLM_POLICY_VERDICTS: str = os.getenv("LLM_POLICY_VERDICTS", "")
+    LLM_POLICY_REPEAT_ACCEPTED: str = os.getenv("LLM_POLICY_REPEAT_ACCEPTED", "none")  # accepted again after solving
+    LLM_DAILY_QUOTA: int = int(os.getenv("LLM_DAILY_QUOTA", 0))  # evaluations per user per 24 hours, 0 = unlimited
+    LLM_QUEUE_HIGH_WATERMARK: float = float(os.getenv("LLM_QUEUE_HIGH_WATERMARK", 0.8))  # queue fill ratio deferring eager evaluations
+    
+    # Near-duplicate evaluation reuse (MinHash/LSH over normalized code tokens)
+    LLM_SIMILARITY_ENABLED: bool = os.getenv("LLM_SIMILARITY_ENABLED", "true").lower() == "true"
+    LLM_SIMILARITY_THRESHOLD: float = float(os.getenv("LLM_SIMILARITY_THRESHOLD", 0.9))  # estimated Jaccard similarity
+    LLM_SIMILARITY_NUM_PERM: int = int(os.getenv("LLM_SIMILARITY_NUM_PERM", 64))
+    LLM_SIMILARITY_BANDS: int = int(os.getenv("LLM_SIMILARITY_BANDS", 8))
+    LLM_SIMILARITY_SHINGLE_SIZE: int = int(os.getenv("LLM_SIMILARITY_SHINGLE_SIZE", 5))  # tokens per shingle
+    
+    # LLM call recording/replay, for offline reproduction and benchmarks
+    LLM_REPLAY_MODE: str = os.getenv("LLM_REPLAY_MODE", "off")  # "off", "record" or "replay"
+    LLM_REPLAY_PATH: str = os.getenv("LLM_REPLAY_PATH", "llm_recordings.jsonl")
+    LLM_REPLAY_SIMULATE_LATENCY: bool = os.getenv("LLM_REPLAY_SIMULATE_LATENCY", "false").lower() == "true"
+    
+    # In-process problem cache shared by the API and the judge
+    PROBLEM_CACHE_SIZE: int = int(os.getenv("PROBLEM_CACHE_SIZE", 512))  # problems kept per worker
+    PROBLEM_CACHE_TEST_DATA_SIZE: int = int(os.getenv("PROBLEM_CACHE_TEST_DATA_SIZE", 32))  # problem revisions with test data kept per worker
+    PROBLEM_CACHE_TTL: float = float(os.getenv("PROBLEM_CACHE_TTL", 60.0))  # seconds; bounds staleness without change streams
+    # Invalidate across workers through MongoDB change streams (needs a replica set)
+    PROBLEM_CACHE_CHANGE_STREAM: bool = os.getenv("PROBLEM_CACHE_CHANGE_STREAM", "true").lower() == "true"
+    
+    # Authenticated-user cache. Invalidation only reaches the worker that made a change, so a
+    # deactivated or demoted user keeps their old access on other workers for up to USER_CACHE_TTL
+    # seconds; keep it to a few seconds
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", 10000))  # users kept per worker
+    USER_CACHE_TTL: float = float(os.getenv("USER_CACHE_TTL", 3.0))  # seconds, 0 = disabled
+    
+    # Leaderboard; cached pages and ranks may lag behind new accepted submissions by up to the TTL
+    LEADERBOARD_CACHE_SIZE: int = int(os.getenv("LEADERBOARD_CACHE_SIZE", 1000))  # pages kept per worker
+    LEADERBOARD_CACHE_TTL: float = float(os.getenv("LEADERBOARD_CACHE_TTL", 10.0))  # seconds, 0 = disabled
+    LEADERBOARD_MAX_PAGE_SIZE: int = int(os.getenv("LEADERBOARD_MAX_PAGE_SIZE", 100))
+    
+    # Logging
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")  # "text" or "json"
+    LOG_PAYLOAD_SAMPLE_RATE: float = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", 0.01))  # fraction of prompts/responses logged at DEBUG
+    LOG_PAYLOAD_MAX_CHARS: int = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", 2000))
     
     class Config:
         case_sensitive = True
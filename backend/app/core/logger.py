@@ -0,0 +1,163 @@
+"""Structured logging for the backend.
+
+All modules log through ``logging.getLogger(__name__)`` under the "app"
+logger. setup_logging() routes those records through a QueueHandler, so the
+request and judge coroutines only enqueue a record and a background
+QueueListener thread does the formatting and I/O. Every record carries the
+correlation ID of the submission being processed (see correlation_scope),
+which makes the judge and LLM logs of one submission easy to follow.
+
+Full prompts and responses are only logged at DEBUG level and sampled by
+log_payload(), so production runs at INFO with negligible overhead.
+"""
+
+import json
+import queue
+import random
+import logging
+import logging.handlers
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from app.core.config import settings
+
+
+# 当前正在处理的提交ID，未设置时为"-"
+correlation_id: ContextVar[str] = ContextVar("correlation_id", default="-")
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(correlation_id)s] %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Stamp each record with the correlation ID of the current context.
+    
+    Attached to the QueueHandler, so it runs in the caller's context before
+    the record crosses over to the listener thread.
+    """
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "correlation_id": getattr(record, "correlation_id", "-"),
+            "message": record.getMessage()
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # 已由_QueueHandler在调用方线程中渲染
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the record's args unformatted.
+    
+    The stock handler formats the message in the caller before enqueueing;
+    deferring it to the listener thread keeps formatting off the event loop.
+    Exception info is rendered eagerly because traceback objects must not
+    outlive the caller's frame.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> None:
+    """Configure the "app" logger with an asynchronous handler.
+    
+    Safe to call more than once; later calls only change the level.
+    
+    Args:
+        level: Log level name, defaults to settings.LOG_LEVEL
+        fmt: "text" or "json", defaults to settings.LOG_FORMAT
+    """
+    global _listener
+    
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel((level or settings.LOG_LEVEL).upper())
+    if _listener is not None:
+        return
+    
+    stream_handler = logging.StreamHandler()
+    if (fmt or settings.LOG_FORMAT) == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationIdFilter())
+    
+    app_logger.handlers = [queue_handler]
+    app_logger.propagate = False
+    
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+@contextmanager
+def correlation_scope(value: str):
+    """Tag all records logged inside the block with a correlation ID.
+    
+    Args:
+        value: Usually the submission ID
+    """
+    token = correlation_id.set(value)
+    try:
+        yield
+    finally:
+        correlation_id.reset(token)
+
+
+def log_payload(logger: logging.Logger, label: str, payload: Any, sample_rate: Optional[float] = None) -> None:
+    """Log a large payload (prompt, raw LLM response) at DEBUG level, sampled.
+    
+    Costs a single level check when DEBUG is disabled.
+    
+    Args:
+        logger: Logger to write to
+        label: Short description of the payload
+        payload: The payload; converted with str() only when logged
+        sample_rate: Fraction of calls that are logged, defaults to
+            settings.LOG_PAYLOAD_SAMPLE_RATE
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    rate = settings.LOG_PAYLOAD_SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate < 1.0 and random.random() >= rate:
+        return
+    
+    text = str(payload)
+    limit = settings.LOG_PAYLOAD_MAX_CHARS
+    if limit and len(text) > limit:
+        text = f"{text[:limit]}...(截断，共{len(text)}字符)"
+    logger.debug("%s:\n%s", label, text, extra={"fields": {"payload": label}})
@@ -1,6 +1,12 @@
+import math
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 
+from fastapi import HTTPException, status
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
@@ -42,3 +48,161 @@ def get_password_hash(password: str) -> str:
     :return: Hashed password
     """
     return pwd_context.hash(password)
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """
+    Hash a batch of passwords; used by worker processes of the bulk user import.
+    
+    :param passwords: Plain text passwords
+    :return: Hashed passwords in the same order
+    """
+    return [pwd_context.hash(password) for password in passwords]
+
+
+class PasswordHasher:
+    """
+    Run bcrypt off the event loop.
+    
+    Each hash or verification takes on the order of 100 ms of CPU. Calling it
+    directly in a request handler stalls every other request of the worker,
+    so operations run in a thread pool (bcrypt releases the GIL). At most
+    `workers` operations run at once; the rest wait in line, and once
+    `max_queue` are waiting new ones are rejected with 503 instead of piling up.
+    
+    Batches, such as the passwords of a bulk user import, are hashed in a
+    process pool of `batch_processes` workers that is shared by all batches
+    and stopped by shutdown().
+    """
+    
+    def __init__(self, workers: int, max_queue: int, batch_processes: int):
+        """
+        Initialize the hasher.
+        
+        :param workers: Number of concurrent hash operations
+        :param max_queue: Number of waiting operations before rejecting, 0 for unlimited
+        :param batch_processes: Number of processes hashing batches
+        """
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.batch_processes = max(1, batch_processes)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._wait_total = 0.0
+        self._run_total = 0.0
+        self.max_wait = 0.0
+    
+    async def _run(self, func: Callable, *args) -> Any:
+        if self.max_queue and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again",
+                headers={"Retry-After": "1"}
+            )
+        
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            self._slots = asyncio.Semaphore(self.workers)
+        
+        # 信号量与线程数相同，排队发生在这里，便于统计等待时间
+        queued_at = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        
+        started_at = time.monotonic()
+        wait = started_at - queued_at
+        self._wait_total += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._slots.release()
+            self.running -= 1
+            self.completed += 1
+            self._run_total += time.monotonic() - started_at
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verify a password without blocking the event loop.
+        
+        :param plain_password: Plain text password
+        :param hashed_password: Hashed password
+        :return: True if matching, False otherwise
+        """
+        return await self._run(verify_password, plain_password, hashed_password)
+    
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password without blocking the event loop.
+        
+        :param password: Plain text password
+        :return: Hashed password
+        """
+        return await self._run(get_password_hash, password)
+    
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """
+        Hash a batch of passwords in parallel worker processes.
+        
+        :param passwords: Plain text passwords
+        :return: Hashed passwords in the same order
+        """
+        if not passwords:
+            return []
+        
+        if self._process_pool is None:
+            # 使用spawn：服务进程中有其他线程在运行，fork可能继承被占用的锁
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.batch_processes,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        
+        size = math.ceil(len(passwords) / min(self.batch_processes, len(passwords)))
+        chunks = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self._process_pool, hash_passwords, chunk) for chunk in chunks)
+        )
+        return [hashed for chunk in results for hashed in chunk]
+    
+    def shutdown(self) -> None:
+        """Stop the worker threads and processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._slots = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get queueing metrics."""
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self._wait_total / self.completed * 1000, 1) if self.completed else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "avg_run_ms": round(self._run_total / self.completed * 1000, 1) if self.completed else 0.0
+        }
+
+
+# Create a singleton password hasher instance
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    batch_processes=settings.USER_IMPORT_HASH_PROCESSES
+)
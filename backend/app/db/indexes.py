@@ -0,0 +1,294 @@
+"""MongoDB index registry and query-plan check.
+
+INDEXES declares every index the API and judge rely on. ensure_indexes()
+applies them at startup; it is idempotent, so restarting the server or
+running several workers is safe, and a conflicting or unbuildable index is
+logged without preventing startup.
+
+QUERY_SHAPES lists the queries issued by the endpoints and the judge.
+explain_query_shapes() asks MongoDB for the winning plan of each shape and
+flags collection scans and in-memory sorts, so a missing index shows up
+before it shows up in latency. Run it through GET /system-config/query-plans
+or from the command line:
+    
+    python -m app.db.indexes            # apply indexes and check query plans
+    python -m app.db.indexes --check    # only check query plans
+"""
+
+import sys
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import Dict, List, Any, Tuple
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.db.mongodb import db, connect_to_mongo, close_mongo_connection
+
+logger = logging.getLogger(__name__)
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    # 排行榜分页，见 app/db/leaderboard.py
+    "leaderboard": [
+        IndexModel(
+            [("scope", ASCENDING), ("solved", DESCENDING), ("last_solved_at", ASCENDING), ("_id", ASCENDING)],
+            name="scope_rank"
+        ),
+    ],
+    "leaderboard_counts": [
+        IndexModel([("scope", ASCENDING), ("solved", DESCENDING)], name="scope_solved"),
+    ],
+    "problems": [
+        # 只约束非空的自定义ID，未设置custom_id的问题可以有多个
+        IndexModel(
+            [("custom_id", ASCENDING)],
+            name="custom_id_unique",
+            unique=True,
+            partialFilterExpression={"custom_id": {"$gt": ""}}
+        ),
+        IndexModel([("is_public", ASCENDING), ("_id", ASCENDING)], name="public_id"),
+    ],
+    "submissions": [
+        # 用户自己的提交列表，以及配额统计
+        IndexModel(
+            [("user_id", ASCENDING), ("submitted_at", DESCENDING), ("_id", DESCENDING)],
+            name="user_submitted"
+        ),
+        # 按题目筛选的用户提交列表，以及评测时查询用户是否已通过
+        IndexModel(
+            [("user_id", ASCENDING), ("problem_id", ASCENDING), ("submitted_at", DESCENDING), ("_id", DESCENDING)],
+            name="user_problem_submitted"
+        ),
+        # 管理员按题目、按状态筛选或浏览全部提交
+        IndexModel(
+            [("problem_id", ASCENDING), ("submitted_at", DESCENDING), ("_id", DESCENDING)],
+            name="problem_submitted"
+        ),
+        IndexModel(
+            [("status", ASCENDING), ("submitted_at", DESCENDING), ("_id", DESCENDING)],
+            name="status_submitted"
+        ),
+        IndexModel([("submitted_at", DESCENDING), ("_id", DESCENDING)], name="submitted"),
+        # 重启后恢复未完成的LLM评估
+        IndexModel(
+            [("llm_evaluation_status", ASCENDING), ("submitted_at", ASCENDING)],
+            name="llm_evaluation_status_submitted"
+        ),
+    ],
+}
+
+
+# 示例值只用于生成查询计划
+_SAMPLE_ID = "000000000000000000000000"
+
+QUERY_SHAPES: List[Dict[str, Any]] = [
+    {
+        "name": "auth.login",
+        "collection": "users",
+        "filter": {"username": "sample"}
+    },
+    {
+        "name": "auth.signup.email",
+        "collection": "users",
+        "filter": {"email": "sample@example.com"}
+    },
+    {
+        "name": "problems.read_problem",
+        "collection": "problems",
+        "filter": {"_id": ObjectId(_SAMPLE_ID)}
+    },
+    {
+        "name": "problems.read_problem.custom_id",
+        "collection": "problems",
+        "filter": {"custom_id": "P1001"}
+    },
+    {
+        "name": "problems.read_problems",
+        "collection": "problems",
+        "filter": {"is_public": True},
+        "sort": {"_id": 1}
+    },
+    {
+        "name": "submissions.read_submissions",
+        "collection": "submissions",
+        "filter": {"user_id": _SAMPLE_ID},
+        "sort": {"submitted_at": -1, "_id": -1}
+    },
+    {
+        "name": "submissions.read_submissions.next_page",
+        "collection": "submissions",
+        "filter": {
+            "user_id": _SAMPLE_ID,
+            "$or": [
+                {"submitted_at": {"$lt": datetime(2000, 1, 1)}},
+                {"submitted_at": datetime(2000, 1, 1), "_id": {"$lt": ObjectId(_SAMPLE_ID)}}
+            ]
+        },
+        "sort": {"submitted_at": -1, "_id": -1}
+    },
+    {
+        "name": "submissions.read_submissions.problem",
+        "collection": "submissions",
+        "filter": {"user_id": _SAMPLE_ID, "problem_id": _SAMPLE_ID},
+        "sort": {"submitted_at": -1, "_id": -1}
+    },
+    {
+        "name": "submissions.read_submissions.status",
+        "collection": "submissions",
+        "filter": {"status": "accepted"},
+        "sort": {"submitted_at": -1, "_id": -1}
+    },
+    {
+        "name": "submissions.read_submissions.admin",
+        "collection": "submissions",
+        "filter": {},
+        "sort": {"submitted_at": -1, "_id": -1}
+    },
+    {
+        "name": "users.read_users",
+        "collection": "users",
+        "filter": {"_id": {"$gt": ObjectId(_SAMPLE_ID)}},
+        "sort": {"_id": 1}
+    },
+    {
+        "name": "leaderboard.page",
+        "collection": "leaderboard",
+        "filter": {"scope": "global"},
+        "sort": {"solved": -1, "last_solved_at": 1, "_id": 1}
+    },
+    {
+        "name": "leaderboard.ranks",
+        "collection": "leaderboard_counts",
+        "filter": {"scope": "global", "users": {"$gt": 0}},
+        "sort": {"solved": -1}
+    },
+    {
+        "name": "judge.accepted_lookup",
+        "collection": "submissions",
+        "filter": {
+            "problem_id": _SAMPLE_ID,
+            "user_id": _SAMPLE_ID,
+            "status": "accepted",
+            "_id": {"$ne": ObjectId(_SAMPLE_ID)}
+        }
+    },
+    {
+        "name": "llm_queue.recover_unfinished",
+        "collection": "submissions",
+        "filter": {"llm_evaluation_status": {"$in": ["pending", "running"]}},
+        "sort": {"submitted_at": 1}
+    },
+    {
+        "name": "llm_policy.quota",
+        "collection": "submissions",
+        "filter": {
+            "user_id": _SAMPLE_ID,
+            "submitted_at": {"$gte": datetime(2000, 1, 1)},
+            "llm_evaluation_status": {"$in": ["pending", "running", "done", "failed"]}
+        }
+    },
+]
+
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """Create all registered indexes that do not exist yet.
+    
+    Returns:
+        dict: Names of the indexes per collection that are in place
+    """
+    applied: Dict[str, List[str]] = {}
+    for collection_name, models in INDEXES.items():
+        collection = db.db[collection_name]
+        applied[collection_name] = []
+        for model in models:
+            name = model.document["name"]
+            try:
+                await collection.create_indexes([model])
+                applied[collection_name].append(name)
+            except OperationFailure as e:
+                # 同名索引定义不同，或者已有数据违反唯一约束
+                logger.error("Could not create index %s.%s: %s", collection_name, name, e)
+    return applied
+
+
+def _walk_plan(plan: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """List the stages of a query plan, outermost first, and the indexes it uses."""
+    stages, index_names = [], []
+    pending = [plan]
+    while pending:
+        node = pending.pop()
+        if "stage" in node:
+            stages.append(node["stage"])
+        if node.get("indexName"):
+            index_names.append(node["indexName"])
+        if "inputStage" in node:
+            pending.append(node["inputStage"])
+        pending.extend(node.get("inputStages", []))
+    return stages, index_names
+
+
+async def explain_query_shapes() -> List[Dict[str, Any]]:
+    """Explain every registered query shape.
+    
+    Returns:
+        list: For each shape its winning plan's stages, the indexes used and
+            whether it scans the whole collection or sorts in memory
+    """
+    report = []
+    for shape in QUERY_SHAPES:
+        command = {"find": shape["collection"], "filter": shape["filter"], "limit": 20}
+        if shape.get("sort"):
+            command["sort"] = shape["sort"]
+        
+        explained = await db.db.command({"explain": command, "verbosity": "queryPlanner"})
+        winning_plan = explained["queryPlanner"]["winningPlan"]
+        # 使用基于槽的执行引擎时，计划位于queryPlan之下
+        stages, index_names = _walk_plan(winning_plan.get("queryPlan", winning_plan))
+        
+        report.append({
+            "name": shape["name"],
+            "collection": shape["collection"],
+            "stages": stages,
+            "indexes": index_names,
+            "collection_scan": "COLLSCAN" in stages,
+            "in_memory_sort": "SORT" in stages
+        })
+    return report
+
+
+async def _main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Apply MongoDB indexes and check query plans")
+    parser.add_argument("--check", action="store_true", help="only check query plans, do not create indexes")
+    args = parser.parse_args(argv)
+    
+    await connect_to_mongo()
+    try:
+        if not args.check:
+            applied = await ensure_indexes()
+            for collection_name, names in applied.items():
+                print(f"{collection_name}: {', '.join(names)}")
+        
+        problems = 0
+        for entry in await explain_query_shapes():
+            flags = []
+            if entry["collection_scan"]:
+                flags.append("COLLSCAN")
+            if entry["in_memory_sort"]:
+                flags.append("IN-MEMORY SORT")
+            problems += bool(flags)
+            print(f"{'!!' if flags else 'ok'} {entry['name']:<40} {' > '.join(entry['stages'])}  {' '.join(flags)}")
+        return 1 if problems else 0
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main()))
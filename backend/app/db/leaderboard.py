@@ -0,0 +1,280 @@
+"""Materialized leaderboard.
+
+Ranking users by solved problems from the source data means aggregating over
+all submissions or scanning every user's solved_problems list. Instead the
+judge records each user's first accepted submission of a problem here, and
+two small collections are kept up to date incrementally:
+
+- leaderboard: one entry per user and scope with the number of solved
+  problems and when the last of them was solved. The scope is "global" or
+  "tag:<tag>" for each tag of the solved problem, so per-tag rankings are
+  served the same way as the global one.
+- leaderboard_counts: per scope, how many users solved each number of
+  problems. A user's rank is 1 + the number of users with more solved
+  problems, read from this histogram, which has at most one row per distinct
+  solved count rather than one per user.
+
+Pages are read with keyset pagination over the scope_rank index and cached
+per worker for LEADERBOARD_CACHE_TTL seconds, so repeated reads of popular
+pages do not touch the database at all. Users with the same number of solved
+problems share a rank.
+
+Tags are taken from the problem when it is solved; later tag edits, and data
+from before the leaderboard existed, are picked up by rebuild() (POST
+/leaderboard/rebuild), which recomputes everything from the users and their
+accepted submissions.
+"""
+
+import time
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+
+from app.db.mongodb import db
+from app.db.user_cache import user_cache
+from app.db.pagination import LEADERBOARD_SORT, fetch_page
+from app.core.config import settings
+from app.models.submission import JudgeStatus
+
+GLOBAL_SCOPE = "global"
+
+
+def tag_scope(tag: str) -> str:
+    """Get the leaderboard scope of a problem tag."""
+    return f"tag:{tag}"
+
+
+def problem_scopes(problem: Dict[str, Any]) -> List[str]:
+    """List the leaderboard scopes a solved problem counts towards."""
+    return [GLOBAL_SCOPE] + [tag_scope(tag) for tag in sorted(set(problem.get("tags") or []))]
+
+
+class _RankTable:
+    """Ranks of one scope, built from its solved-count histogram."""
+    
+    def __init__(self, levels: List[Tuple[int, int]]):
+        # levels: (solved, users), most solved first
+        self._keys = [-solved for solved, _ in levels]
+        self._above = [0]
+        for _, users in levels:
+            self._above.append(self._above[-1] + users)
+    
+    @property
+    def total(self) -> int:
+        return self._above[-1]
+    
+    def rank(self, solved: int) -> int:
+        # 排名 = 1 + 通过题数更多的用户数
+        return 1 + self._above[bisect_left(self._keys, -solved)]
+
+
+class Leaderboard:
+    """Incrementally maintained rankings with a per-worker page cache."""
+    
+    ENTRY_PROJECTION = {"user_id": 1, "username": 1, "solved": 1, "last_solved_at": 1}
+    
+    # 重建时每批写入的文档数
+    REBUILD_BATCH_SIZE = 1000
+    
+    def __init__(self, cache_size: int, ttl: float):
+        """Initialize the leaderboard.
+        
+        Args:
+            cache_size: Maximum number of pages kept
+            ttl: Seconds a cached page or rank table is used without checking the database
+        """
+        self.cache_size = max(1, cache_size)
+        self.ttl = ttl
+        self._pages: "OrderedDict[Tuple[str, int, Optional[str]], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._rank_tables: Dict[str, Tuple[float, _RankTable]] = {}
+    
+    async def record_solve(self, user_id: str, problem: Dict[str, Any], solved_at: datetime) -> None:
+        """Count a problem a user solved for the first time.
+        
+        Must be called once per user and problem; the judge calls it only
+        when the problem was newly added to the user's solved_problems.
+        
+        Args:
+            user_id: ID of the user
+            problem: The solved problem, its tags select the per-tag scopes
+            solved_at: Time of the accepted submission
+        """
+        user = await user_cache.get(user_id)
+        username = user["username"] if user else None
+        
+        count_updates = []
+        for scope in problem_scopes(problem):
+            entry = await db.db.leaderboard.find_one_and_update(
+                {"_id": f"{scope}/{user_id}"},
+                {
+                    "$inc": {"solved": 1},
+                    "$max": {"last_solved_at": solved_at},
+                    "$setOnInsert": {"scope": scope, "user_id": user_id, "username": username}
+                },
+                projection={"solved": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            
+            # 用户从直方图中的solved-1档移到solved档
+            solved = entry["solved"]
+            count_updates.append(UpdateOne(
+                {"_id": f"{scope}/{solved}"},
+                {"$inc": {"users": 1}, "$setOnInsert": {"scope": scope, "solved": solved}},
+                upsert=True
+            ))
+            if solved > 1:
+                count_updates.append(UpdateOne({"_id": f"{scope}/{solved - 1}"}, {"$inc": {"users": -1}}))
+        
+        await db.db.leaderboard_counts.bulk_write(count_updates, ordered=False)
+    
+    async def get_page(self, scope: str, limit: int, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get one page of a ranking.
+        
+        Args:
+            scope: GLOBAL_SCOPE or a tag_scope()
+            limit: Page size
+            cursor: Continuation token from the previous page, if any
+        
+        Returns:
+            dict: entries (rank, user_id, username, solved, last_solved_at),
+                next_cursor and the total number of ranked users. Shared
+                between callers, must not be modified.
+        """
+        key = (scope, limit, cursor)
+        cached = self._pages.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            self._pages.move_to_end(key)
+            return cached[1]
+        
+        rank_table = await self._get_rank_table(scope)
+        entries, next_cursor = await fetch_page(
+            db.db.leaderboard,
+            {"scope": scope},
+            LEADERBOARD_SORT,
+            limit,
+            cursor=cursor,
+            projection=self.ENTRY_PROJECTION
+        )
+        page = {
+            "entries": [self._ranked(entry, rank_table) for entry in entries],
+            "next_cursor": next_cursor,
+            "total": rank_table.total
+        }
+        
+        if self.ttl > 0:
+            self._pages[key] = (time.monotonic() + self.ttl, page)
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.cache_size:
+                self._pages.popitem(last=False)
+        return page
+    
+    async def get_user_entry(self, scope: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user's entry in a ranking, or None if they solved nothing in it."""
+        entry = await db.db.leaderboard.find_one({"_id": f"{scope}/{user_id}"}, self.ENTRY_PROJECTION)
+        if entry is None:
+            return None
+        return self._ranked(entry, await self._get_rank_table(scope))
+    
+    async def rebuild(self) -> Dict[str, int]:
+        """Recompute all rankings from the users' solved problems.
+        
+        Accepted submissions made while rebuilding may be lost from the
+        result; run it when few submissions are being judged.
+        
+        Returns:
+            dict: Number of ranked users and of leaderboard entries written
+        """
+        problem_tags = {}
+        async for problem in db.db.problems.find({}, {"tags": 1}):
+            problem_tags[str(problem["_id"])] = problem.get("tags") or []
+        
+        # 每个用户每道题第一次通过的时间
+        first_accepted = {}
+        pipeline = [
+            {"$match": {"status": JudgeStatus.ACCEPTED}},
+            {"$group": {
+                "_id": {"user_id": "$user_id", "problem_id": "$problem_id"},
+                "solved_at": {"$min": "$submitted_at"}
+            }}
+        ]
+        async for row in db.db.submissions.aggregate(pipeline, allowDiskUse=True):
+            first_accepted[(row["_id"]["user_id"], row["_id"]["problem_id"])] = row["solved_at"]
+        
+        entries, histogram = [], Counter()
+        ranked_users = 0
+        user_projection = {"username": 1, "solved_problems": 1, "created_at": 1}
+        async for user in db.db.users.find({"solved_problems.0": {"$exists": True}}, user_projection):
+            user_id = str(user["_id"])
+            # 找不到通过记录时用注册时间代替；排序键不能为null，否则落在该条目上的游标会漏掉后续用户
+            fallback_solved_at = user.get("created_at") or datetime.min
+            scores: Dict[str, Tuple[int, datetime]] = {}
+            for problem_id in set(user["solved_problems"]):
+                if problem_id not in problem_tags:
+                    continue  # 题目已删除
+                solved_at = first_accepted.get((user_id, problem_id)) or fallback_solved_at
+                for scope in problem_scopes({"tags": problem_tags[problem_id]}):
+                    solved, last_solved_at = scores.get(scope, (0, solved_at))
+                    scores[scope] = (solved + 1, max(last_solved_at, solved_at))
+            
+            ranked_users += bool(scores)
+            for scope, (solved, last_solved_at) in scores.items():
+                entries.append({
+                    "_id": f"{scope}/{user_id}",
+                    "scope": scope,
+                    "user_id": user_id,
+                    "username": user.get("username"),
+                    "solved": solved,
+                    "last_solved_at": last_solved_at
+                })
+                histogram[(scope, solved)] += 1
+        
+        counts = [
+            {"_id": f"{scope}/{solved}", "scope": scope, "solved": solved, "users": users}
+            for (scope, solved), users in histogram.items()
+        ]
+        for collection, documents in ((db.db.leaderboard, entries), (db.db.leaderboard_counts, counts)):
+            await collection.delete_many({})
+            for start in range(0, len(documents), self.REBUILD_BATCH_SIZE):
+                await collection.insert_many(documents[start:start + self.REBUILD_BATCH_SIZE], ordered=False)
+        
+        self.clear()
+        return {"users": ranked_users, "entries": len(entries)}
+    
+    def clear(self) -> None:
+        """Drop all cached pages and ranks of this worker."""
+        self._pages.clear()
+        self._rank_tables.clear()
+    
+    async def _get_rank_table(self, scope: str) -> _RankTable:
+        cached = self._rank_tables.get(scope)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        
+        levels = []
+        async for row in db.db.leaderboard_counts.find(
+            {"scope": scope, "users": {"$gt": 0}},
+            {"solved": 1, "users": 1}
+        ).sort("solved", -1):
+            levels.append((row["solved"], row["users"]))
+        
+        rank_table = _RankTable(levels)
+        if self.ttl > 0:
+            self._rank_tables[scope] = (time.monotonic() + self.ttl, rank_table)
+        return rank_table
+    
+    def _ranked(self, entry: Dict[str, Any], rank_table: _RankTable) -> Dict[str, Any]:
+        return {
+            "rank": rank_table.rank(entry["solved"]),
+            "user_id": entry["user_id"],
+            "username": entry.get("username"),
+            "solved": entry["solved"],
+            "last_solved_at": entry.get("last_solved_at")
+        }
+
+
+# Create a singleton leaderboard instance
+leaderboard = Leaderboard(cache_size=settings.LEADERBOARD_CACHE_SIZE, ttl=settings.LEADERBOARD_CACHE_TTL)
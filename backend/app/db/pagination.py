@@ -0,0 +1,150 @@
+"""Keyset (cursor-based) pagination for list endpoints.
+
+Paging with skip makes MongoDB walk and discard every skipped document, so
+deep pages get linearly slower. Keyset pagination instead remembers the sort
+key of the last document on a page and starts the next page right after it,
+which an index on the same fields serves with one seek, whatever the depth.
+
+The sort key always ends with _id so it is unique. It is handed to clients
+as an opaque continuation token: list endpoints return the token for the
+next page in the X-Next-Cursor response header, and clients pass it back
+unchanged as the cursor query parameter.
+"""
+
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+from bson import json_util
+from bson.objectid import ObjectId
+from fastapi import HTTPException, Response, status
+
+# 响应头中的下一页游标，没有更多数据时不返回
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# 每个列表接口的排序键，需要有对应的复合索引（见 app/db/indexes.py）
+SUBMISSION_SORT: List[Tuple[str, int]] = [("submitted_at", -1), ("_id", -1)]
+PROBLEM_SORT: List[Tuple[str, int]] = [("_id", 1)]
+USER_SORT: List[Tuple[str, int]] = [("_id", 1)]
+# 排行榜：通过题数多者在前，相同时先达到该题数者在前
+LEADERBOARD_SORT: List[Tuple[str, int]] = [("solved", -1), ("last_solved_at", 1), ("_id", 1)]
+
+# 游标中只允许出现的取值类型；拒绝字典等值，避免客户端借游标注入查询操作符
+_CURSOR_VALUE_TYPES = (datetime, ObjectId, str, int, float, type(None))
+
+
+def encode_cursor(document: Dict[str, Any], sort: List[Tuple[str, int]]) -> str:
+    """Build the continuation token pointing after a document.
+    
+    Args:
+        document: The last document of a page, must contain all sort fields
+        sort: The sort key of the listing
+    
+    Returns:
+        str: URL-safe opaque token
+    """
+    values = [document.get(field) for field, _ in sort]
+    # Extended JSON保留datetime和ObjectId的类型
+    raw = json_util.dumps(values, json_options=json_util.RELAXED_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, sort: List[Tuple[str, int]]) -> List[Any]:
+    """Read the sort key values from a continuation token.
+    
+    Raises:
+        HTTPException: 400 if the token is malformed or from another listing
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json_util.loads(raw.decode("utf-8"))
+    except (ValueError, TypeError, binascii.Error, json.JSONDecodeError):
+        values = None
+    
+    if (
+        not isinstance(values, list)
+        or len(values) != len(sort)
+        or not all(isinstance(value, _CURSOR_VALUE_TYPES) for value in values)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+    return values
+
+
+def keyset_query(query: Dict[str, Any], sort: List[Tuple[str, int]], token: str) -> Dict[str, Any]:
+    """Restrict a query to the documents after a continuation token.
+    
+    For a sort key (a, b) this adds  a > x  OR  (a = x AND b > y), with the
+    comparisons flipped for descending fields.
+    
+    Args:
+        query: The listing's filter
+        sort: The sort key of the listing
+        token: Continuation token from the previous page
+    
+    Returns:
+        dict: A new filter
+    """
+    values = decode_cursor(token, sort)
+    branches = []
+    for position, (field, direction) in enumerate(sort):
+        branch = {sort[i][0]: values[i] for i in range(position)}
+        branch[field] = {"$gt" if direction > 0 else "$lt": values[position]}
+        branches.append(branch)
+    
+    after = branches[0] if len(branches) == 1 else {"$or": branches}
+    if not query:
+        return after
+    return {"$and": [query, after]}
+
+
+async def fetch_page(
+        collection,
+        query: Dict[str, Any],
+        sort: List[Tuple[str, int]],
+        limit: int,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        projection: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one page of a listing.
+    
+    Args:
+        collection: Motor collection
+        query: The listing's filter
+        sort: The sort key of the listing
+        limit: Page size
+        cursor: Continuation token from the previous page, if any
+        skip: Offset, only used without a cursor for clients that still page by offset
+        projection: Fields to return; the sort fields are always included
+    
+    Returns:
+        tuple: The documents and the token of the next page, or None on the last page
+    """
+    if cursor:
+        query = keyset_query(query, sort, cursor)
+        skip = 0
+    
+    if projection is not None and not all(value in (0, False) for value in projection.values()):
+        projection = dict(projection, **{field: 1 for field, _ in sort})
+    
+    # 多取一条，用于判断是否还有下一页
+    find = collection.find(query, projection).sort(sort)
+    if skip:
+        find = find.skip(skip)
+    documents = await find.limit(limit + 1).to_list(length=limit + 1)
+    
+    if len(documents) <= limit:
+        return documents, None
+    documents = documents[:limit]
+    return documents, encode_cursor(documents[-1], sort)
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    """Expose the next page's token in the response headers."""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,257 @@
+"""In-process cache of problem documents.
+
+Problems are read on every problem view, submission and judge run but change
+rarely. Each worker keeps a bounded LRU of problem metadata (everything but
+the test data and special judge code), with a TTL, and a smaller LRU of test
+data keyed by problem revision ("<id>@<updated_at>"), so the judge and the
+LLM evaluator only load test data again after the problem was edited.
+
+update_problem and delete_problem invalidate the local worker directly.
+Other workers follow a MongoDB change stream on the problems collection.
+Change streams need a replica set; on a standalone server, or when disabled
+through PROBLEM_CACHE_CHANGE_STREAM, entries of other workers expire after
+PROBLEM_CACHE_TTL seconds instead.
+
+Counter updates (submission_count, accepted_count) do not invalidate entries,
+so cached counts may lag by up to the TTL.
+"""
+
+import copy
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from bson.objectid import ObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.db.mongodb import db
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def problem_revision(problem: Dict[str, Any]) -> str:
+    """Identify the version of a problem; changes whenever the problem is edited."""
+    return f"{problem['_id']}@{problem.get('updated_at')}"
+
+
+def problem_visible_to(problem: Dict[str, Any], user_id: str) -> bool:
+    """Check whether a user may view a problem: it is public or they are its author."""
+    return bool(problem.get("is_public")) or problem.get("author_id") == user_id
+
+
+class ProblemCache:
+    """Bounded LRU/TTL cache of problems, invalidated across workers."""
+    
+    METADATA_PROJECTION = {"test_cases": 0, "special_judge_code": 0}
+    TEST_DATA_PROJECTION = {"test_cases": 1, "special_judge_code": 1, "updated_at": 1}
+    
+    # 只修改这些计数字段的更新不会使缓存失效
+    COUNTER_FIELDS = frozenset({"submission_count", "accepted_count"})
+    
+    # 变更流断开后重新连接前等待的秒数
+    RECONNECT_DELAY = 5.0
+    
+    def __init__(self, max_size: int, test_data_size: int, ttl: float, use_change_stream: bool = True):
+        """Initialize the cache.
+        
+        Args:
+            max_size: Maximum number of problems kept
+            test_data_size: Maximum number of problem revisions whose test data is kept
+            ttl: Seconds a cached problem is used without checking the database
+            use_change_stream: Whether to watch the problems collection for changes
+        """
+        self.max_size = max(1, max_size)
+        self.test_data_size = max(1, test_data_size)
+        self.ttl = ttl
+        self.use_change_stream = use_change_stream
+        
+        self._problems: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._custom_ids: Dict[str, str] = {}
+        self._test_data: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        
+        # 每次失效时递增；读取数据库期间发生失效时不写入缓存，避免存入旧数据
+        self._generation = 0
+        self._watcher: Optional[asyncio.Task] = None
+        self.change_stream_active = False
+    
+    async def start(self) -> None:
+        """Start watching the problems collection for changes made by other workers."""
+        if self.use_change_stream and self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+    
+    async def stop(self) -> None:
+        """Stop watching for changes."""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+        self.change_stream_active = False
+    
+    async def get(self, problem_id: str) -> Optional[Dict[str, Any]]:
+        """Get a problem's metadata by its system ID.
+        
+        Args:
+            problem_id: The problem's ObjectId as a string
+        
+        Returns:
+            dict: A copy of the problem document without test data, or None
+        """
+        if not ObjectId.is_valid(problem_id):
+            return None
+        
+        entry = self._problems.get(problem_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._problems.move_to_end(problem_id)
+            return copy.deepcopy(entry[1])
+        
+        generation = self._generation
+        problem = await db.db.problems.find_one({"_id": ObjectId(problem_id)}, self.METADATA_PROJECTION)
+        if problem is None:
+            self._discard(problem_id)
+            return None
+        
+        if generation == self._generation:
+            self._store(problem)
+        return copy.deepcopy(problem)
+    
+    async def get_by_custom_id(self, custom_id: str) -> Optional[Dict[str, Any]]:
+        """Get a problem's metadata by its custom ID, e.g. "P1001"."""
+        problem_id = self._custom_ids.get(custom_id)
+        if problem_id is not None:
+            problem = await self.get(problem_id)
+            if problem is not None and problem.get("custom_id") == custom_id:
+                return problem
+        
+        generation = self._generation
+        problem = await db.db.problems.find_one({"custom_id": custom_id}, self.METADATA_PROJECTION)
+        if problem is None:
+            return None
+        
+        if generation == self._generation:
+            self._store(problem)
+        return copy.deepcopy(problem)
+    
+    async def get_test_data(self, problem: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the test cases and special judge code of a problem revision.
+        
+        Args:
+            problem: The problem's metadata as returned by get()
+        
+        Returns:
+            dict: test_cases and special_judge_code. Shared between callers,
+                must not be modified.
+        """
+        revision = problem_revision(problem)
+        test_data = self._test_data.get(revision)
+        if test_data is not None:
+            self._test_data.move_to_end(revision)
+            return test_data
+        
+        generation = self._generation
+        document = await db.db.problems.find_one({"_id": problem["_id"]}, self.TEST_DATA_PROJECTION)
+        if document is None:
+            return {"test_cases": [], "special_judge_code": None}
+        
+        test_data = {
+            "test_cases": document.get("test_cases", []),
+            "special_judge_code": document.get("special_judge_code")
+        }
+        current_revision = problem_revision(document)
+        if current_revision != revision:
+            # 调用方的题目信息已过期，丢弃它以便下次读取新版本
+            self.invalidate(str(problem["_id"]))
+        elif generation == self._generation:
+            self._test_data[revision] = test_data
+            while len(self._test_data) > self.test_data_size:
+                self._test_data.popitem(last=False)
+        return test_data
+    
+    def invalidate(self, problem_id: str) -> None:
+        """Drop a problem from this worker's cache.
+        
+        Other workers are notified through the change stream, if available.
+        """
+        self._generation += 1
+        self._discard(problem_id)
+        prefix = f"{problem_id}@"
+        for revision in [key for key in self._test_data if key.startswith(prefix)]:
+            del self._test_data[revision]
+    
+    def clear(self) -> None:
+        """Drop all cached problems."""
+        self._generation += 1
+        self._problems.clear()
+        self._custom_ids.clear()
+        self._test_data.clear()
+    
+    def _store(self, problem: Dict[str, Any]) -> None:
+        problem_id = str(problem["_id"])
+        self._discard(problem_id)
+        self._problems[problem_id] = (time.monotonic() + self.ttl, problem)
+        if problem.get("custom_id"):
+            self._custom_ids[problem["custom_id"]] = problem_id
+        
+        while len(self._problems) > self.max_size:
+            self._discard(next(iter(self._problems)))
+    
+    def _discard(self, problem_id: str) -> None:
+        entry = self._problems.pop(problem_id, None)
+        if entry is not None and self._custom_ids.get(entry[1].get("custom_id")) == problem_id:
+            del self._custom_ids[entry[1]["custom_id"]]
+    
+    def _apply_change(self, change: Dict[str, Any]) -> None:
+        """Invalidate the problem touched by a change stream event."""
+        operation = change.get("operationType")
+        if operation == "update":
+            description = change.get("updateDescription", {})
+            fields = set(description.get("updatedFields", {})) | set(description.get("removedFields", []))
+            if fields and fields <= self.COUNTER_FIELDS:
+                return
+        
+        problem_id = change.get("documentKey", {}).get("_id")
+        if problem_id is None:
+            # 集合被删除或重命名
+            self.clear()
+        else:
+            self.invalidate(str(problem_id))
+    
+    async def _watch(self) -> None:
+        """Follow changes of the problems collection until cancelled."""
+        pipeline = [{"$match": {"operationType": {"$in": ["update", "replace", "delete", "drop", "rename", "invalidate"]}}}]
+        while True:
+            try:
+                async with db.db.problems.watch(pipeline) as stream:
+                    # 变更流建立之前的修改无法得知，清空已有缓存
+                    self.clear()
+                    self.change_stream_active = True
+                    logger.info("Watching problem changes; cached problems are invalidated across workers")
+                    async for change in stream:
+                        self._apply_change(change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                # 单机部署不支持变更流
+                self.change_stream_active = False
+                logger.warning(
+                    "Problem change stream unavailable (%s); other workers' edits are picked up after %ss",
+                    e, self.ttl
+                )
+                return
+            except PyMongoError as e:
+                self.change_stream_active = False
+                logger.warning("Problem change stream interrupted: %s", e)
+            
+            self.change_stream_active = False
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+
+# Create a singleton problem cache instance
+problem_cache = ProblemCache(
+    max_size=settings.PROBLEM_CACHE_SIZE,
+    test_data_size=settings.PROBLEM_CACHE_TEST_DATA_SIZE,
+    ttl=settings.PROBLEM_CACHE_TTL,
+    use_change_stream=settings.PROBLEM_CACHE_CHANGE_STREAM
+)
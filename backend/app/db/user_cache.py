@@ -0,0 +1,83 @@
+"""Short-lived cache of authenticated users.
+
+Every authenticated request resolves the token's user. Instead of loading the
+whole user document (including the ever-growing solved_problems list) each
+time, get_current_user reads only the fields authorization needs, and keeps
+them for USER_CACHE_TTL seconds per worker.
+
+update_user_me invalidates the entry on the worker that handled it; changes
+to role or active state made elsewhere (another worker, or directly in the
+database) take effect on every worker within the TTL. A deactivated or
+demoted user therefore keeps their old access for up to USER_CACHE_TTL
+seconds, which defaults to 3 seconds: long enough to absorb bursts of
+requests, short enough to bound that window.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from bson.objectid import ObjectId
+
+from app.db.mongodb import db
+from app.core.config import settings
+
+
+class UserCache:
+    """Bounded TTL cache of the authorization fields of users."""
+    
+    # 鉴权只需要这些字段
+    AUTH_PROJECTION = {"username": 1, "role": 1, "is_active": 1}
+    
+    def __init__(self, max_size: int, ttl: float):
+        """Initialize the cache.
+        
+        Args:
+            max_size: Maximum number of users kept
+            ttl: Seconds a cached user is used without checking the database
+        """
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._users: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # 每次失效时递增；读取数据库期间发生失效时不写入缓存
+        self._generation = 0
+    
+    async def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user's authorization fields.
+        
+        Args:
+            user_id: The user's ObjectId as a string
+        
+        Returns:
+            dict: A copy of the user with id, username, role and is_active, or None
+        """
+        if not ObjectId.is_valid(user_id):
+            return None
+        
+        entry = self._users.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._users.move_to_end(user_id)
+            return dict(entry[1])
+        
+        generation = self._generation
+        user = await db.db.users.find_one({"_id": ObjectId(user_id)}, self.AUTH_PROJECTION)
+        if user is None:
+            self._users.pop(user_id, None)
+            return None
+        
+        user["id"] = str(user["_id"])
+        if self.ttl > 0 and generation == self._generation:
+            self._users[user_id] = (time.monotonic() + self.ttl, user)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+        return dict(user)
+    
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user from this worker's cache, e.g. after their role or active state changed."""
+        self._generation += 1
+        self._users.pop(user_id, None)
+
+
+# Create a singleton user cache instance
+user_cache = UserCache(max_size=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
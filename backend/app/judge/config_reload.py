@@ -0,0 +1,82 @@
+"""Reload of the admin system configuration in every worker process.
+
+PUT /system-config applies LLM settings and evaluation policy overrides in
+the worker that served the request. Every save also increments the document's
+revision counter; each worker checks that counter every
+SYSTEM_CONFIG_RELOAD_INTERVAL seconds, reading only the revision field, and
+reloads and applies the whole document when it changed. Changes therefore
+reach all workers within the interval without a restart.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Any, Optional
+
+from pymongo.errors import PyMongoError
+
+from app.db.mongodb import db
+from app.core.config import settings
+from app.judge.llm_evaluator import llm_config
+from app.judge.llm_policy import evaluation_policy
+
+logger = logging.getLogger(__name__)
+
+# 系统配置文档的唯一ID
+SYSTEM_CONFIG_ID = "system_config"
+
+
+class SystemConfigReloader:
+    """Keeps the in-process LLM settings in sync with the system configuration document."""
+    
+    def __init__(self, interval: float):
+        """Initialize the reloader.
+        
+        Args:
+            interval: Seconds between checks of the configuration revision
+        """
+        self.interval = interval
+        self.revision: Optional[int] = None
+        self._watcher: Optional[asyncio.Task] = None
+    
+    async def start(self) -> None:
+        """Apply the stored configuration and start following its changes."""
+        await self.reload()
+        if self.interval > 0 and self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+    
+    async def stop(self) -> None:
+        """Stop following configuration changes."""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+    
+    async def reload(self) -> None:
+        """Read the configuration document and apply it."""
+        self.apply(await db.db.system_configs.find_one({"_id": SYSTEM_CONFIG_ID}))
+    
+    def apply(self, config: Optional[Dict[str, Any]]) -> None:
+        """Apply a configuration document to this worker.
+        
+        Args:
+            config: The system configuration document, may be None
+        """
+        llm_config.apply_system_config(config)
+        evaluation_policy.apply_system_config(config)
+        self.revision = (config or {}).get("revision", 0)
+    
+    async def _watch(self) -> None:
+        """Reload whenever another worker saved a new revision, until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                config = await db.db.system_configs.find_one({"_id": SYSTEM_CONFIG_ID}, {"revision": 1})
+                if (config or {}).get("revision", 0) != self.revision:
+                    await self.reload()
+                    logger.info("System configuration reloaded (revision %s)", self.revision)
+            except PyMongoError as e:
+                logger.warning("Could not check the system configuration: %s", e)
+
+
+# Create a singleton reloader instance
+system_config_reloader = SystemConfigReloader(interval=settings.SYSTEM_CONFIG_RELOAD_INTERVAL)
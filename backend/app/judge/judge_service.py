@@ -1,32 +1,40 @@
 import os
+import time
 import tempfile
 import shutil
 import asyncio
 import subprocess
+from datetime import datetime
 from bson.objectid import ObjectId
 import logging
 import re
 
 from app.db.mongodb import db
-from app.models.submission import JudgeStatus
+from app.db.problem_cache import problem_cache
+from app.db.leaderboard import leaderboard
+from app.models.submission import JudgeStatus, LLMEvaluationStatus
 from app.core.config import settings
-from app.judge.llm_evaluator import LLMEvaluator
-from app.judge.llm_evaluator import llm_evaluator as global_llm_evaluator
+from app.core.logger import correlation_scope
+from app.judge.llm_queue import llm_evaluation_queue
+from app.judge.llm_policy import evaluation_policy
+from app.judge.submission_events import submission_event_broker
+
+logger = logging.getLogger(__name__)
 
 # 检查Docker是否可用
 try:
     result = subprocess.run(["docker", "version"], capture_output=True, text=True)
     if result.returncode == 0:
         docker_available = True
-        print("Successfully connected to Docker daemon")
+        logger.info("Successfully connected to Docker daemon")
     else:
         docker_available = False
-        print(f"Warning: Docker connection error: {result.stderr}")
-        print("Judge service will be disabled. Make sure Docker is running and accessible.")
+        logger.warning("Docker connection error: %s", result.stderr)
+        logger.warning("Judge service will be disabled. Make sure Docker is running and accessible.")
 except Exception as e:
     docker_available = False
-    print(f"Warning: Docker connection error: {e}")
-    print("Judge service will be disabled. Make sure Docker is running and accessible.")
+    logger.warning("Docker connection error: %s", e)
+    logger.warning("Judge service will be disabled. Make sure Docker is running and accessible.")
 
 async def judge_submission(submission_id: str, problem_id: str, user_id: str):
     """
@@ -37,6 +45,12 @@ async def judge_submission(submission_id: str, problem_id: str, user_id: str):
         problem_id: Problem ID
         user_id: User ID
     """
+    # 评测过程中的所有日志都带上提交ID
+    with correlation_scope(submission_id):
+        await _judge_submission(submission_id, problem_id, user_id)
+
+async def _judge_submission(submission_id: str, problem_id: str, user_id: str):
+    """Judge a code submission; see judge_submission."""
     submissions_collection = db.db.submissions
     problems_collection = db.db.problems
     
@@ -45,14 +59,17 @@ async def judge_submission(submission_id: str, problem_id: str, user_id: str):
         {"_id": ObjectId(submission_id)},
         {"$set": {"status": JudgeStatus.JUDGING}}
     )
+    submission_event_broker.publish_status(submission_id, JudgeStatus.JUDGING)
     
     # Get submission and problem data
     submission = await submissions_collection.find_one({"_id": ObjectId(submission_id)})
-    problem = await problems_collection.find_one({"_id": ObjectId(problem_id)})
+    problem = await problem_cache.get(problem_id)
     
     # Extract code from submission
     code = submission["code"]
     
+    logger.debug("Judging submission for problem %s", problem_id)
+    
     # Check if Docker is available
     if not docker_available:
         await _update_submission_status(
@@ -62,46 +79,18 @@ async def judge_submission(submission_id: str, problem_id: str, user_id: str):
         )
         
         # Even if docker is unavailable, we can still provide LLM evaluation
-        try:
-            # 创建一个基本的测试结果对象，表明Docker不可用，未运行测试
-            dummy_test_results = [{
-                "id": "docker_unavailable",
-                "status": "SYSTEM_ERROR",
-                "actual_output": "Docker不可用，无法运行测试",
-                "expected_output": "N/A",
-                "test_case": {"name": "系统错误", "tag": "Docker不可用"}
-            }]
-            
-            llm_results = await llm_evaluator.evaluate_code(
-                code=code,
-                problem_description=problem["description"],
-                test_results=dummy_test_results
-            )
-            
-            # Update submission with LLM evaluation results
-            await submissions_collection.update_one(
-                {"_id": ObjectId(submission_id)},
-                {"$set": {"llm_evaluation": llm_results}}
-            )
-        except Exception as e:
-            print(f"LLM evaluation failed: {str(e)}")
-            # 创建前端可以显示的错误结果格式
-            error_result = {
-                "error": f"LLM评估遇到错误: {str(e)}",
-                "summary": "代码评估过程中遇到技术问题",
-                "code_standard": {"pros": [], "cons": ["评估失败"]},
-                "code_logic": {"pros": [], "cons": []},
-                "code_efficiency": {"pros": [], "cons": []},
-                "improvement_suggestions": ["由于技术原因无法提供详细建议"],
-                "overall_score": "N/A"
-            }
-            
-            # 更新提交记录，使用错误信息但保持前端期望的格式
-            await submissions_collection.update_one(
-                {"_id": ObjectId(submission_id)},
-                {"$set": {"llm_evaluation": error_result}}
-            )
-            
+        # 创建一个基本的测试结果对象，表明Docker不可用，未运行测试
+        dummy_test_results = [{
+            "id": "docker_unavailable",
+            "status": "SYSTEM_ERROR",
+            "actual_output": "Docker不可用，无法运行测试",
+            "expected_output": "N/A",
+            "test_case": {"name": "系统错误", "tag": "Docker不可用"}
+        }]
+        await _schedule_llm_evaluation(
+            submission_id, problem, user_id, JudgeStatus.SYSTEM_ERROR, dummy_test_results
+        )
+        
         return
     
     try:
@@ -112,18 +101,20 @@ async def judge_submission(submission_id: str, problem_id: str, user_id: str):
                 f.write(code)
             
             # Get problem test cases and metadata
-            test_cases = problem.get("test_cases", [])
+            test_data = await problem_cache.get_test_data(problem)
+            test_cases = test_data["test_cases"]
             time_limit = problem.get("time_limit", 1000)  # ms
             memory_limit = problem.get("memory_limit", 256)  # MB
             
             # Check if there's a special judge
             has_special_judge = problem.get("has_special_judge", False)
-            special_judge_code = problem.get("special_judge_code", "")
+            special_judge_code = test_data["special_judge_code"] or ""
             
             # Compile code
             compile_result = await _compile_code(temp_dir)
             
             if not compile_result["success"]:
+                logger.info("Verdict: %s", JudgeStatus.COMPILATION_ERROR.value)
                 # Update submission status to compilation error
                 await _update_submission_status(
                     submission_id, 
@@ -136,11 +127,12 @@ async def judge_submission(submission_id: str, problem_id: str, user_id: str):
             test_case_results = []
             passed_test_cases = 0
             final_status = JudgeStatus.ACCEPTED
+            reporter = _ProgressReporter(submission_id, len(test_cases))
             
             for i, test_case in enumerate(test_cases):
-                # 确保每个测试用例都有一个ID
+                # 确保每个测试用例都有一个ID；测试数据来自共享缓存，不能原地修改
                 if "id" not in test_case:
-                    test_case["id"] = f"tc{i+1}"
+                    test_case = dict(test_case, id=f"tc{i+1}")
                 
                 result = await _run_test_case(
                     temp_dir, 
@@ -152,6 +144,7 @@ async def judge_submission(submission_id: str, problem_id: str, user_id: str):
                 )
                 
                 test_case_results.append(result)
+                await reporter.record(result)
                 
                 if result["status"] != JudgeStatus.ACCEPTED:
                     final_status = result["status"]
@@ -159,72 +152,35 @@ async def judge_submission(submission_id: str, problem_id: str, user_id: str):
                 
                 passed_test_cases += 1
             
-            # After processing test cases, perform LLM evaluation
-            try:
-                # 添加非常明显的打印语句，确认这段代码确实被执行
-                print("\n!!!!!!! 准备调用LLM评估器 !!!!!!!!!")
-                print(f"\n!!!!!!! 提交ID: {submission_id} !!!!!!!!!")
-                print(f"\n!!!!!!! 测试用例结果数量: {len(test_case_results)} !!!!!!!!!\n")
-                
-                # Get problem description
-                problem_description = problem["description"]
-                
-                # 直接传递测试用例结果列表，而不是包装到字典中
-                print("\n!!!!!!! 正在调用llm_evaluator.evaluate_code !!!!!!!!!")
-                
-                # 重要修改：每次调用前创建新的评估器实例
-                # 这确保我们使用的是最新的代码，而不是服务启动时创建的单例
-                print("\n!!!!!!! 创建新的LLM评估器实例 !!!!!!!!!")
-                fresh_evaluator = LLMEvaluator()
-                
-                llm_results = await fresh_evaluator.evaluate_code(
-                    code=code,
-                    problem_description=problem_description,
-                    test_results=test_case_results
-                )
-                
-                print("\n!!!!!!! LLM评估完成 !!!!!!!!!")
-                print(f"\n!!!!!!! 返回结果类型: {type(llm_results)} !!!!!!!!!")
-                print(f"\n!!!!!!! 返回结果的键: {list(llm_results.keys()) if isinstance(llm_results, dict) else 'Not a dict'} !!!!!!!!!\n")
-                
-                # Update submission with LLM evaluation results
-                await submissions_collection.update_one(
-                    {"_id": ObjectId(submission_id)},
-                    {"$set": {"llm_evaluation": llm_results}}
-                )
-            except Exception as e:
-                print(f"LLM evaluation failed: {str(e)}")
-                # 创建前端可以显示的错误结果格式
-                error_result = {
-                    "error": f"LLM评估遇到错误: {str(e)}",
-                    "summary": "代码评估过程中遇到技术问题",
-                    "code_standard": {"pros": [], "cons": ["评估失败"]},
-                    "code_logic": {"pros": [], "cons": []},
-                    "code_efficiency": {"pros": [], "cons": []},
-                    "improvement_suggestions": ["由于技术原因无法提供详细建议"],
-                    "overall_score": "N/A"
-                }
-                
-                # 更新提交记录，使用错误信息但保持前端期望的格式
-                await submissions_collection.update_one(
-                    {"_id": ObjectId(submission_id)},
-                    {"$set": {"llm_evaluation": error_result}}
-                )
+            logger.info(
+                "Verdict: %s (%d/%d test cases passed)",
+                getattr(final_status, "value", final_status), passed_test_cases, len(test_cases)
+            )
             
             # Update submission with results
+            time_used = max([case["time_used"] for case in test_case_results]) if test_case_results else 0
+            memory_used = max([case["memory_used"] for case in test_case_results]) if test_case_results else 0
             await submissions_collection.update_one(
                 {"_id": ObjectId(submission_id)},
                 {"$set": {
                     "status": final_status,
                     "test_case_results": test_case_results,
-                    "time_used": max([case["time_used"] for case in test_case_results]) if test_case_results else 0,
-                    "memory_used": max([case["memory_used"] for case in test_case_results]) if test_case_results else 0
+                    "time_used": time_used,
+                    "memory_used": memory_used,
+                    "progress": reporter.progress
                 }}
             )
+            submission_event_broker.publish_status(
+                submission_id, final_status, time_used=time_used, memory_used=memory_used
+            )
+            
+            # LLM evaluation runs in the background after the verdict is published,
+            # or on demand, as decided by the evaluation policy
+            await _schedule_llm_evaluation(submission_id, problem, user_id, final_status)
             
             if final_status == JudgeStatus.ACCEPTED:
                 # Update user's solved problems if not already solved
-                await db.db.users.update_one(
+                solved = await db.db.users.update_one(
                     {
                         "_id": ObjectId(user_id),
                         "solved_problems": {"$ne": problem_id}
@@ -232,6 +188,14 @@ async def judge_submission(submission_id: str, problem_id: str, user_id: str):
                     {"$addToSet": {"solved_problems": problem_id}}
                 )
                 
+                # 第一次通过该题时计入排行榜
+                if solved.modified_count:
+                    try:
+                        await leaderboard.record_solve(user_id, problem, submission.get("submitted_at") or datetime.utcnow())
+                    except Exception:
+                        # 排行榜可通过重建恢复，不影响评测结果
+                        logger.exception("Could not update the leaderboard")
+                
                 # Update problem's accepted count (only count once per user)
                 user_accepted = await submissions_collection.find_one({
                     "problem_id": problem_id,
@@ -247,9 +211,86 @@ async def judge_submission(submission_id: str, problem_id: str, user_id: str):
                     )
             
     except Exception as e:
+        logger.exception("Judging failed")
         # Update submission status to system error
         await _update_submission_status(submission_id, JudgeStatus.SYSTEM_ERROR, str(e))
 
+class _ProgressReporter:
+    """
+    Report per-test progress of a submission being judged.
+    
+    Every result is published to watchers right away. Results are appended to
+    the submission in MongoDB at most once per JUDGE_PROGRESS_WRITE_INTERVAL,
+    so even problems with many quick tests cause only a few writes; the final
+    verdict write stores the complete results.
+    """
+    
+    def __init__(self, submission_id: str, total: int):
+        self.submission_id = submission_id
+        self.total = total
+        self.completed = 0
+        self.interval = settings.JUDGE_PROGRESS_WRITE_INTERVAL
+        self._pending = []
+        self._last_write = time.monotonic()
+    
+    @property
+    def progress(self) -> dict:
+        return {"completed": self.completed, "total": self.total}
+    
+    async def record(self, result: dict) -> None:
+        """Report the result of the next test case."""
+        self.completed += 1
+        self._pending.append(result)
+        submission_event_broker.publish_progress(self.submission_id, {
+            **self.progress,
+            "test_case_id": result.get("test_case_id"),
+            "status": result.get("status"),
+            "time_used": result.get("time_used", 0),
+            "memory_used": result.get("memory_used", 0)
+        })
+        
+        now = time.monotonic()
+        if now - self._last_write < self.interval:
+            return
+        
+        # 只追加上次写入之后的结果
+        self._last_write = now
+        pending, self._pending = self._pending, []
+        await db.db.submissions.update_one(
+            {"_id": ObjectId(self.submission_id)},
+            {
+                "$push": {"test_case_results": {"$each": pending}},
+                "$set": {"progress": self.progress}
+            }
+        )
+
+async def _schedule_llm_evaluation(submission_id: str, problem: dict, user_id: str, verdict: JudgeStatus, test_results: list = None):
+    """
+    Queue, defer or skip the LLM evaluation of a judged submission.
+    
+    Must run before the user's solved problems are updated, so the policy can
+    recognize accepted resubmissions.
+    
+    Args:
+        submission_id: Submission ID
+        problem: Problem document
+        user_id: User ID
+        verdict: Final judge status
+        test_results: Test results to evaluate against, defaults to the stored ones
+    """
+    decision, reason = await evaluation_policy.decide(problem, user_id, verdict)
+    logger.debug("LLM evaluation policy: %s (%s)", decision, reason)
+    
+    if decision == evaluation_policy.EAGER:
+        await llm_evaluation_queue.enqueue(submission_id, test_results)
+        return
+    
+    llm_status = LLMEvaluationStatus.ON_DEMAND if decision == evaluation_policy.LAZY else LLMEvaluationStatus.SKIPPED
+    await db.db.submissions.update_one(
+        {"_id": ObjectId(submission_id)},
+        {"$set": {"llm_evaluation_status": llm_status}}
+    )
+
 async def _update_submission_status(submission_id: str, status: JudgeStatus, error_message: str = None):
     """
     Update submission status.
@@ -267,6 +308,7 @@ async def _update_submission_status(submission_id: str, status: JudgeStatus, err
         {"_id": ObjectId(submission_id)},
         {"$set": update_data}
     )
+    submission_event_broker.publish_status(submission_id, status, error_message=error_message)
 
 async def _compile_code(temp_dir: str) -> dict:
     """
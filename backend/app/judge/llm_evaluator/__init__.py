@@ -15,6 +15,11 @@ from .models import (
     EvaluationResult
 )
 from .config import llm_config
+from .cache import evaluation_cache
+from .similarity import similarity_index, SimilarityIndex
+from .scheduler import llm_scheduler, CircuitOpenError
+from .router import llm_router, LLMRouter, LLMEndpoint
+from .replay import llm_replay, LLMReplay, ReplayMissError
 
 __all__ = [
     # Main evaluator instance and class
@@ -30,5 +35,26 @@ __all__ = [
     "EvaluationResult",
     
     # Config
-    "llm_config"
+    "llm_config",
+    
+    # Cache
+    "evaluation_cache",
+    
+    # Near-duplicate reuse
+    "similarity_index",
+    "SimilarityIndex",
+    
+    # Scheduler
+    "llm_scheduler",
+    "CircuitOpenError",
+    
+    # Router
+    "llm_router",
+    "LLMRouter",
+    "LLMEndpoint",
+    
+    # Replay
+    "llm_replay",
+    "LLMReplay",
+    "ReplayMissError"
 ]
@@ -0,0 +1,238 @@
+"""Persistent cache of LLM evaluation results.
+
+Identical submissions (up to whitespace and comments) with the same verdict
+receive identical feedback, so evaluations are stored in MongoDB keyed by the
+problem revision, a normalized code hash, the test-result signature, the
+prompt version and the model.
+"""
+
+import re
+import hashlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+
+from pymongo import ASCENDING
+
+from app.db.mongodb import db
+from app.core.config import settings
+from .prompts import PROMPT_VERSION
+
+
+# C++ 词法单元：字符串/字符字面量、注释、多字符运算符、其他非空白片段
+# 多字符运算符必须作为一个词法单元，否则 "a--b" 与 "a - -b"、"x+=1" 与 "x+ =1" 规范化后相同
+_CPP_TOKEN_PATTERN = re.compile(
+    r'"(?:\\.|[^"\\\n])*"'        # string literal
+    r"|'(?:\\.|[^'\\\n])*'"       # char literal
+    r"|//[^\n]*"                  # line comment
+    r"|/\*[\s\S]*?(?:\*/|$)"      # block comment
+    r"|[A-Za-z_]\w*|\d[\w.]*"     # identifier / number
+    r"|<<=|>>=|<=>|->\*|\.\.\."   # three-character operators
+    r"|->|\+\+|--|<<|>>|<=|>=|==|!=|&&|\|\||::|\.\*|##"
+    r"|[-+*/%&|^]="               # compound assignment
+    r"|\S"                        # any other single character
+)
+
+
+def tokenize_code(code: str) -> List[str]:
+    """Split C++ code into tokens, dropping comments.
+    
+    Args:
+        code: Source code
+    
+    Returns:
+        list: The code's tokens in order
+    """
+    return [
+        token for token in _CPP_TOKEN_PATTERN.findall(code)
+        if not token.startswith("//") and not token.startswith("/*")
+    ]
+
+
+def normalize_code(code: str) -> str:
+    """Normalize C++ code so whitespace and comment changes do not matter.
+    
+    Args:
+        code: Source code
+    
+    Returns:
+        str: Tokens without comments, joined by single spaces
+    """
+    return " ".join(tokenize_code(code))
+
+
+def test_result_signature(test_results: Optional[List[Dict[str, Any]]]) -> str:
+    """Build a compact signature of the verdict of every test case.
+    
+    Args:
+        test_results: Test results as stored on the submission
+    
+    Returns:
+        str: Signature such as "tc1:accepted|tc2:wrong_answer"
+    """
+    if not test_results:
+        return ""
+    
+    return "|".join(
+        f"{result.get('test_case_id', result.get('id', i))}:{result.get('status', '')}"
+        for i, result in enumerate(test_results)
+    )
+
+
+class EvaluationCache:
+    """MongoDB-backed evaluation cache with TTL and size-based eviction."""
+    
+    COLLECTION = "llm_evaluation_cache"
+    
+    def __init__(self, ttl_seconds: int, max_entries: int, enabled: bool = True):
+        """Initialize the cache.
+        
+        Args:
+            ttl_seconds: Time to live of each entry
+            max_entries: Maximum number of entries before the least recently
+                used ones are evicted
+            enabled: Whether the cache is used at all
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+    
+    @property
+    def _collection(self):
+        """Get the cache collection, or None when the database is not connected."""
+        if not self.enabled or db.db is None:
+            return None
+        return db.db[self.COLLECTION]
+    
+    async def ensure_indexes(self) -> None:
+        """Create the TTL and eviction indexes."""
+        collection = self._collection
+        if collection is None:
+            return
+        
+        # MongoDB删除expires_at之后的条目
+        await collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+        await collection.create_index([("last_hit_at", ASCENDING)])
+    
+    def make_key(
+            self,
+            code: str,
+            problem_revision: str,
+            test_results: Optional[List[Dict[str, Any]]],
+            model_name: str,
+            prompt_version: str = PROMPT_VERSION
+        ) -> str:
+        """Build the cache key for an evaluation.
+        
+        Args:
+            code: Submitted code
+            problem_revision: Revision of the problem (e.g. its updated_at)
+            test_results: Test results of the submission
+            model_name: LLM model used for the evaluation
+            prompt_version: Version of the prompt templates
+        
+        Returns:
+            str: Hex digest identifying the evaluation
+        """
+        code_hash = hashlib.sha256(normalize_code(code).encode("utf-8")).hexdigest()
+        parts = [
+            problem_revision,
+            code_hash,
+            test_result_signature(test_results),
+            prompt_version,
+            model_name
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached evaluation.
+        
+        Args:
+            key: Cache key from make_key
+        
+        Returns:
+            Optional[Dict[str, Any]]: The cached evaluation, or None on a miss
+        """
+        collection = self._collection
+        if collection is None:
+            return None
+        
+        now = datetime.utcnow()
+        entry = await collection.find_one_and_update(
+            {"_id": key, "expires_at": {"$gt": now}},
+            {"$set": {"last_hit_at": now}, "$inc": {"hits": 1}},
+            projection={"result": 1}
+        )
+        
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        return entry["result"]
+    
+    async def set(self, key: str, result: Dict[str, Any]) -> None:
+        """Store an evaluation and evict old entries if the cache is full.
+        
+        Args:
+            key: Cache key from make_key
+            result: Evaluation result to store
+        """
+        collection = self._collection
+        if collection is None:
+            return
+        
+        now = datetime.utcnow()
+        await collection.replace_one(
+            {"_id": key},
+            {
+                "result": result,
+                "created_at": now,
+                "last_hit_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds),
+                "hits": 0
+            },
+            upsert=True
+        )
+        self.stores += 1
+        
+        # 每存储一定数量的条目检查一次容量，避免每次写入都计数
+        if self.stores % 100 == 0:
+            await self._evict()
+    
+    async def _evict(self) -> None:
+        """Delete the least recently used entries beyond max_entries."""
+        collection = self._collection
+        excess = await collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        
+        cursor = collection.find({}, {"_id": 1}).sort("last_hit_at", ASCENDING).limit(excess)
+        keys = [entry["_id"] async for entry in cursor]
+        if keys:
+            result = await collection.delete_many({"_id": {"$in": keys}})
+            self.evictions += result.deleted_count
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache hit-rate statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions
+        }
+
+
+# Create a singleton cache instance
+evaluation_cache = EvaluationCache(
+    ttl_seconds=settings.LLM_CACHE_TTL,
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    enabled=settings.LLM_CACHE_ENABLED
+)
@@ -1,13 +1,23 @@
 """Configuration module for LLM-based code evaluation."""
 
 import os
-from typing import Optional
+import logging
+from typing import Optional, Dict, Any
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 class LLMConfig:
     """Configuration for LLM-based code evaluation."""
     
+    # 可在运行时热更新的字段（来自系统配置）
+    RELOADABLE_FIELDS = ("model_name", "api_base", "temperature", "request_timeout", "evaluation_mode")
+    
+    # 评估模式：双步（错误分析 + 改进建议）或单次结构化请求
+    MODE_TWO_STEP = "two_step"
+    MODE_SINGLE_CALL = "single_call"
+    
     def __init__(self):
         """Initialize LLM configuration with default values."""
         # Default model
@@ -27,6 +37,23 @@ class LLMConfig:
         # LLM parameters
         self.temperature = 0.2
         self.response_format_json = True
+        
+        # Evaluation mode, plus verdicts that always use a single call
+        self.evaluation_mode = settings.LLM_EVALUATION_MODE
+        self.single_call_verdicts = {
+            verdict.strip() for verdict in settings.LLM_SINGLE_CALL_VERDICTS.split(",") if verdict.strip()
+        }
+        
+        # HTTP client parameters
+        self.request_timeout = settings.LLM_REQUEST_TIMEOUT  # seconds, per LLM call
+        self.max_connections = settings.LLM_MAX_CONNECTIONS
+        self.keepalive_expiry = 60.0  # seconds
+        
+        # Expected completion tokens per call, used for token rate limiting
+        self.response_token_estimate = settings.LLM_RESPONSE_TOKEN_ESTIMATE
+        
+        # Incremented on every update so long-lived clients know to rebuild
+        self.revision = 0
     
     @property
     def api_key(self) -> str:
@@ -43,7 +70,66 @@ class LLMConfig:
         # 设置API基础URL（如果不是默认值）
         if self._api_base != "https://api.openai.com/v1":
             os.environ["OPENAI_API_BASE"] = self._api_base
-            print(f"使用API基础URL: {self._api_base}")
+            logger.info("使用API基础URL: %s", self._api_base)
+    
+    def update(self, **kwargs: Any) -> bool:
+        """Update reloadable settings in place.
+        
+        Args:
+            **kwargs: Any of model_name, api_base, temperature, request_timeout;
+                None values are ignored
+        
+        Returns:
+            bool: True if anything changed
+        """
+        changed = False
+        for field, value in kwargs.items():
+            if field not in self.RELOADABLE_FIELDS or value is None:
+                continue
+            
+            attr = "_api_base" if field == "api_base" else field
+            if getattr(self, attr) != value:
+                setattr(self, attr, value)
+                changed = True
+        
+        if changed:
+            self.revision += 1
+            logger.info("LLM配置已更新 (revision %d): 模型=%s, API基础URL=%s", self.revision, self.model_name, self._api_base)
+        
+        return changed
+    
+    def apply_system_config(self, config: Optional[Dict[str, Any]]) -> bool:
+        """Apply LLM overrides stored in the system configuration document.
+        
+        Args:
+            config: The system configuration document, may be None
+        
+        Returns:
+            bool: True if anything changed
+        """
+        if not config:
+            return False
+        
+        return self.update(
+            model_name=config.get("llm_model_name"),
+            api_base=config.get("llm_api_base"),
+            temperature=config.get("llm_temperature"),
+            request_timeout=config.get("llm_request_timeout"),
+            evaluation_mode=config.get("llm_evaluation_mode")
+        )
+    
+    def get_evaluation_mode(self, verdict: Optional[str] = None) -> str:
+        """Get the evaluation mode for a submission.
+        
+        Args:
+            verdict: The submission's verdict, e.g. "accepted"
+        
+        Returns:
+            str: MODE_SINGLE_CALL or MODE_TWO_STEP
+        """
+        if self.evaluation_mode == self.MODE_SINGLE_CALL or verdict in self.single_call_verdicts:
+            return self.MODE_SINGLE_CALL
+        return self.MODE_TWO_STEP
     
     def get_model_kwargs(self) -> dict:
         """Get model parameters for LangChain."""
@@ -1,103 +1,229 @@
 """Core evaluator module for LLM-based code evaluation."""
 
 import json
-import uuid
-import traceback
-from typing import Dict, List, Any, Optional
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Dict, List, Any, Callable, Optional
 
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 
+from app.core.logger import log_payload
 from .config import llm_config
-from .prompts import ERROR_ANALYSIS_PROMPT, IMPROVEMENT_PROMPT
+from .cache import evaluation_cache
+from .similarity import similarity_index
+from .scheduler import llm_scheduler
+from .router import llm_router, LLMRouter, LLMEndpoint
+from .replay import llm_replay
+from .prompts import ERROR_ANALYSIS_PROMPT, IMPROVEMENT_PROMPT, COMBINED_EVALUATION_PROMPT, PROMPT_VERSION
 from .models import EvaluationResult, ErrorAnalysis, ImprovementSuggestion
 from .utils import (
     parse_llm_response,
     direct_json_parse,
-    format_test_results,
+    prompt_builder,
+    count_tokens,
     create_error_response,
     create_fallback_response
 )
 
 
+logger = logging.getLogger(__name__)
+
+# Progress callback: receives an event name ("step", "token", "section") and its data
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+# 各提示词要求返回的JSON键名，用于在响应的说明文字中找到正确的JSON对象
+ERROR_ANALYSIS_KEYS = ("error_types", "explanation", "error_details")
+IMPROVEMENT_KEYS = ("improvement_suggestions", "summary", "overall_score")
+
+
 class LLMEvaluator:
-    """Class for evaluating code using a Large Language Model."""
+    """Class for evaluating code using a Large Language Model.
+    
+    A single long-lived instance is shared by all evaluations. Calls go
+    through an LLMRouter, which keeps one keep-alive HTTP connection pool,
+    picks an endpoint per verdict and rebuilds chat models lazily when
+    llm_config changes, so configuration can be hot-reloaded without creating
+    a new evaluator.
+    """
     
-    def __init__(self, model_name: str = None):
+    def __init__(self, model_name: str = None, router: Optional[LLMRouter] = None):
         """Initialize the LLM evaluator.
         
         Args:
-            model_name: Optional name of the LLM model to use, defaults to config value
+            model_name: Optional name of the LLM model to use; routes every call
+                to a single endpoint with this model
+            router: Optional endpoint router, defaults to the shared llm_router
         """
-        # Use provided model name or default from config
-        self.model_name = model_name or llm_config.model_name
-        
-        # Set up environment variables
-        llm_config.setup_environment()
-        
-        # Initialize LangChain chat model
-        self.chat_model = ChatOpenAI(
-            api_key=llm_config.api_key,
-            model=self.model_name,
-            temperature=llm_config.temperature,
-            model_kwargs=llm_config.get_model_kwargs()
-        )
+        if router is None:
+            router = LLMRouter([LLMEndpoint("default", model=model_name)]) if model_name else llm_router
+        self.router = router
         
         # Define prompt templates
         self.error_analysis_template = PromptTemplate.from_template(ERROR_ANALYSIS_PROMPT)
         self.improvement_template = PromptTemplate.from_template(IMPROVEMENT_PROMPT)
+        self.combined_template = PromptTemplate.from_template(COMBINED_EVALUATION_PROMPT)
+        
+        # Tokens used by the largest template, reserved from the prompt budget
+        self._template_tokens = max(
+            count_tokens(template)
+            for template in (ERROR_ANALYSIS_PROMPT, IMPROVEMENT_PROMPT, COMBINED_EVALUATION_PROMPT)
+        )
+    
+    @property
+    def model_name(self) -> str:
+        """Get the models used for evaluation by default."""
+        return self.router.route_models()
+    
+    async def aclose(self) -> None:
+        """Close the router's HTTP connection pool."""
+        await self.router.aclose()
     
     async def evaluate_code(
             self, 
             code: str, 
             problem_description: str,
-            test_results: Optional[List[Dict[str, Any]]] = None
+            test_results: Optional[List[Dict[str, Any]]] = None,
+            problem_revision: Optional[str] = None,
+            verdict: Optional[str] = None,
+            on_event: Optional[EventCallback] = None
         ) -> Dict[str, Any]:
-        """Evaluate code using the LLM with a two-step process.
+        """Evaluate code using the LLM.
+        
+        Uses either the two-step process (error analysis, then improvement
+        suggestions) or a single structured request, depending on
+        llm_config.get_evaluation_mode. Results are served from the evaluation
+        cache when an equivalent submission was already evaluated.
         
         Args:
             code: The code to evaluate
             problem_description: The problem description
             test_results: Optional test results to include in the evaluation
+            problem_revision: Optional problem revision used in the cache key,
+                defaults to a hash of the problem description
+            verdict: Optional overall verdict used to select the evaluation
+                mode, derived from test_results when omitted
+            on_event: Optional callback receiving progress events; when given,
+                LLM responses are streamed and reported token by token
             
         Returns:
             dict: The evaluation results
         """
         try:
-            # 调试标记：每次请求显示唯一ID，帮助跟踪调用是否真的发生
-            request_id = str(uuid.uuid4())[:8]
-            print(f"===== 开始LLM评估 [ID:{request_id}] =====")
+            logger.debug("开始LLM评估")
             
-            # 检查API密钥是否配置
-            if not llm_config.api_key:
-                print("警告: 未配置API密钥，无法进行LLM评估")
-                return create_error_response("未配置OpenAI API密钥")
+            # 检查是否有可用的端点：端点自己的密钥、全局OPENAI_API_KEY或无需密钥的本地端点
+            if not self.router.configured and not llm_replay.replaying:
+                logger.warning("没有配置API密钥的LLM端点，无法进行LLM评估")
+                return create_error_response("未配置LLM API密钥")
                 
-            # 格式化测试结果
-            formatted_test_results = format_test_results(test_results) if test_results else "无测试结果"
+            # LLM服务持续故障时熔断，直接放弃评估以减轻负载
+            if not llm_scheduler.available:
+                logger.warning("LLM服务熔断中，跳过本次评估")
+                return create_error_response("AI评估服务繁忙，请稍后再试")
             
             # 如果没有测试结果，直接返回一个错误响应
             if not test_results or len(test_results) == 0:
-                print("无测试结果，无法进行评估")
+                logger.info("无测试结果，无法进行评估")
                 return create_error_response("AI评估服务暂时不可用")
                 
+            # 查询评估缓存：相同题目版本、等价代码和相同测试结果可以复用评估
+            if problem_revision is None:
+                problem_revision = hashlib.sha256(problem_description.encode("utf-8")).hexdigest()
+            if verdict is None:
+                verdict = self._derive_verdict(test_results)
+            mode = llm_config.get_evaluation_mode(verdict)
+            model_name = self.router.route_models(verdict)
+            prompt_version = f"{PROMPT_VERSION}:{mode}"
+            cache_key = evaluation_cache.make_key(
+                code, problem_revision, test_results, model_name, prompt_version=prompt_version
+            )
+            cached_result = await evaluation_cache.get(cache_key)
+            if cached_result is not None:
+                logger.debug("命中评估缓存")
+                return cached_result
+            
+            # 查找同一题目、相同评测结果的近似重复提交，复用其评估
+            similar_result, signature = await similarity_index.find(
+                code, problem_revision, test_results, model_name, prompt_version
+            )
+            if similar_result is not None:
+                await evaluation_cache.set(cache_key, similar_result)
+                return similar_result
+            
+            # 在token预算内构建提示输入：压缩题目描述，截断过长的输入输出，只保留失败用例和少量通过用例
+            prompt_inputs = prompt_builder.build(
+                code, problem_description, test_results, reserved_tokens=self._template_tokens
+            )
+            prompt_code = prompt_inputs["code"]
+            prompt_description = prompt_inputs["problem_description"]
+            formatted_test_results = prompt_inputs["test_results"]
+            
+            # 单次结构化评估：一次请求同时得到错误分析和改进建议
+            if mode == llm_config.MODE_SINGLE_CALL:
+                logger.debug("使用单次结构化评估")
+                evaluation = await self._safe_combined_analysis(
+                    prompt_code, prompt_description, formatted_test_results, verdict, on_event
+                )
+                if evaluation is None:
+                    logger.warning("单次结构化评估失败")
+                    return create_error_response("AI评估服务暂时不可用")
+                
+                self._ensure_evaluation_fields(evaluation)
+                result = {
+                    "error_types": evaluation.get("error_types", []),
+                    "explanation": evaluation.get("explanation", ""),
+                    "error_details": evaluation.get("error_details", []),
+                    "improvement_suggestions": evaluation.get("improvement_suggestions", []),
+                    "overall_score": str(evaluation.get("overall_score", "0")),
+                    "summary": evaluation.get("summary", "")
+                }
+                
+                # 保留API错误，使评估被记为失败
+                if "error" in evaluation:
+                    result["error"] = evaluation["error"]
+                else:
+                    await evaluation_cache.set(cache_key, result)
+                    await similarity_index.add(
+                        code, problem_revision, test_results, model_name, prompt_version, result, signature
+                    )
+                
+                return result
+            
             # 使用双步评估
             try:
-                print("开始第一步：错误分析")
+                logger.debug("开始第一步：错误分析")
                 # 第一步：错误分析 - 使用安全的封装方法
-                error_analysis = await self._safe_error_analysis(code, problem_description, formatted_test_results)
+                error_analysis = await self._safe_error_analysis(
+                    prompt_code, prompt_description, formatted_test_results, verdict, on_event
+                )
                 if error_analysis is None:
-                    print("错误分析失败，评估终止")
+                    logger.warning("错误分析失败，评估终止")
                     return create_error_response("AI评估服务暂时不可用")
                 
-                print("开始第二步：改进建议")
+                # API调用失败时不再请求改进建议
+                if "error" in error_analysis:
+                    logger.warning("错误分析API调用失败，评估终止")
+                    result = create_error_response(error_analysis["error"])
+                    result.update({
+                        "error_types": error_analysis.get("error_types", []),
+                        "explanation": error_analysis.get("explanation", "")
+                    })
+                    return result
+                
+                # 错误分析可以先行展示，无需等待改进建议
+                if on_event is not None:
+                    on_event("section", {"step": "error_analysis", "data": error_analysis})
+                
+                logger.debug("开始第二步：改进建议")
                 # 第二步：改进建议 - 使用安全的封装方法
                 improvement_data = await self._safe_improvement_analysis(
-                    code, problem_description, formatted_test_results, error_analysis
+                    prompt_code, prompt_description, formatted_test_results, error_analysis, verdict, on_event
                 )
                 
                 if improvement_data is None:
-                    print("改进建议分析失败，使用错误分析结果构建基本响应")
+                    logger.warning("改进建议分析失败，使用错误分析结果构建基本响应")
                     # 使用错误分析结果构建一个基本响应
                     return {
                         "error_types": error_analysis.get("error_types", []),
@@ -124,129 +250,97 @@ class LLMEvaluator:
                     "summary": improvement_data.get("summary", "")
                 }
                 
+                # 仅缓存完整且没有API错误的评估结果，API错误保留在结果中使评估被记为失败
+                if "error" in improvement_data:
+                    result["error"] = improvement_data["error"]
+                else:
+                    await evaluation_cache.set(cache_key, result)
+                    await similarity_index.add(
+                        code, problem_revision, test_results, model_name, prompt_version, result, signature
+                    )
+                
                 return result
             except Exception as e:
-                print("\n====== 双步评估异常详细堆栈 ======")
-                traceback.print_exc()
-                print(f"双步评估过程中出现错误: {type(e).__name__}: {str(e)}")
-                print("====================================\n")
+                logger.exception("双步评估过程中出现错误: %s: %s", type(e).__name__, e)
                 
                 # 返回错误响应
                 return create_error_response("AI评估服务暂时不可用")
         except Exception as e:
-            print("\n====== LLM评估总体异常 ======")
-            traceback.print_exc()
-            print(f"LLM评估过程中出现错误: {type(e).__name__}: {str(e)}")
-            print("====================================\n")
+            logger.exception("LLM评估过程中出现错误: %s: %s", type(e).__name__, e)
             
             # 提供一个默认响应
             return create_error_response("AI评估服务暂时不可用")
             
-    async def _safe_error_analysis(self, code: str, problem_description: str, test_results: str) -> Optional[Dict[str, Any]]:
+    async def _safe_error_analysis(
+            self,
+            code: str,
+            problem_description: str,
+            test_results: str,
+            verdict: Optional[str] = None,
+            on_event: Optional[EventCallback] = None
+        ) -> Optional[Dict[str, Any]]:
         """安全地执行错误分析，处理所有可能的异常
         
         Args:
             code: 待评估代码
             problem_description: 问题描述
             test_results: 格式化的测试结果
+            verdict: 评测结果，用于选择LLM端点
+            on_event: 进度回调，用于流式推送生成内容
             
         Returns:
             Optional[Dict[str, Any]]: 成功时返回分析结果，失败时返回None
         """
         try:
-            print("\n===== SAFE_ERROR_ANALYSIS 方法开始执行 =====\n")
-            
             # 格式化提示模板
-            print("正在格式化提示模板...")
             formatted_prompt = self.error_analysis_template.format(
                 problem_description=problem_description,
                 code=code,
                 test_results=test_results
             )
-            print("提示模板格式化完成.")
-            
-            # 打印 LLM 配置状态
-            print("\n===== LLM 配置信息 =====")
-            print(f"模型: {self.model_name}")
-            print(f"API基础URL: {llm_config.api_base}")
-            print(f"API密钥前5位: {llm_config.api_key[:5]}... (总长度: {len(llm_config.api_key)})")
-            print("=========================\n")
             
             # 调用API
-            print("开始调用 LLM API...")
             try:
-                analysis_result = await self._call_llm_api(formatted_prompt)
-                print("LLM API 调用成功完成.")
+                analysis_result = await self._call_llm_api(formatted_prompt, verdict, "error_analysis", on_event)
             except Exception as api_err:
-                print(f"\n===== LLM API 调用时出错 =====\n")
-                print(f"错误类型: {type(api_err).__name__}")
-                print(f"错误信息: {str(api_err)}")
-                traceback.print_exc()
-                print("\n============================\n")
+                logger.exception("错误分析调用LLM API时出错: %s: %s", type(api_err).__name__, api_err)
                 
                 # 构造一个模拟错误响应，便于调试
                 sample_error_result = {
+                    "error": f"API调用失败: {type(api_err).__name__}: {str(api_err)}",
                     "error_types": ["API调用错误"],
                     "explanation": f"API调用失败: {str(api_err)}",
                     "error_details": [{"location": "API调用", "description": str(api_err)}]
                 }
                 return sample_error_result
             
-            # 打印原始响应，帮助调试
-            print("\n====== LLM原始响应(错误分析) ======")
-            print(f"\n{analysis_result}\n")
-            print("======================================\n")
-            
-            # 打印响应的字节表示，帮助调试不可见字符
-            print("\n====== 原始响应的字节表示 ======")
-            print(repr(analysis_result))
-            print("======================================\n")
-            
             # 解析结果处理
-            print("开始解析 LLM 响应...")
             try:
-                error_analysis = direct_json_parse(analysis_result)
-                print("错误分析解析成功! 返回的键:")
-                print(list(error_analysis.keys()))
+                error_analysis = direct_json_parse(analysis_result, ERROR_ANALYSIS_KEYS)
+                logger.debug("错误分析解析成功，返回的键: %s", list(error_analysis.keys()))
                 return error_analysis
             except KeyError as ke:
-                print(f"\n===== JSON解析中的KeyError =====\n")
-                print(f"KeyError: {str(ke)}")
-                print(f"尝试手动处理KeyError问题...")
+                logger.warning("错误分析JSON解析中的KeyError: %s", ke)
                 
                 # 检查常见模式：\n "error_types"
                 if '\n "error_types"' in str(ke):
-                    print("检测到问题模式: '\\n \"error_types\"'")
-                    
-                    # 尝试手动解析JSON
-                    try:
-                        # 使用正则表达式或其他方法提取所需字段
-                        import re
-                        # 构造一个基本响应对象
-                        return {
-                            "error_types": ["解析错误"],
-                            "explanation": "LLM返回了格式不正确的JSON",
-                            "error_details": [{
-                                "location": "JSON解析", 
-                                "description": "键名包含前导空格和换行符"
-                            }]
-                        }
-                    except Exception as manual_err:
-                        print(f"手动解析也失败: {str(manual_err)}")
+                    # 构造一个基本响应对象
+                    return {
+                        "error_types": ["解析错误"],
+                        "explanation": "LLM返回了格式不正确的JSON",
+                        "error_details": [{
+                            "location": "JSON解析", 
+                            "description": "键名包含前导空格和换行符"
+                        }]
+                    }
             except Exception as parse_err:
-                print(f"\n===== JSON解析错误 =====\n")
-                print(f"错误类型: {type(parse_err).__name__}")
-                print(f"错误信息: {str(parse_err)}")
-                traceback.print_exc()
+                logger.warning("错误分析JSON解析错误: %s: %s", type(parse_err).__name__, parse_err)
+                log_payload(logger, "无法解析的LLM响应(错误分析)", repr(analysis_result), sample_rate=1.0)
         except Exception as e:
-            print(f"\n===== 错误分析总体失败 =====\n")
-            print(f"错误类型: {type(e).__name__}")
-            print(f"错误信息: {str(e)}")
-            traceback.print_exc()
-            print("\n===========================\n")
+            logger.exception("错误分析失败: %s: %s", type(e).__name__, e)
         
         # 如果执行到这里，说明所有尝试都失败了
-        print("所有错误分析尝试都失败，返回None")
+        logger.warning("所有错误分析尝试都失败，返回None")
         return None
     
     async def _safe_improvement_analysis(
@@ -254,7 +348,9 @@ class LLMEvaluator:
             code: str, 
             problem_description: str, 
             test_results: str, 
-            error_analysis: Dict[str, Any]
+            error_analysis: Dict[str, Any],
+            verdict: Optional[str] = None,
+            on_event: Optional[EventCallback] = None
         ) -> Optional[Dict[str, Any]]:
         """安全地执行改进建议分析，处理所有可能的异常
         
@@ -263,6 +359,8 @@ class LLMEvaluator:
             problem_description: 问题描述
             test_results: 格式化的测试结果
             error_analysis: 错误分析结果
+            verdict: 评测结果，用于选择LLM端点
+            on_event: 进度回调，用于流式推送生成内容
             
         Returns:
             Optional[Dict[str, Any]]: 成功时返回改进建议，失败时返回None
@@ -277,63 +375,125 @@ class LLMEvaluator:
             )
             
             # 调用API
-            improvement_result = await self._call_llm_api(formatted_prompt)
+            improvement_result = await self._call_llm_api(formatted_prompt, verdict, "improvement", on_event)
             
             # 解析结果
-            improvement_data = direct_json_parse(improvement_result)
-            print("改进建议解析成功")
+            improvement_data = direct_json_parse(improvement_result, IMPROVEMENT_KEYS)
+            logger.debug("改进建议解析成功")
             return improvement_data
         except Exception as e:
-            print(f"改进建议分析失败: {type(e).__name__}: {str(e)}")
+            logger.warning("改进建议分析失败: %s: %s", type(e).__name__, e)
             return None
             
 
-    async def _call_llm_api(self, prompt: str) -> str:
+    async def _safe_combined_analysis(
+            self,
+            code: str,
+            problem_description: str,
+            test_results: str,
+            verdict: Optional[str] = None,
+            on_event: Optional[EventCallback] = None
+        ) -> Optional[Dict[str, Any]]:
+        """安全地执行单次结构化评估，处理所有可能的异常
+        
+        Args:
+            code: 待评估代码
+            problem_description: 问题描述
+            test_results: 格式化的测试结果
+            verdict: 评测结果，用于选择LLM端点
+            on_event: 进度回调，用于流式推送生成内容
+        
+        Returns:
+            Optional[Dict[str, Any]]: 成功时返回包含错误分析和改进建议的结果，失败时返回None
+        """
+        try:
+            formatted_prompt = self.combined_template.format(
+                problem_description=problem_description,
+                code=code,
+                test_results=test_results
+            )
+            
+            evaluation_result = await self._call_llm_api(formatted_prompt, verdict, "combined", on_event)
+            
+            evaluation = direct_json_parse(evaluation_result, ERROR_ANALYSIS_KEYS + IMPROVEMENT_KEYS)
+            logger.debug("单次结构化评估解析成功")
+            return evaluation
+        except Exception as e:
+            logger.warning("单次结构化评估失败: %s: %s", type(e).__name__, e)
+            return None
+    
+    @staticmethod
+    def _derive_verdict(test_results: Optional[List[Dict[str, Any]]]) -> str:
+        """Derive the overall verdict from test results.
+        
+        Args:
+            test_results: Test results in judge order
+        
+        Returns:
+            str: The first non-accepted status, or "accepted"
+        """
+        for result in test_results or []:
+            status = result.get("status", "")
+            status = str(getattr(status, "value", status)).lower()
+            if status and status != "accepted":
+                return status
+        return "accepted"
+    
+    async def _call_llm_api(
+            self,
+            prompt: str,
+            verdict: Optional[str] = None,
+            step: Optional[str] = None,
+            on_event: Optional[EventCallback] = None
+        ) -> str:
         """Call the LLM API with a prompt using LangChain.
         
         Args:
             prompt: The prompt to send to the API
+            verdict: Optional verdict of the submission, used to route the call
+            step: Optional evaluation step name reported in progress events
+            on_event: Optional progress callback; when given the response is
+                streamed and each chunk is reported as a "token" event
             
         Returns:
             str: The response text
         """
         try:
-            # 打印配置信息以进行调试
-            print("\n====== LLM配置信息 ======")
-            print(f"模型名称: {self.model_name}")
-            print(f"API基础URL: {llm_config.api_base}")
-            print(f"API密钥: {llm_config.api_key[:5]}...{llm_config.api_key[-4:] if len(llm_config.api_key) > 9 else ''}")
-            print(f"温度: {llm_config.temperature}")
-            print(f"响应格式JSON: {llm_config.response_format_json}")
-            print(f"模型参数: {llm_config.get_model_kwargs()}")
-            print("==============================\n")
+            # 完整提示词只在DEBUG级别按采样率记录
+            log_payload(logger, f"发送给LLM的提示({step})", prompt)
             
-            # 使用LangChain调用LLM
-            print("\n====== 发送给LLM的提示 ======")
-            print(prompt[:500] + "..." if len(prompt) > 500 else prompt)  # 防止过长
-            print("==============================\n")
+            # 回放模式：直接返回录制的响应，不访问网络
+            if llm_replay.replaying:
+                response = await llm_replay.replay(prompt)
+                if on_event is not None:
+                    on_event("step", {"step": step})
+                    on_event("token", {"step": step, "text": response})
+                return response
             
-            print("开始调用LLM API...")
-            response = await self.chat_model.apredict(prompt)
-            print("LLM API调用完成!")
+            started = time.monotonic()
+            # 通过调度器调用：限流、并发上限、退避重试和熔断；路由器选择端点并在失败时切换
+            response = await llm_scheduler.run(
+                lambda: self.router.invoke(
+                    lambda chat_model: asyncio.wait_for(
+                        self._generate(chat_model, prompt, step, on_event),
+                        timeout=llm_config.request_timeout
+                    ),
+                    verdict
+                ),
+                estimated_tokens=count_tokens(prompt) + llm_config.response_token_estimate
+            )
+            latency = time.monotonic() - started
+            logger.debug("LLM API调用完成: step=%s, %.2fs, %d字符", step, latency, len(response))
             
-            # 打印原始响应，无论是否发生异常
-            print("\n====== LLM原始响应 ======")
-            print(response)
-            print("==============================\n")
+            if llm_replay.recording:
+                await llm_replay.record(prompt, response, latency, self.router.route_models(verdict))
             
-            # 打印字节表示，便于调试不可见字符
-            print("\n====== 原始响应的字节表示 ======")
-            print(repr(response))
-            print("==============================\n")
+            # repr便于排查不可见字符
+            log_payload(logger, f"LLM原始响应({step})", repr(response))
             
             return response
         except Exception as e:
-            print(f"\n====== LLM API调用异常 ======")
-            print(f"异常类型: {type(e).__name__}")
-            print(f"异常消息: {str(e)}")
-            traceback.print_exc()
-            print("==============================\n")
+            logger.exception("LLM API调用异常: step=%s, %s: %s", step, type(e).__name__, e)
             
             # 返回一个显示错误的特殊响应，而不是直接抛出异常
             # 这样我们可以看到错误细节，而不是一个通用的KeyError
@@ -344,6 +504,31 @@ class LLMEvaluator:
             }
             return json.dumps(error_response)
     
+    @staticmethod
+    async def _generate(chat_model, prompt: str, step: Optional[str], on_event: Optional[EventCallback]) -> str:
+        """Generate a response, streaming chunks to on_event when it is given.
+        
+        Args:
+            chat_model: LangChain chat model of the chosen endpoint
+            prompt: The prompt to send
+            step: Evaluation step name reported in progress events
+            on_event: Optional progress callback
+        
+        Returns:
+            str: The complete response text
+        """
+        if on_event is None:
+            return await chat_model.apredict(prompt)
+        
+        # 每次尝试（包括重试和切换端点）都从头生成，客户端收到step事件后清空已显示的内容
+        on_event("step", {"step": step})
+        chunks = []
+        async for chunk in chat_model.astream(prompt):
+            if chunk.content:
+                chunks.append(chunk.content)
+                on_event("token", {"step": step, "text": chunk.content})
+        return "".join(chunks)
+    
     def _ensure_evaluation_fields(self, data: Dict[str, Any]) -> None:
         """确保评估结果包含所有必要字段
         
@@ -3,7 +3,16 @@
 This package contains various prompt templates used for different stages of code evaluation.
 """
 
+import hashlib
+
 from .error_analysis import ERROR_ANALYSIS_PROMPT
 from .improvement import IMPROVEMENT_PROMPT
+from .combined import COMBINED_EVALUATION_PROMPT
+
+# Changes whenever a template changes, so cached evaluations are not reused
+# across prompt revisions
+PROMPT_VERSION = hashlib.sha256(
+    (ERROR_ANALYSIS_PROMPT + IMPROVEMENT_PROMPT + COMBINED_EVALUATION_PROMPT).encode("utf-8")
+).hexdigest()[:12]
 
-__all__ = ["ERROR_ANALYSIS_PROMPT", "IMPROVEMENT_PROMPT"]
+__all__ = ["ERROR_ANALYSIS_PROMPT", "IMPROVEMENT_PROMPT", "COMBINED_EVALUATION_PROMPT", "PROMPT_VERSION"]
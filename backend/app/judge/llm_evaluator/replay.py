@@ -0,0 +1,158 @@
+"""Recording and replay of LLM API calls.
+
+In "record" mode every prompt sent by LLMEvaluator._call_llm_api and the
+response it received are appended to a JSON Lines file. In "replay" mode
+responses are served from that file instead of the network, so evaluations
+can be reproduced and load-tested offline without spending API credits.
+Prompts are matched by their SHA-256 hash; a prompt that was never recorded
+raises ReplayMissError.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+
+
+class ReplayMissError(Exception):
+    """Raised in replay mode when a prompt has no recorded response."""
+
+
+class LLMReplay:
+    """Records LLM responses to disk and replays them."""
+    
+    MODE_OFF = "off"
+    MODE_RECORD = "record"
+    MODE_REPLAY = "replay"
+    
+    def __init__(self, mode: str, path: str, simulate_latency: bool = False):
+        """Initialize the replay layer.
+        
+        Args:
+            mode: "off", "record" or "replay"
+            path: JSON Lines file holding the recordings
+            simulate_latency: Whether replayed calls sleep for the recorded latency
+        """
+        self.mode = mode
+        self.path = path
+        self.simulate_latency = simulate_latency
+        self._recordings: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = asyncio.Lock()
+        
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+    
+    @property
+    def replaying(self) -> bool:
+        return self.mode == self.MODE_REPLAY
+    
+    @property
+    def recording(self) -> bool:
+        return self.mode == self.MODE_RECORD
+    
+    def configure(self, mode: str, path: Optional[str] = None, simulate_latency: Optional[bool] = None) -> None:
+        """Switch mode or recording file, e.g. from a benchmark script."""
+        self.mode = mode
+        if path is not None:
+            self.path = path
+        if simulate_latency is not None:
+            self.simulate_latency = simulate_latency
+        self._recordings = None
+    
+    @staticmethod
+    def make_key(prompt: str) -> str:
+        """Key of a prompt in the recording file."""
+        return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Load the recordings, later entries overriding earlier ones."""
+        if self._recordings is None:
+            self._recordings = {}
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            self._recordings[entry["key"]] = entry
+        return self._recordings
+    
+    async def replay(self, prompt: str) -> str:
+        """Get the recorded response for a prompt.
+        
+        Args:
+            prompt: The prompt sent to the LLM
+        
+        Returns:
+            str: The recorded response text
+        
+        Raises:
+            ReplayMissError: If the prompt was never recorded
+        """
+        entry = self._load().get(self.make_key(prompt))
+        if entry is None:
+            self.misses += 1
+            raise ReplayMissError("提示词没有对应的录制响应")
+        
+        if self.simulate_latency and entry.get("latency"):
+            await asyncio.sleep(entry["latency"])
+        
+        self.replayed += 1
+        return entry["response"]
+    
+    async def record(self, prompt: str, response: str, latency: float, model: Optional[str] = None) -> None:
+        """Append a prompt and its response to the recording file.
+        
+        Args:
+            prompt: The prompt sent to the LLM
+            response: The response text
+            latency: Seconds the call took
+            model: Model that produced the response
+        """
+        entry = {
+            "key": self.make_key(prompt),
+            "model": model,
+            "latency": round(latency, 3),
+            "recorded_at": time.time(),
+            "prompt": prompt,
+            "response": response
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        
+        # 文件写入在线程中进行，不阻塞事件循环；锁保证各行按顺序完整写入
+        async with self._lock:
+            await asyncio.to_thread(self._append, self.path, line)
+            if self._recordings is not None:
+                self._recordings[entry["key"]] = entry
+        
+        self.recorded += 1
+    
+    @staticmethod
+    def _append(path: str, line: str) -> None:
+        """Append a line to the recording file, creating its directory if needed."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get replay statistics."""
+        return {
+            "mode": self.mode,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses
+        }
+
+
+# Create a singleton replay instance
+llm_replay = LLMReplay(
+    mode=settings.LLM_REPLAY_MODE,
+    path=settings.LLM_REPLAY_PATH,
+    simulate_latency=settings.LLM_REPLAY_SIMULATE_LATENCY
+)
@@ -0,0 +1,331 @@
+"""Routing of LLM calls across OpenAI-compatible endpoints.
+
+Endpoints are configured with LLM_ENDPOINTS, a JSON list such as
+    
+    [
+      {"name": "fast", "base_url": "http://localhost:9001/v1", "model": "gpt-4o-mini",
+       "weight": 3, "verdicts": ["accepted"], "keyless": true},
+      {"name": "strong", "base_url": "https://api.openai.com/v1", "model": "gpt-4o",
+       "api_key": "sk-...", "weight": 1}
+    ]
+
+An endpoint with "verdicts" only serves those verdicts (plus failover);
+endpoints without it serve every verdict. Endpoints without their own
+"api_key" use OPENAI_API_KEY; mark local servers that need no key with
+"keyless". Endpoints left without a key are never called. When LLM_ENDPOINTS
+is empty a single default endpoint follows llm_config, so hot-reloaded
+settings still apply.
+Each endpoint keeps a rolling latency average and error rate; calls go to a
+weighted choice among healthy endpoints and fail over to the others in order
+of their score.
+"""
+
+import json
+import time
+import random
+import logging
+from collections import deque
+from typing import Dict, List, Any, Awaitable, Callable, Optional
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+from app.core.config import settings
+from .config import llm_config
+
+logger = logging.getLogger(__name__)
+
+# OpenAI客户端要求提供密钥，不需要密钥的端点使用占位值
+KEYLESS_API_KEY = "not-needed"
+
+
+class LLMEndpoint:
+    """One OpenAI-compatible endpoint and model, with health tracking."""
+    
+    # 延迟的指数滑动平均系数，错误率统计窗口
+    LATENCY_ALPHA = 0.2
+    OUTCOME_WINDOW = 20
+    MAX_COOLDOWN = 60.0  # seconds
+    
+    def __init__(
+            self,
+            name: str,
+            base_url: Optional[str] = None,
+            model: Optional[str] = None,
+            api_key: Optional[str] = None,
+            weight: float = 1.0,
+            verdicts: Optional[List[str]] = None,
+            temperature: Optional[float] = None,
+            keyless: bool = False
+        ):
+        """Initialize the endpoint.
+        
+        Args:
+            name: Endpoint name used in statistics
+            base_url: API base URL, None to follow llm_config
+            model: Model name, None to follow llm_config
+            api_key: API key, None to use the configured OpenAI key
+            weight: Relative share of traffic
+            verdicts: Verdicts routed to this endpoint, None or empty for all
+            temperature: Sampling temperature, None to follow llm_config
+            keyless: Whether the endpoint accepts calls without an API key
+        """
+        self.name = name
+        self._base_url = base_url
+        self._model = model
+        self._api_key = api_key
+        self._temperature = temperature
+        self.keyless = keyless
+        self.weight = max(float(weight), 0.0)
+        self.verdicts = {verdict.lower() for verdict in verdicts or []}
+        
+        self._chat_model: Optional[ChatOpenAI] = None
+        self._config_revision = -1
+        
+        self.latency = 1.0  # seconds, optimistic start
+        self._outcomes = deque(maxlen=self.OUTCOME_WINDOW)
+        self._consecutive_failures = 0
+        self._cooldown_until = 0.0
+        self.requests = 0
+        self.failures = 0
+    
+    @property
+    def base_url(self) -> str:
+        return self._base_url or llm_config.api_base
+    
+    @property
+    def model(self) -> str:
+        return self._model or llm_config.model_name
+    
+    @property
+    def api_key(self) -> str:
+        return self._api_key or llm_config.api_key
+    
+    @property
+    def has_api_key(self) -> bool:
+        """Whether the endpoint can be called: it has a key or needs none."""
+        return self.keyless or bool(self.api_key)
+    
+    @property
+    def error_rate(self) -> float:
+        """Failure ratio over the recent outcome window."""
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+    
+    @property
+    def healthy(self) -> bool:
+        """Whether the endpoint is outside its post-failure cooldown."""
+        return time.monotonic() >= self._cooldown_until
+    
+    @property
+    def score(self) -> float:
+        """Routing score: higher weight, lower latency and fewer errors win."""
+        return self.weight * (1.0 - self.error_rate) / max(self.latency, 0.05)
+    
+    def serves(self, verdict: Optional[str]) -> bool:
+        """Whether this endpoint is dedicated to the verdict."""
+        return verdict is not None and verdict.lower() in self.verdicts
+    
+    def get_chat_model(self, http_client: httpx.AsyncClient) -> ChatOpenAI:
+        """Get the LangChain chat model, rebuilding it if llm_config changed."""
+        if self._chat_model is None or self._config_revision != llm_config.revision:
+            self._chat_model = ChatOpenAI(
+                api_key=self.api_key or KEYLESS_API_KEY,
+                base_url=self.base_url,
+                model=self.model,
+                temperature=self._temperature if self._temperature is not None else llm_config.temperature,
+                timeout=llm_config.request_timeout,
+                max_retries=0,  # retries are handled by llm_scheduler
+                model_kwargs=llm_config.get_model_kwargs(),
+                http_async_client=http_client
+            )
+            self._config_revision = llm_config.revision
+        
+        return self._chat_model
+    
+    def record(self, success: bool, latency: float) -> None:
+        """Record the outcome of a call."""
+        self.requests += 1
+        self._outcomes.append(success)
+        
+        if success:
+            self.latency = (1 - self.LATENCY_ALPHA) * self.latency + self.LATENCY_ALPHA * latency
+            self._consecutive_failures = 0
+            self._cooldown_until = 0.0
+        else:
+            self.failures += 1
+            self._consecutive_failures += 1
+            cooldown = min(self.MAX_COOLDOWN, 2.0 ** self._consecutive_failures)
+            self._cooldown_until = time.monotonic() + cooldown
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get endpoint statistics."""
+        return {
+            "name": self.name,
+            "base_url": self.base_url,
+            "model": self.model,
+            "weight": self.weight,
+            "verdicts": sorted(self.verdicts),
+            "healthy": self.healthy,
+            "latency_ms": int(self.latency * 1000),
+            "error_rate": round(self.error_rate, 4),
+            "requests": self.requests,
+            "failures": self.failures
+        }
+
+
+class LLMRouter:
+    """Chooses an endpoint per call and fails over on errors."""
+    
+    def __init__(self, endpoints: Optional[List[LLMEndpoint]] = None):
+        """Initialize the router.
+        
+        Args:
+            endpoints: Configured endpoints, defaults to one endpoint following llm_config
+        """
+        self.endpoints: List[LLMEndpoint] = endpoints or [LLMEndpoint("default")]
+        self._http_client: Optional[httpx.AsyncClient] = None
+    
+    @classmethod
+    def from_settings(cls, endpoints_json: str) -> "LLMRouter":
+        """Create a router from the LLM_ENDPOINTS JSON setting."""
+        if not endpoints_json:
+            return cls()
+        
+        try:
+            endpoints = [
+                LLMEndpoint(
+                    name=item.get("name", f"endpoint{i + 1}"),
+                    base_url=item.get("base_url"),
+                    model=item.get("model"),
+                    api_key=item.get("api_key"),
+                    weight=item.get("weight", 1.0),
+                    verdicts=item.get("verdicts"),
+                    temperature=item.get("temperature"),
+                    keyless=bool(item.get("keyless", False))
+                )
+                for i, item in enumerate(json.loads(endpoints_json))
+            ]
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning("Invalid LLM_ENDPOINTS, using the default endpoint: %s", e)
+            return cls()
+        
+        return cls(endpoints)
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Get the keep-alive HTTP client shared by all endpoints."""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=llm_config.max_connections,
+                    max_keepalive_connections=llm_config.max_connections,
+                    keepalive_expiry=llm_config.keepalive_expiry
+                )
+            )
+        
+        return self._http_client
+    
+    async def aclose(self) -> None:
+        """Close the shared HTTP connection pool."""
+        if self._http_client is not None and not self._http_client.is_closed:
+            await self._http_client.aclose()
+        self._http_client = None
+        for endpoint in self.endpoints:
+            endpoint._chat_model = None
+    
+    @property
+    def configured(self) -> bool:
+        """Whether any endpoint can be called, i.e. has an API key or needs none."""
+        return any(endpoint.has_api_key for endpoint in self.endpoints)
+    
+    def candidates(self, verdict: Optional[str] = None) -> List[LLMEndpoint]:
+        """Order the endpoints to try for a verdict.
+        
+        Dedicated endpoints for the verdict come first, then general ones, then
+        the rest as a last resort. Within a group, the first endpoint is a
+        weighted random choice and the others follow by score. Endpoints
+        cooling down after failures are only tried once all healthy ones failed.
+        Endpoints without an API key are left out.
+        """
+        usable = [endpoint for endpoint in self.endpoints if endpoint.has_api_key]
+        dedicated = [endpoint for endpoint in usable if endpoint.serves(verdict)]
+        general = [endpoint for endpoint in usable if not endpoint.verdicts]
+        others = [endpoint for endpoint in usable if endpoint not in dedicated and endpoint not in general]
+        
+        healthy = []
+        cooling = []
+        for group in (dedicated, general, others):
+            healthy.extend(self._order_group([endpoint for endpoint in group if endpoint.healthy]))
+            cooling.extend(sorted(
+                (endpoint for endpoint in group if not endpoint.healthy),
+                key=lambda endpoint: endpoint.score, reverse=True
+            ))
+        return healthy + cooling
+    
+    @staticmethod
+    def _order_group(group: List[LLMEndpoint]) -> List[LLMEndpoint]:
+        """Weighted random choice for the first endpoint, then by score."""
+        if not group:
+            return []
+        
+        scores = [endpoint.score for endpoint in group]
+        if sum(scores) > 0:
+            first = random.choices(group, weights=scores, k=1)[0]
+        else:
+            first = group[0]
+        
+        rest = sorted(
+            (endpoint for endpoint in group if endpoint is not first),
+            key=lambda endpoint: endpoint.score, reverse=True
+        )
+        return [first] + rest
+    
+    def route_models(self, verdict: Optional[str] = None) -> str:
+        """Models that may answer for a verdict, used in cache keys."""
+        dedicated = [endpoint.model for endpoint in self.endpoints if endpoint.serves(verdict)]
+        general = [endpoint.model for endpoint in self.endpoints if not endpoint.verdicts]
+        return ",".join(sorted(set(dedicated or general)))
+    
+    async def invoke(
+            self,
+            call: Callable[[ChatOpenAI], Awaitable[Any]],
+            verdict: Optional[str] = None
+        ) -> Any:
+        """Run a call against the best endpoint, failing over on errors.
+        
+        Args:
+            call: Coroutine factory taking the endpoint's chat model
+            verdict: Verdict of the evaluated submission, used for routing
+        
+        Returns:
+            Any: The call result
+        
+        Raises:
+            Exception: The last error if every endpoint failed
+        """
+        last_error: Optional[Exception] = None
+        http_client = self._get_http_client()
+        
+        for endpoint in self.candidates(verdict):
+            started = time.monotonic()
+            try:
+                result = await call(endpoint.get_chat_model(http_client))
+            except Exception as e:
+                endpoint.record(False, time.monotonic() - started)
+                last_error = e
+                logger.warning("LLM端点 %s 调用失败（%s），尝试下一个端点", endpoint.name, type(e).__name__)
+                continue
+            
+            endpoint.record(True, time.monotonic() - started)
+            return result
+        
+        raise last_error or RuntimeError("没有可用的LLM端点，请检查端点的API密钥配置")
+    
+    def stats(self) -> List[Dict[str, Any]]:
+        """Get per-endpoint statistics."""
+        return [endpoint.stats() for endpoint in self.endpoints]
+
+
+# Create a singleton router instance
+llm_router = LLMRouter.from_settings(settings.LLM_ENDPOINTS)
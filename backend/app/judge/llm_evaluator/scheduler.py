@@ -0,0 +1,292 @@
+"""Scheduling of LLM API calls.
+
+Every LLM request goes through a single scheduler that enforces the provider's
+request and token rate limits, bounds the number of concurrent requests,
+retries transient failures with jittered exponential backoff (honoring
+Retry-After) and opens a circuit breaker when the provider keeps failing, so
+evaluation load is shed instead of piling up.
+"""
+
+import time
+import random
+import asyncio
+import logging
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# 可重试的HTTP状态码：限流和服务端错误
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {
+    "RateLimitError", "APIConnectionError", "APITimeoutError",
+    "InternalServerError", "ConnectError", "ReadTimeout", "RemoteProtocolError"
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker rejects a call."""
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate."""
+    
+    def __init__(self, per_minute: float):
+        """Initialize the bucket.
+        
+        Args:
+            per_minute: Refill rate and capacity; 0 disables the limit
+        """
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until `amount` tokens are available and take them."""
+        if self.capacity <= 0:
+            return
+        
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """Circuit breaker with closed, open and half-open states."""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int, recovery_time: float):
+        """Initialize the breaker.
+        
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            recovery_time: Seconds before a probe call is let through
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+    
+    @property
+    def state(self) -> str:
+        """Get the current state."""
+        if self._failures < self.failure_threshold:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.recovery_time:
+            return self.HALF_OPEN
+        return self.OPEN
+    
+    def allow(self) -> bool:
+        """Check whether a call may proceed; in half-open state only one probe is allowed."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+    
+    def record_success(self) -> None:
+        """Close the circuit after a successful call."""
+        self._failures = 0
+        self._probe_in_flight = False
+    
+    def release_probe(self) -> None:
+        """Let another probe through after a probe call ended without a result, e.g. was cancelled."""
+        self._probe_in_flight = False
+    
+    def record_failure(self) -> None:
+        """Count a failed call and (re)open the circuit if the threshold is reached."""
+        self._failures += 1
+        self._probe_in_flight = False
+        if self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+
+
+def is_retryable(error: Exception) -> bool:
+    """Check whether an LLM call error is transient."""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Get the delay requested by the provider via Retry-After headers, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        # Retry-After也可能是HTTP日期，这种情况使用退避时间
+        pass
+    return None
+
+
+class LLMScheduler:
+    """Rate-limited, bounded-concurrency executor for LLM calls."""
+    
+    def __init__(
+            self,
+            max_concurrency: int,
+            requests_per_minute: int,
+            tokens_per_minute: int,
+            max_retries: int,
+            base_delay: float,
+            max_delay: float,
+            failure_threshold: int,
+            recovery_time: float
+        ):
+        """Initialize the scheduler.
+        
+        Args:
+            max_concurrency: Maximum number of calls in flight
+            requests_per_minute: Request rate limit, 0 for unlimited
+            tokens_per_minute: Token rate limit, 0 for unlimited
+            max_retries: Retries of a transient failure
+            base_delay: First backoff delay in seconds
+            max_delay: Upper bound of a backoff delay in seconds
+            failure_threshold: Consecutive failures that open the circuit
+            recovery_time: Seconds the circuit stays open
+        """
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.breaker = CircuitBreaker(failure_threshold, recovery_time)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        
+        self.in_flight = 0
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+    
+    @property
+    def available(self) -> bool:
+        """Check whether the provider is considered healthy enough to call."""
+        return self.breaker.state != CircuitBreaker.OPEN
+    
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for a retry attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+    
+    async def run(self, call: Callable[[], Awaitable[Any]], estimated_tokens: int = 0) -> Any:
+        """Run an LLM call under rate limits, concurrency cap, retries and circuit breaker.
+        
+        Args:
+            call: Factory creating the awaitable for one attempt
+            estimated_tokens: Estimated prompt plus completion tokens
+        
+        Returns:
+            Any: The call result
+        
+        Raises:
+            CircuitOpenError: If the circuit breaker rejects the call
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        attempt = 0
+        while True:
+            probe = self.breaker.state == CircuitBreaker.HALF_OPEN
+            if not self.breaker.allow():
+                self.rejected += 1
+                raise CircuitOpenError("LLM服务暂时不可用，已暂停评估请求")
+            
+            try:
+                await self.requests.acquire(1)
+                await self.tokens.acquire(estimated_tokens)
+                
+                async with self._semaphore:
+                    self.in_flight += 1
+                    self.calls += 1
+                    try:
+                        result = await call()
+                    finally:
+                        self.in_flight -= 1
+            except Exception as e:
+                retryable = is_retryable(e)
+                if retryable:
+                    self.breaker.record_failure()
+                else:
+                    # 服务可达，只是请求本身有误，不计入熔断
+                    self.breaker.record_success()
+                
+                if not retryable or attempt >= self.max_retries:
+                    self.failures += 1
+                    raise
+                
+                delay = get_retry_after(e)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                delay = min(delay, self.max_delay)
+                
+                attempt += 1
+                self.retries += 1
+                logger.info("LLM调用失败（%s），%.1f秒后进行第%d次重试", type(e).__name__, delay, attempt)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # 调用被取消（关闭服务或外层超时）时没有结果，释放半开状态的探测名额
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            
+            self.breaker.record_success()
+            return result
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get scheduler statistics."""
+        return {
+            "circuit_state": self.breaker.state,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rejected": self.rejected
+        }
+
+
+# Create a singleton scheduler instance
+llm_scheduler = LLMScheduler(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+    max_retries=settings.LLM_MAX_RETRIES,
+    base_delay=settings.LLM_RETRY_BASE_DELAY,
+    max_delay=settings.LLM_RETRY_MAX_DELAY,
+    failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+    recovery_time=settings.LLM_CIRCUIT_RECOVERY_TIME
+)
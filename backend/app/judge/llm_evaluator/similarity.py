@@ -0,0 +1,380 @@
+"""Near-duplicate detection for reusing LLM evaluations.
+
+Students often submit nearly identical solutions to the same problem, e.g.
+with renamed variables or one changed line. Exact duplicates are served by
+the evaluation cache; this index finds near-duplicates. Code is reduced to
+normalized C++ tokens (identifiers other than keywords and common standard
+library names become a placeholder), split into overlapping token shingles
+and summarized by a MinHash signature. Signatures are stored in MongoDB with
+locality-sensitive hashing (LSH) band keys, so candidates for a new
+submission are found with one indexed query, scoped to the same problem
+revision, verdict signature, prompt version and model. The best candidate
+whose estimated Jaccard similarity reaches the threshold is reused.
+"""
+
+import re
+import random
+import asyncio
+import hashlib
+import zlib
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+
+from pymongo import ASCENDING
+
+from app.db.mongodb import db
+from app.core.config import settings
+from .cache import tokenize_code, test_result_signature
+
+logger = logging.getLogger(__name__)
+
+
+# 保留原样的标识符：关键字和常用标准库名称；其他标识符替换为占位符，
+# 这样只改了变量名的代码仍然被视为相同
+_KEPT_IDENTIFIERS = frozenset("""
+    alignas alignof and asm auto bool break case catch char class const constexpr
+    const_cast continue decltype default delete do double dynamic_cast else enum
+    explicit extern false float for friend goto if inline int long mutable namespace
+    new noexcept not nullptr operator or private protected public register
+    reinterpret_cast return short signed sizeof static static_cast struct switch
+    template this throw true try typedef typename union unsigned using virtual void
+    volatile while include define std cin cout cerr endl scanf printf getline string
+    vector map set unordered_map unordered_set pair queue stack deque priority_queue
+    sort min max swap abs memset fill reverse lower_bound upper_bound push_back
+    pop_back push pop front back top begin end size empty insert erase find count
+    first second make_pair int64_t ios sync_with_stdio tie main
+""".split())
+
+_IDENTIFIER_PLACEHOLDER = "$"
+
+# Mersenne素数，MinHash的通用哈希 h(x) = (a * x + b) mod p
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# 复用评估时去掉的定位字段和文字中的行号引用：相似提交的行号和代码片段与当前代码不一致
+_LOCATION_FIELDS = frozenset({
+    "location", "locations", "line", "lines", "line_number", "line_numbers", "code", "code_snippet", "snippet"
+})
+_LINE_REFERENCE = re.compile(
+    r"第\s*\d+(?:\s*[-~～至到、,，]\s*\d+)*\s*行"
+    r"|\b[Ll]ines?\s*\d+(?:\s*(?:[-–~,]|and|to)\s*\d+)*"
+)
+_LINE_REFERENCE_REPLACEMENT = "相应位置"
+
+
+def _without_locations(value: Any) -> Any:
+    """Remove location fields and line references from a reused evaluation part."""
+    if isinstance(value, str):
+        return _LINE_REFERENCE.sub(_LINE_REFERENCE_REPLACEMENT, value)
+    if isinstance(value, list):
+        return [_without_locations(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _without_locations(item) for key, item in value.items() if key not in _LOCATION_FIELDS}
+    return value
+
+
+def normalized_tokens(code: str) -> List[str]:
+    """Tokenize C++ code and replace user-defined identifiers with a placeholder.
+    
+    Args:
+        code: Source code
+    
+    Returns:
+        list: Normalized tokens
+    """
+    tokens = []
+    for token in tokenize_code(code):
+        if (token[0].isalpha() or token[0] == "_") and token not in _KEPT_IDENTIFIERS:
+            token = _IDENTIFIER_PLACEHOLDER
+        tokens.append(token)
+    return tokens
+
+
+class SimilarityIndex:
+    """Per-problem MinHash/LSH index of evaluated submissions."""
+    
+    COLLECTION = "llm_similarity_index"
+    
+    # 每个问题版本+评测结果签名最多检查的候选数量
+    MAX_CANDIDATES = 50
+    
+    # 按问题统计复用情况时最多保留的问题数，超出时淘汰最久未查询的问题
+    MAX_TRACKED_PROBLEMS = 1000
+    
+    # 复用时去掉定位信息的字段
+    FEEDBACK_FIELDS = ("explanation", "error_details", "improvement_suggestions", "summary")
+    
+    def __init__(
+            self,
+            threshold: float,
+            num_perm: int,
+            bands: int,
+            shingle_size: int,
+            ttl_seconds: int,
+            enabled: bool = True
+        ):
+        """Initialize the index.
+        
+        Args:
+            threshold: Minimum estimated Jaccard similarity for reuse
+            num_perm: Number of MinHash permutations
+            bands: Number of LSH bands; num_perm // bands rows per band
+            shingle_size: Number of tokens per shingle
+            ttl_seconds: Time to live of each entry
+            enabled: Whether near-duplicate reuse is used at all
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = max(1, min(bands, num_perm))
+        self.rows = num_perm // self.bands
+        self.shingle_size = max(1, shingle_size)
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        
+        # 固定种子，保证所有进程的签名可以互相比较
+        rng = random.Random(0x5EED)
+        self._permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+        
+        self.lookups = 0
+        self.reused = 0
+        self.stores = 0
+        self._by_problem: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+    
+    @property
+    def _collection(self):
+        """Get the index collection, or None when the database is not connected."""
+        if not self.enabled or db.db is None:
+            return None
+        return db.db[self.COLLECTION]
+    
+    async def ensure_indexes(self) -> None:
+        """Create the lookup and TTL indexes."""
+        collection = self._collection
+        if collection is None:
+            return
+        
+        await collection.create_index([
+            ("scope", ASCENDING),
+            ("bands", ASCENDING)
+        ])
+        await collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+    
+    def signature(self, code: str) -> List[int]:
+        """Compute the MinHash signature of a piece of code.
+        
+        Args:
+            code: Source code
+        
+        Returns:
+            list: num_perm minimum hash values
+        """
+        tokens = normalized_tokens(code)
+        size = self.shingle_size
+        if len(tokens) <= size:
+            shingles = {" ".join(tokens)}
+        else:
+            shingles = {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+        hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles]
+        
+        return [
+            min((a * value + b) % _MERSENNE_PRIME for value in hashes)
+            for a, b in self._permutations
+        ]
+    
+    async def compute_signature(self, code: str) -> List[int]:
+        """Compute the MinHash signature in a worker thread.
+        
+        Hashing every shingle num_perm times takes long enough on large
+        submissions to stall request handling if run on the event loop.
+        """
+        return await asyncio.to_thread(self.signature, code)
+    
+    def band_keys(self, signature: List[int]) -> List[str]:
+        """Split a signature into LSH band keys.
+        
+        Two signatures share a band key when all rows of that band agree,
+        which is likely only for similar code.
+        """
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(repr(rows).encode("ascii"), digest_size=8).hexdigest()
+            keys.append(f"{band}:{digest}")
+        return keys
+    
+    @staticmethod
+    def estimate_similarity(first: List[int], second: List[int]) -> float:
+        """Estimate the Jaccard similarity of two signatures."""
+        if not first or len(first) != len(second):
+            return 0.0
+        return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+    
+    @staticmethod
+    def make_scope(
+            problem_revision: str,
+            test_results: Optional[List[Dict[str, Any]]],
+            model_name: str,
+            prompt_version: str
+        ) -> str:
+        """Build the scope within which evaluations may be shared.
+        
+        Only submissions to the same problem revision with exactly the same
+        per-test verdicts, evaluated with the same prompts and model, share
+        feedback.
+        """
+        parts = [problem_revision, test_result_signature(test_results), prompt_version, model_name]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+    
+    async def find(
+            self,
+            code: str,
+            problem_revision: str,
+            test_results: Optional[List[Dict[str, Any]]],
+            model_name: str,
+            prompt_version: str
+        ) -> Tuple[Optional[Dict[str, Any]], List[int]]:
+        """Find the evaluation of a near-duplicate submission.
+        
+        Args:
+            code: Submitted code
+            problem_revision: Revision of the problem
+            test_results: Test results of the submission
+            model_name: LLM model used for evaluations
+            prompt_version: Version of the prompt templates
+        
+        Returns:
+            tuple: The adapted evaluation (or None) and the code's signature,
+                which can be passed on to add()
+        """
+        collection = self._collection
+        if collection is None:
+            return None, []
+        
+        signature = await self.compute_signature(code)
+        scope = self.make_scope(problem_revision, test_results, model_name, prompt_version)
+        problem_stats = self._problem_stats(problem_revision)
+        self.lookups += 1
+        problem_stats["lookups"] += 1
+        
+        cursor = collection.find(
+            {
+                "scope": scope,
+                "bands": {"$in": self.band_keys(signature)},
+                "expires_at": {"$gt": datetime.utcnow()}
+            },
+            {"signature": 1, "result": 1}
+        ).limit(self.MAX_CANDIDATES)
+        
+        best, best_similarity = None, 0.0
+        async for candidate in cursor:
+            similarity = self.estimate_similarity(signature, candidate["signature"])
+            if similarity > best_similarity:
+                best, best_similarity = candidate, similarity
+        
+        if best is None or best_similarity < self.threshold:
+            return None, signature
+        
+        self.reused += 1
+        problem_stats["reused"] += 1
+        await collection.update_one({"_id": best["_id"]}, {"$inc": {"reuses": 1}})
+        logger.debug("复用相似提交的评估，相似度 %.2f", best_similarity)
+        return self.adapt(best["result"], best_similarity), signature
+    
+    async def add(
+            self,
+            code: str,
+            problem_revision: str,
+            test_results: Optional[List[Dict[str, Any]]],
+            model_name: str,
+            prompt_version: str,
+            result: Dict[str, Any],
+            signature: Optional[List[int]] = None
+        ) -> None:
+        """Add an evaluated submission to the index.
+        
+        Args:
+            code: Submitted code
+            problem_revision: Revision of the problem
+            test_results: Test results of the submission
+            model_name: LLM model used for the evaluation
+            prompt_version: Version of the prompt templates
+            result: The evaluation to share
+            signature: Signature returned by find(), computed when omitted
+        """
+        collection = self._collection
+        if collection is None:
+            return
+        
+        signature = signature or await self.compute_signature(code)
+        now = datetime.utcnow()
+        await collection.insert_one({
+            "scope": self.make_scope(problem_revision, test_results, model_name, prompt_version),
+            "problem_revision": problem_revision,
+            "bands": self.band_keys(signature),
+            "signature": signature,
+            "result": result,
+            "reuses": 0,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=self.ttl_seconds)
+        })
+        self.stores += 1
+    
+    @classmethod
+    def adapt(cls, result: Dict[str, Any], similarity: float) -> Dict[str, Any]:
+        """Adapt a near-duplicate's evaluation to the current submission.
+        
+        The verdicts are identical, so the analysis applies. Line numbers and
+        code snippets refer to the other submission's layout, so location
+        fields of error details are dropped and line references in the text
+        are replaced. The summary notes that the feedback was written for a
+        very similar submission, since details such as variable names may differ.
+        """
+        adapted = dict(result)
+        for field in cls.FEEDBACK_FIELDS:
+            if field in adapted:
+                adapted[field] = _without_locations(adapted[field])
+        note = f"（本评估复用自一份高度相似的提交，相似度{similarity:.0%}，变量名等细节可能与你的代码不同）"
+        adapted["summary"] = f"{adapted.get('summary', '')}{note}"
+        adapted["reused_similarity"] = round(similarity, 4)
+        return adapted
+    
+    def _problem_stats(self, problem_revision: str) -> Dict[str, int]:
+        """Get the counters of a problem, keyed by problem ID."""
+        problem = problem_revision.split("@", 1)[0]
+        if problem in self._by_problem:
+            self._by_problem.move_to_end(problem)
+        else:
+            self._by_problem[problem] = {"lookups": 0, "reused": 0}
+            while len(self._by_problem) > self.MAX_TRACKED_PROBLEMS:
+                self._by_problem.popitem(last=False)
+        return self._by_problem[problem]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get reuse statistics, overall and per recently looked-up problem."""
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "reused": self.reused,
+            "reuse_ratio": round(self.reused / self.lookups, 4) if self.lookups else 0.0,
+            "stores": self.stores,
+            "by_problem": {
+                problem: dict(counts, reuse_ratio=round(counts["reused"] / counts["lookups"], 4))
+                for problem, counts in self._by_problem.items() if counts["lookups"]
+            }
+        }
+
+
+# Create a singleton similarity index instance
+similarity_index = SimilarityIndex(
+    threshold=settings.LLM_SIMILARITY_THRESHOLD,
+    num_perm=settings.LLM_SIMILARITY_NUM_PERM,
+    bands=settings.LLM_SIMILARITY_BANDS,
+    shingle_size=settings.LLM_SIMILARITY_SHINGLE_SIZE,
+    ttl_seconds=settings.LLM_CACHE_TTL,
+    enabled=settings.LLM_SIMILARITY_ENABLED
+)
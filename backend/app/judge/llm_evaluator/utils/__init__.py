@@ -3,18 +3,24 @@
 from .json_parser import (
     parse_llm_response,
     direct_json_parse,
-    parse_newline_json,
-    clean_json_string
+    extract_json,
+    normalize_dict_keys
 )
 from .formatters import format_test_results
+from .prompt_builder import prompt_builder, PromptBuilder, count_tokens, truncate_middle, condense_description
 from .error_handlers import create_error_response, create_fallback_evaluation, create_fallback_response
 
 __all__ = [
     "parse_llm_response",
     "direct_json_parse",
-    "parse_newline_json",
-    "clean_json_string",
+    "extract_json",
+    "normalize_dict_keys",
     "format_test_results",
+    "prompt_builder",
+    "PromptBuilder",
+    "count_tokens",
+    "truncate_middle",
+    "condense_description",
     "create_error_response",
     "create_fallback_evaluation",
     "create_fallback_response"
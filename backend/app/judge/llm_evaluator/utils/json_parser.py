@@ -1,246 +1,332 @@
-"""JSON parsing utilities for LLM responses."""
+"""JSON parsing utilities for LLM responses.
+
+LLM responses are usually JSON, but often wrapped in Markdown fences or prose,
+with trailing commas, keys padded with newlines and spaces, or cut off when
+the model hits its token limit. The prose may contain braces of its own, e.g.
+quoted code, so extract_json tries candidates in turn: the contents of each
+Markdown code fence, then each opening brace of the text. A candidate is
+decoded with the standard decoder, or else with a single tolerant pass, and
+accepted once the result is an object with one of the expected keys. The
+search resumes after the text a candidate consumed, so parsing stays linear in
+the response length.
+"""
 
 import json
 import re
-from typing import Dict, Any, Optional
+from typing import Dict, Iterable, List, Any, Optional, Tuple
+
+
+_STRICT_DECODER = json.JSONDecoder(strict=False)
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING_CHUNKS = {
+    '"': re.compile(r'([^"\\]*)(["\\])?'),
+    "'": re.compile(r"([^'\\]*)(['\\])?")
+}
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?")
+_BARE_WORD = re.compile(r"[A-Za-z_][\w\-]*")
+_HEX4 = re.compile(r"[0-9a-fA-F]{4}")
+_FENCE_LANGUAGE = re.compile(r"[\w-]*")
 
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
 
-def clean_json_string(json_str: str) -> str:
-    """清理和修复JSON字符串
+
+def normalize_dict_keys(data: Any) -> Any:
+    """递归地规范化字典中的所有键名，移除前导和尾随的空白字符
     
     Args:
-        json_str: 需要清理的JSON字符串
-        
+        data: 要规范化的数据，可以是任何类型
+    
     Returns:
-        str: 清理后的JSON字符串
+        规范化后的数据
     """
-    # 移除开头的```json和结尾的```
-    json_str = re.sub(r'^```json\s*', '', json_str, flags=re.MULTILINE)
-    json_str = re.sub(r'\s*```$', '', json_str, flags=re.MULTILINE)
-    
-    # 替换掉不规范的Unicode转义
-    json_str = re.sub(r'\\u([0-9a-fA-F]{4})', r'\\u\1', json_str)
+    if isinstance(data, list):
+        return [normalize_dict_keys(item) for item in data]
+    if not isinstance(data, dict):
+        return data
     
-    # 修复常见的JSON格式错误
-    json_str = re.sub(r',\s*}', '}', json_str)  # 移除对象末尾的逗号
-    json_str = re.sub(r',\s*]', ']', json_str)  # 移除数组末尾的逗号
+    return {
+        (key.strip() if isinstance(key, str) else key): normalize_dict_keys(value)
+        for key, value in data.items()
+    }
+
+
+def _scan_string(text: str, pos: int, quote: str = '"') -> Tuple[str, int, bool]:
+    """Scan a string body starting after its opening quote.
     
-    # 特别修复：处理"\n "error_types""这样的格式问题
-    # 将所有键名中的换行符和多余空格去除
-    json_str = re.sub(r'([{,])\s*[\n\r]+\s*"', r'\1"', json_str)
+    Returns:
+        tuple: The decoded string, the position after it and whether the
+            closing quote was found (False for truncated text)
+    """
+    chunks = []
+    end = len(text)
+    string_chunk = _STRING_CHUNKS[quote]
+    while True:
+        match = string_chunk.match(text, pos)
+        content, terminator = match.groups()
+        chunks.append(content)
+        pos = match.end()
+        
+        if terminator is None:
+            return "".join(chunks), pos, False
+        if terminator == quote:
+            return "".join(chunks), pos, True
+        
+        # 反斜杠转义
+        if pos >= end:
+            return "".join(chunks), pos, False
+        escape = text[pos]
+        if escape == "u":
+            if _HEX4.match(text, pos + 1):
+                code = int(text[pos + 1:pos + 5], 16)
+                pos += 5
+                # UTF-16代理对
+                if 0xD800 <= code <= 0xDBFF and text.startswith("\\u", pos) and _HEX4.match(text, pos + 2):
+                    low = int(text[pos + 2:pos + 6], 16)
+                    if 0xDC00 <= low <= 0xDFFF:
+                        code = 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+                        pos += 6
+                chunks.append(chr(code))
+            elif pos + 5 > end:
+                return "".join(chunks), end, False
+            else:
+                chunks.append("u")
+                pos += 1
+        else:
+            chunks.append(_ESCAPES.get(escape, escape))
+            pos += 1
+
+
+class _Frame:
+    """An open object or array during tolerant parsing."""
     
-    # 去除键名中可能存在的其他特殊字符
-    json_str = re.sub(r'"\s+([^"]+)\s+"\s*:', r'"\1":', json_str)
+    __slots__ = ("container", "key", "colon")
     
-    return json_str
+    def __init__(self, container):
+        self.container = container
+        self.key: Optional[str] = None
+        self.colon = False
 
 
-def parse_llm_response(response_text: str) -> Dict[str, Any]:
-    """通用方法解析LLM响应文本为JSON
+def _parse_tolerant(text: str, pos: int, end: Optional[int] = None) -> Tuple[Any, int]:
+    """Parse a JSON value in one pass, repairing common LLM mistakes.
     
-    Args:
-        response_text: LLM的原始响应文本
-        
-    Returns:
-        dict: 解析后的JSON数据，已规范化键名
+    Commas are optional and trailing commas are ignored, keys are stripped of
+    surrounding whitespace and may be unquoted, strings may use single quotes,
+    unknown characters are skipped, and at the end of truncated text open strings and containers are
+    closed (a key without a value is dropped).
     
-    Raises:
-        ValueError: 如果无法解析为有效JSON
+    Returns:
+        tuple: The value and the position after it
     """
-    # 打印原始响应进行调试
-    print("\n====== LLM原始响应 (parse_llm_response) ======")
-    print(response_text[:200] + "..." if len(response_text) > 200 else response_text)
-    print("原始响应字节表示:")
-    print(repr(response_text[:200]) + "..." if len(response_text) > 200 else repr(response_text))
-    print("==============================\n")
-    
-    # 1. 尝试直接解析
-    try:
-        return direct_json_parse(response_text)
-    except Exception as e:
-        print(f"直接解析失败: {type(e).__name__}: {str(e)}")
-        pass
-    
-    # 2. 尝试从文本中提取JSON
-    pattern = r'```(?:json)?\s*([\s\S]*?)```'
-    matches = re.findall(pattern, response_text)
-    
-    if matches:
-        for match in matches:
-            try:
-                cleaned = clean_json_string(match)
-                return json.loads(cleaned)
-            except Exception:
-                continue
+    stack: List[_Frame] = []
+    if end is None:
+        end = len(text)
     
-    # 3. 如果找不到JSON块，尝试强制解析整个响应
-    try:
-        cleaned = clean_json_string(response_text)
-        return json.loads(cleaned)
-    except Exception:
-        pass
+    def add(value: Any, is_string: bool = False) -> bool:
+        """Attach a value to the innermost container; True once the root is complete."""
+        if not stack:
+            stack.append(_Frame(value))
+            return True
+        
+        frame = stack[-1]
+        if isinstance(frame.container, list):
+            frame.container.append(value)
+        elif is_string and not frame.colon:
+            # 冒号之前的字符串是键名；去掉空白，忽略空键名
+            key = value.strip()
+            if key:
+                frame.key = key
+        elif frame.key is not None:
+            frame.container[frame.key] = value
+            frame.key = None
+            frame.colon = False
+        return False
     
-    # 4. 尝试修复明显的格式问题
-    try:
-        # 查找开始的 { 和结束的 }
-        start = response_text.find('{')
-        end = response_text.rfind('}')
+    def close() -> bool:
+        """Close the innermost container; True once the root is complete."""
+        frame = stack.pop()
+        if not stack:
+            stack.append(frame)
+            return True
+        return add(frame.container)
+    
+    while pos < end:
+        pos = _WHITESPACE.match(text, pos).end()
+        if pos >= end:
+            break
+        char = text[pos]
         
-        if start != -1 and end != -1:
-            potential_json = response_text[start:end+1]
-            cleaned = clean_json_string(potential_json)
-            return json.loads(cleaned)
-    except Exception:
-        pass
+        if char == "{" or char == "[":
+            stack.append(_Frame({} if char == "{" else []))
+            pos += 1
+        elif char == "}" or char == "]":
+            pos += 1
+            if stack and close():
+                return stack[0].container, pos
+        elif char == '"' or char == "'":
+            value, pos, complete = _scan_string(text, pos + 1, char)
+            frame = stack[-1] if stack else None
+            is_key = frame is not None and isinstance(frame.container, dict) and not frame.colon
+            if complete or not is_key:
+                if add(value, is_string=True):
+                    return value, pos
+        elif char == ":":
+            if stack and isinstance(stack[-1].container, dict) and stack[-1].key is not None:
+                stack[-1].colon = True
+            pos += 1
+        elif char == ",":
+            pos += 1
+        else:
+            match = _NUMBER.match(text, pos)
+            if match:
+                number = match.group()
+                pos = match.end()
+                value = float(number) if any(c in number for c in ".eE") else int(number)
+                if add(value):
+                    return value, pos
+                continue
+            
+            match = _BARE_WORD.match(text, pos)
+            if match:
+                word = match.group()
+                pos = match.end()
+                frame = stack[-1] if stack else None
+                if frame is not None and isinstance(frame.container, dict) and not frame.colon:
+                    # 未加引号的键名
+                    add(word, is_string=True)
+                else:
+                    # 未加引号的值按字符串处理
+                    value = _LITERALS.get(word, word)
+                    if add(value):
+                        return value, pos
+                continue
+            
+            # 其他无法识别的字符直接跳过
+            pos += 1
     
-    # 5. 尝试解析带有前导换行的JSON
-    result = parse_newline_json(response_text)
-    if result:
-        return result
+    # 文本被截断：依次闭合所有未结束的容器
+    if not stack:
+        raise ValueError("响应中没有JSON内容")
+    while len(stack) > 1:
+        close()
+    return stack[0].container, end
+
+
+def _has_expected_keys(value: Any, expected_keys: Optional[Iterable[str]]) -> bool:
+    """Check whether a parsed candidate is the object the caller asked for."""
+    if not isinstance(value, dict):
+        return False
+    if expected_keys is None:
+        return bool(value)
+    return any(key in value for key in expected_keys)
+
+
+def _decode_candidate(text: str, start: int, end: int) -> Tuple[Any, int]:
+    """Decode the JSON value at start, strictly if possible, else tolerantly."""
+    try:
+        value, stop = _STRICT_DECODER.raw_decode(text, start)
+    except json.JSONDecodeError:
+        return _parse_tolerant(text, start, end)
+    if stop > end:
+        # 严格解析越过了代码块的结束标记，只解析代码块内的部分
+        return _parse_tolerant(text, start, end)
+    return normalize_dict_keys(value), stop
+
+
+def _candidate_spans(text: str) -> List[Tuple[int, int]]:
+    """Spans that may hold the JSON value: each code fence, then the whole text."""
+    spans = []
+    pos = text.find("```")
+    while pos != -1:
+        body_start = _FENCE_LANGUAGE.match(text, pos + 3).end()
+        body_end = text.find("```", body_start)
+        if body_end == -1:
+            break
+        spans.append((body_start, body_end))
+        pos = text.find("```", body_end + 3)
     
-    # 如果所有尝试都失败，抛出错误
-    raise ValueError("无法解析为有效JSON")
+    spans.append((0, len(text)))
+    return spans
 
 
-def normalize_dict_keys(data: Any) -> Any:
-    """递归地规范化字典中的所有键名，移除前导和尾随的空白字符
+def extract_json(response_text: str, expected_keys: Optional[Iterable[str]] = None) -> Any:
+    """从LLM响应中提取JSON
+    
+    依次尝试每个Markdown代码块的内容和正文中的每个左花括号：先用标准解码器，
+    失败时单遍容错解析，处理尾随逗号、带空白的键名和被截断的输出。结果是包含
+    任一期望键名的对象时采用（未指定期望键名时为非空对象）；说明文字中的花括号，
+    例如引用的代码，因此不会被误认为JSON。每个候选解析结束后从其后继续查找，
+    时间与响应长度成线性关系。都不满足时返回第一个候选的结果。
     
     Args:
-        data: 要规范化的数据，可以是任何类型
-        
+        response_text: LLM的原始响应文本
+        expected_keys: 期望的JSON对象键名，None表示接受任何非空对象
+    
     Returns:
-        规范化后的数据
+        解析后的JSON数据，键名已去除首尾空白
+    
+    Raises:
+        ValueError: 如果响应中没有JSON内容
     """
-    if not isinstance(data, dict):
-        # 如果是列表，则递归规范化每个元素
-        if isinstance(data, list):
-            return [normalize_dict_keys(item) for item in data]
-        # 如果是其他类型，则直接返回
-        return data
+    if not response_text:
+        raise ValueError("响应为空")
     
-    # 对于字典，规范化键名并递归处理值
-    result = {}
-    for key, value in data.items():
-        # 规范化键名（如果是字符串）
-        normalized_key = key.strip() if isinstance(key, str) else key
-        # 递归规范化值
-        normalized_value = normalize_dict_keys(value)
-        # 存储规范化后的键值对
-        result[normalized_key] = normalized_value
-        
-    return result
+    # 从左花括号开始的候选结果总是对象
+    first: Optional[Dict[str, Any]] = None
+    for span_start, span_end in _candidate_spans(response_text):
+        pos = span_start
+        while True:
+            start = response_text.find("{", pos, span_end)
+            if start == -1:
+                break
+            value, pos = _decode_candidate(response_text, start, span_end)
+            if _has_expected_keys(value, expected_keys):
+                return value
+            if first is None:
+                first = value
+            pos = max(pos, start + 1)
+    
+    if first is not None:
+        return first
+    
+    # 没有JSON对象时尝试数组
+    start = response_text.find("[")
+    if start == -1:
+        raise ValueError("响应中没有JSON对象")
+    return _decode_candidate(response_text, start, len(response_text))[0]
 
 
-def direct_json_parse(response_text: str) -> Dict[str, Any]:
-    """直接解析LLM返回的带有前导换行符和空格的JSON格式
-    
-    专门处理测试中发现的格式，例如:
-    {
-      "key": "value",
-      ...
-    }
+def direct_json_parse(response_text: str, expected_keys: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """解析LLM返回的JSON对象
     
     Args:
         response_text: LLM的原始响应文本
-        
+        expected_keys: 期望的JSON对象键名，用于在说明文字中的花括号之间找到正确的对象
+    
     Returns:
         dict: 解析后的JSON数据，已规范化键名
+    
+    Raises:
+        ValueError: 如果无法解析为JSON对象
     """
-    try:
-        # 去除前后空白字符
-        cleaned_text = response_text.strip()
-        
-        # 如果文本被```包裹，则提取内容
-        if cleaned_text.startswith('```') and cleaned_text.endswith('```'):
-            # 提取```之间的内容
-            content = re.search(r'```(?:json)?\s*([\s\S]*?)```', cleaned_text)
-            if content:
-                cleaned_text = content.group(1).strip()
-        
-        # 清理JSON字符串中的格式问题
-        cleaned_text = clean_json_string(cleaned_text)
-        
-        # 记录清理后的原始字符串
-        print("\n====== 清理后的JSON字符串 ======")
-        print(cleaned_text)
-        print("====== 字节表示 ======")
-        print(repr(cleaned_text))
-        print("===============================\n")
-        
-        # 尝试修复特定的格式问题："\n "error_types"" -> "error_types"
-        # 这个模式专门处理我们发现的KeyError: '\n "error_types"'错误
-        problematic_key_pattern = r'"\\n\s+"([^"]+)""'
-        if re.search(problematic_key_pattern, cleaned_text):
-            print("检测到特殊键名格式问题，尝试修复...")
-            cleaned_text = re.sub(problematic_key_pattern, r'"\1"', cleaned_text)
-        
-        # 解析JSON
-        json_data = json.loads(cleaned_text)
-        
-        # 规范化键名
-        normalized_data = normalize_dict_keys(json_data)
-        
-        # 打印规范化前后的键对比，帮助调试
-        if isinstance(json_data, dict) and isinstance(normalized_data, dict):
-            print("\n====== 键名规范化前后对比 ======")
-            original_keys = list(json_data.keys())
-            normalized_keys = list(normalized_data.keys())
-            for i in range(min(len(original_keys), len(normalized_keys))):
-                if original_keys[i] != normalized_keys[i]:
-                    print(f"原始键: '{original_keys[i]}' -> 规范化键: '{normalized_keys[i]}'")
-            print("===============================\n")
-        
-        return normalized_data
-    except json.JSONDecodeError as je:
-        # JSON解析错误，尝试更激进的清理
-        print(f"JSON解析错误: {str(je)}，尝试更激进的清理")
-        try:
-            # 尝试修复JSON字符串中的常见错误
-            # 1. 移除所有键名中的不可见字符
-            cleaned_text_aggressive = re.sub(r'"[\s\n\r]+(\w+)[\s\n\r]+"\s*:', r'"\1":', cleaned_text)
-            # 2. 处理键值之间的格式问题
-            cleaned_text_aggressive = re.sub(r':\s*[\n\r]+\s*"', ': "', cleaned_text_aggressive)
-            # 3. 处理值之间的格式问题
-            cleaned_text_aggressive = re.sub(r'",\s*[\n\r]+\s*"', '", "', cleaned_text_aggressive)
-            
-            print("\n====== 激进清理后的JSON字符串 ======")
-            print(cleaned_text_aggressive)
-            print("======================================\n")
-            
-            # 重新尝试解析
-            json_data = json.loads(cleaned_text_aggressive)
-            return normalize_dict_keys(json_data)
-        except Exception as e2:
-            # 如果连激进清理后也无法解析，则尝试正则表达式提取键值
-            print(f"激进清理后仍无法解析: {str(e2)}，尝试正则提取")
-            raise ValueError(f"JSON解析失败，原始错误: {str(je)}，激进清理后错误: {str(e2)}")
-    except Exception as e:
-        raise ValueError(f"直接JSON解析失败: {str(e)}")
+    data = extract_json(response_text, expected_keys)
+    if not isinstance(data, dict):
+        raise ValueError(f"期望JSON对象，实际为{type(data).__name__}")
+    return data
 
 
-def parse_newline_json(text: str) -> Optional[Dict[str, Any]]:
-    """专门处理以换行开头的JSON文本，如'\n "key"'格式
+def parse_llm_response(response_text: str) -> Dict[str, Any]:
+    """通用方法解析LLM响应文本为JSON
     
     Args:
-        text: 以换行符开头的文本
-        
+        response_text: LLM的原始响应文本
+    
     Returns:
-        Optional[Dict]: 解析后的JSON数据或None
+        dict: 解析后的JSON数据，已规范化键名
+    
+    Raises:
+        ValueError: 如果无法解析为有效JSON
     """
-    try:
-        # 尝试修复常见格式问题
-        fixed_text = text
-        
-        # 移除开头的非JSON字符
-        fixed_text = re.sub(r'^[^{]*', '', fixed_text)
-        
-        # 移除结尾的非JSON字符
-        fixed_text = re.sub(r'[^}]*$', '', fixed_text)
-        
-        # 解析JSON
-        json_data = json.loads(fixed_text)
-        
-        # 规范化键名
-        return normalize_dict_keys(json_data)
-    except Exception:
-        return None
+    return direct_json_parse(response_text)
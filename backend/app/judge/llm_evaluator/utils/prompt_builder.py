@@ -0,0 +1,242 @@
+"""Token-budgeted prompt inputs for LLM code evaluation."""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Any, Optional
+
+from app.core.config import settings
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional, fall back to an estimate
+    tiktoken = None
+
+
+_CJK_PATTERN = re.compile(r"[\u3000-\u9fff\uff00-\uffef]")
+_PASSED_STATUSES = {"AC", "ACCEPTED"}
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Get the tiktoken encoding, or None if tiktoken is unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """统计文本的token数量
+    
+    有tiktoken时精确计算，否则按中文字符每字1个token、其他字符每4个1个token估算
+    
+    Args:
+        text: 文本
+    
+    Returns:
+        int: token数量
+    """
+    if not text:
+        return 0
+    
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    
+    cjk_chars = len(_CJK_PATTERN.findall(text))
+    return cjk_chars + (len(text) - cjk_chars + 3) // 4
+
+
+def truncate_middle(text: str, max_chars: int) -> str:
+    """保留文本开头和结尾，省略中间部分
+    
+    Args:
+        text: 文本
+        max_chars: 最多保留的字符数
+    
+    Returns:
+        str: 截断后的文本
+    """
+    if text is None:
+        return ""
+    text = str(text)
+    if len(text) <= max_chars:
+        return text
+    
+    head = max_chars // 2
+    tail = max_chars - head
+    omitted = len(text) - head - tail
+    return f"{text[:head]}\n...(省略 {omitted} 个字符)...\n{text[-tail:] if tail else ''}"
+
+
+@lru_cache(maxsize=256)
+def condense_description(description: str, max_tokens: int) -> str:
+    """压缩题目描述：去掉图片、HTML注释和多余空行，超出预算时截断
+    
+    结果按题目描述缓存，同一题目的多次评估只计算一次
+    
+    Args:
+        description: Markdown格式的题目描述
+        max_tokens: 描述的token预算
+    
+    Returns:
+        str: 压缩后的题目描述
+    """
+    condensed = re.sub(r"<!--[\s\S]*?-->", "", description)
+    condensed = re.sub(r"!\[[^\]]*\]\([^)]*\)", "", condensed)
+    condensed = re.sub(r"[ \t]+\n", "\n", condensed)
+    condensed = re.sub(r"\n{3,}", "\n\n", condensed).strip()
+    
+    tokens = count_tokens(condensed)
+    if tokens <= max_tokens:
+        return condensed
+    
+    # 按比例估算可保留的字符数
+    max_chars = max(200, int(len(condensed) * max_tokens / tokens))
+    return truncate_middle(condensed, max_chars)
+
+
+def _test_status(test: Dict[str, Any]) -> str:
+    """Get a test result's status as an upper-case string."""
+    status = test.get("status", "未知")
+    return str(getattr(status, "value", status)).upper()
+
+
+class PromptBuilder:
+    """Builds prompt inputs that fit within a per-request token budget."""
+    
+    def __init__(
+            self,
+            max_prompt_tokens: int,
+            io_window_chars: int,
+            max_passing_cases: int,
+            description_tokens: int
+        ):
+        """Initialize the prompt builder.
+        
+        Args:
+            max_prompt_tokens: Token budget of the variable prompt inputs
+            io_window_chars: Initial head/tail window for test input and output
+            max_passing_cases: Number of representative passing cases to include
+            description_tokens: Token budget of the condensed problem description
+        """
+        self.max_prompt_tokens = max_prompt_tokens
+        self.io_window_chars = io_window_chars
+        self.max_passing_cases = max_passing_cases
+        self.description_tokens = description_tokens
+    
+    def build(
+            self,
+            code: str,
+            problem_description: str,
+            test_results: Optional[List[Dict[str, Any]]],
+            reserved_tokens: int = 0
+        ) -> Dict[str, str]:
+        """Build prompt inputs within the token budget.
+        
+        Args:
+            code: Submitted code
+            problem_description: Markdown problem description
+            test_results: Test results of the submission
+            reserved_tokens: Tokens already used by the prompt template
+        
+        Returns:
+            Dict[str, str]: problem_description, code and test_results strings
+        """
+        budget = max(self.max_prompt_tokens - reserved_tokens, 0)
+        
+        description = condense_description(problem_description, self.description_tokens)
+        budget -= count_tokens(description)
+        
+        # 代码是评估的核心，只有在极端情况下才截断（最多占剩余预算的一半）
+        code_tokens = count_tokens(code)
+        if code_tokens > budget // 2:
+            code = truncate_middle(code, max(400, int(len(code) * (budget // 2) / code_tokens)))
+            code_tokens = count_tokens(code)
+        budget -= code_tokens
+        
+        return {
+            "problem_description": description,
+            "code": code,
+            "test_results": self.format_test_results(test_results, budget)
+        }
+    
+    def format_test_results(self, test_results: Optional[List[Dict[str, Any]]], budget: int) -> str:
+        """Format test results within a token budget.
+        
+        All failing cases and the first few passing cases are included. Large
+        inputs and outputs are cut to head/tail windows, which shrink until the
+        text fits; if it still does not fit, passing and then later failing
+        cases are dropped.
+        
+        Args:
+            test_results: Test results of the submission
+            budget: Token budget for the formatted text
+        
+        Returns:
+            str: Formatted test results
+        """
+        if not test_results:
+            return "无测试结果"
+        
+        indexed = list(enumerate(test_results))
+        failing = [(i, test) for i, test in indexed if _test_status(test) not in _PASSED_STATUSES]
+        passing = [(i, test) for i, test in indexed if _test_status(test) in _PASSED_STATUSES]
+        selected_passing = passing[:self.max_passing_cases]
+        
+        summary = f"共 {len(test_results)} 个测试结果，通过 {len(passing)} 个，未通过 {len(failing)} 个"
+        if len(passing) > len(selected_passing):
+            summary += f"（仅展示 {len(selected_passing)} 个通过的用例）"
+        
+        window = self.io_window_chars
+        while True:
+            cases = sorted(failing + selected_passing, key=lambda item: item[0])
+            text = "\n".join([summary] + [self._format_case(i, test, window) for i, test in cases])
+            if count_tokens(text) <= budget:
+                return text
+            
+            if window > 64:
+                window //= 2
+            elif selected_passing:
+                selected_passing = selected_passing[:-1]
+            elif len(failing) > 1:
+                failing = failing[:-1]
+            else:
+                return truncate_middle(text, max(budget * 2, 200))
+    
+    @staticmethod
+    def _format_case(index: int, test: Dict[str, Any], window: int) -> str:
+        """Format a single test result with truncated input and output."""
+        test_id = test.get("test_case_id") or test.get("id") or f"测试用例{index + 1}"
+        status = _test_status(test)
+        
+        input_data = test.get("input", "无输入数据")
+        expected = test.get("expected", test.get("expected_output", "无预期输出"))
+        actual = test.get("actual", test.get("actual_output", test.get("output", "无实际输出")))
+        error = test.get("error", test.get("error_message", ""))
+        
+        result_text = f"测试用例 {test_id}:\n"
+        result_text += f"状态: {status}\n"
+        result_text += f"输入: {truncate_middle(input_data, window)}\n"
+        
+        if status in _PASSED_STATUSES:
+            result_text += f"输出: {truncate_middle(actual, window)}\n"
+        else:
+            result_text += f"预期: {truncate_middle(expected, window)}\n"
+            result_text += f"实际: {truncate_middle(actual, window)}\n"
+            
+            if error:
+                result_text += f"错误: {truncate_middle(error, window)}\n"
+        
+        return result_text
+
+
+# Create a singleton prompt builder instance
+prompt_builder = PromptBuilder(
+    max_prompt_tokens=settings.LLM_PROMPT_TOKEN_BUDGET,
+    io_window_chars=settings.LLM_PROMPT_IO_WINDOW,
+    max_passing_cases=settings.LLM_PROMPT_PASSING_CASES,
+    description_tokens=settings.LLM_PROMPT_DESCRIPTION_TOKENS
+)
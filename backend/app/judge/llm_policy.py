@@ -0,0 +1,186 @@
+"""LLM Evaluation Policy Module.
+
+Decides per submission whether the LLM evaluation runs eagerly (queued as
+soon as the verdict is known), lazily (only when the submission is first
+viewed, via POST /submissions/{id}/llm-evaluation) or not at all. The
+decision is based on the verdict, the problem's own setting, whether the user
+already solved the problem, the user's daily quota and the current load of
+the evaluation queue. Rules default to environment settings and can be
+changed at runtime through the system configuration.
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+
+from bson.objectid import ObjectId
+
+from app.db.mongodb import db
+from app.core.config import settings
+from app.models.submission import LLMEvaluationStatus
+from app.judge.llm_queue import llm_evaluation_queue
+
+
+def _parse_verdict_rules(value: str) -> Dict[str, str]:
+    """Parse "verdict:decision" pairs, e.g. "accepted:lazy,system_error:none"."""
+    rules = {}
+    for item in value.split(","):
+        verdict, _, decision = item.partition(":")
+        if verdict.strip() and decision.strip():
+            rules[verdict.strip()] = decision.strip()
+    return rules
+
+
+class EvaluationPolicy:
+    """Rule-based policy deciding when submissions are evaluated by the LLM."""
+    
+    EAGER = "eager"
+    LAZY = "lazy"
+    NONE = "none"
+    
+    # 决策从弱到强排序，用于组合多条规则时取较弱的一个
+    _STRENGTH = {NONE: 0, LAZY: 1, EAGER: 2}
+    
+    # 计入配额的评估状态
+    _COUNTED_STATUSES = [
+        LLMEvaluationStatus.PENDING,
+        LLMEvaluationStatus.RUNNING,
+        LLMEvaluationStatus.DONE,
+        LLMEvaluationStatus.FAILED
+    ]
+    
+    # 系统配置中的策略字段；值为null时恢复环境变量中的默认值
+    CONFIG_FIELDS = (
+        "llm_policy_default",
+        "llm_policy_verdicts",
+        "llm_policy_repeat_accepted",
+        "llm_daily_quota",
+        "llm_queue_high_watermark"
+    )
+    
+    def __init__(self):
+        """Initialize the policy from environment settings."""
+        self.default = settings.LLM_POLICY_DEFAULT
+        self.verdicts = _parse_verdict_rules(settings.LLM_POLICY_VERDICTS)
+        self.repeat_accepted = settings.LLM_POLICY_REPEAT_ACCEPTED
+        self.daily_quota = settings.LLM_DAILY_QUOTA
+        self.queue_high_watermark = settings.LLM_QUEUE_HIGH_WATERMARK
+        
+        self._decisions: Counter = Counter()
+        self._reasons: Counter = Counter()
+    
+    def apply_system_config(self, config: Optional[Dict[str, Any]]) -> None:
+        """Apply policy overrides stored in the system configuration document.
+        
+        Rules that are missing, null or invalid in the document use the
+        environment settings, so saving null reverts an override.
+        
+        Args:
+            config: The system configuration document, may be None
+        """
+        config = config or {}
+        
+        default = config.get("llm_policy_default")
+        self.default = default if default in self._STRENGTH else settings.LLM_POLICY_DEFAULT
+        
+        verdicts = config.get("llm_policy_verdicts")
+        if isinstance(verdicts, dict):
+            self.verdicts = {
+                verdict: decision for verdict, decision in verdicts.items()
+                if decision in self._STRENGTH
+            }
+        else:
+            self.verdicts = _parse_verdict_rules(settings.LLM_POLICY_VERDICTS)
+        
+        repeat_accepted = config.get("llm_policy_repeat_accepted")
+        self.repeat_accepted = (
+            repeat_accepted if repeat_accepted in self._STRENGTH else settings.LLM_POLICY_REPEAT_ACCEPTED
+        )
+        
+        daily_quota = config.get("llm_daily_quota")
+        self.daily_quota = daily_quota if daily_quota is not None else settings.LLM_DAILY_QUOTA
+        
+        queue_high_watermark = config.get("llm_queue_high_watermark")
+        self.queue_high_watermark = (
+            queue_high_watermark if queue_high_watermark is not None else settings.LLM_QUEUE_HIGH_WATERMARK
+        )
+    
+    def _weaker(self, first: str, second: str) -> str:
+        return first if self._STRENGTH[first] <= self._STRENGTH[second] else second
+    
+    async def quota_exceeded(self, user_id: str) -> bool:
+        """Check whether a user used up their evaluations for the last 24 hours."""
+        if not self.daily_quota or self.daily_quota <= 0:
+            return False
+        
+        used = await db.db.submissions.count_documents({
+            "user_id": user_id,
+            "submitted_at": {"$gte": datetime.utcnow() - timedelta(days=1)},
+            "llm_evaluation_status": {"$in": self._COUNTED_STATUSES}
+        }, limit=self.daily_quota)
+        return used >= self.daily_quota
+    
+    def queue_overloaded(self) -> bool:
+        """Check whether the evaluation queue is filled beyond the high watermark."""
+        stats = llm_evaluation_queue.stats()
+        capacity = llm_evaluation_queue.max_size
+        if capacity <= 0:
+            return False
+        return stats["queued"] / capacity >= self.queue_high_watermark
+    
+    async def decide(self, problem: Dict[str, Any], user_id: str, verdict: str) -> Tuple[str, str]:
+        """Decide how a judged submission is evaluated.
+        
+        Args:
+            problem: The problem document
+            user_id: ID of the submitting user
+            verdict: The submission's verdict
+        
+        Returns:
+            tuple: The decision (EAGER, LAZY or NONE) and the rule that made it
+        """
+        verdict = str(getattr(verdict, "value", verdict))
+        
+        if problem.get("llm_evaluation_policy") in self._STRENGTH:
+            decision, reason = problem["llm_evaluation_policy"], "problem"
+        elif verdict in self.verdicts:
+            decision, reason = self.verdicts[verdict], "verdict"
+        else:
+            decision, reason = self.default, "default"
+        
+        # 已经通过的题目再次通过，通常不需要新的反馈
+        if verdict == "accepted" and decision != self.NONE and self.repeat_accepted != self.EAGER:
+            solved = await db.db.users.find_one(
+                {"_id": ObjectId(user_id), "solved_problems": str(problem["_id"])},
+                {"_id": 1}
+            )
+            if solved:
+                decision, reason = self._weaker(decision, self.repeat_accepted), "repeat_accepted"
+        
+        # 超出配额时改为按需评估，由查看时的请求再次检查配额
+        if decision == self.EAGER and await self.quota_exceeded(user_id):
+            decision, reason = self.LAZY, "quota"
+        
+        # 队列繁忙时延后到用户查看时再评估
+        if decision == self.EAGER and self.queue_overloaded():
+            decision, reason = self.LAZY, "queue_load"
+        
+        self._decisions[decision] += 1
+        self._reasons[reason] += 1
+        return decision, reason
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get the policy rules and decision counts."""
+        return {
+            "default": self.default,
+            "verdicts": self.verdicts,
+            "repeat_accepted": self.repeat_accepted,
+            "daily_quota": self.daily_quota,
+            "queue_high_watermark": self.queue_high_watermark,
+            "decisions": dict(self._decisions),
+            "reasons": dict(self._reasons)
+        }
+
+
+# Create a singleton policy instance
+evaluation_policy = EvaluationPolicy()
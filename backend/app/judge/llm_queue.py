@@ -0,0 +1,233 @@
+"""LLM Evaluation Queue Module.
+
+The judge publishes a verdict as soon as it is known and hands the submission
+over to this queue. A fixed pool of background workers then runs the (slow)
+LLM evaluation, so LLM round-trips never delay the verdict and the number of
+evaluations in flight is bounded by the number of workers. Progress is
+published to llm_stream_broker so clients can watch the feedback as it is
+generated.
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional
+from bson.objectid import ObjectId
+
+from app.db.mongodb import db
+from app.db.problem_cache import problem_cache, problem_revision
+from app.core.config import settings
+from app.core.logger import correlation_scope
+from app.models.submission import LLMEvaluationStatus
+from app.judge.llm_evaluator import llm_evaluator
+from app.judge.llm_stream import llm_stream_broker
+
+logger = logging.getLogger(__name__)
+
+
+def _evaluation_error_result(error: Exception) -> Dict[str, Any]:
+    """Build an error result in the format the frontend expects."""
+    return {
+        "error": f"LLM评估遇到错误: {str(error)}",
+        "summary": "代码评估过程中遇到技术问题",
+        "code_standard": {"pros": [], "cons": ["评估失败"]},
+        "code_logic": {"pros": [], "cons": []},
+        "code_efficiency": {"pros": [], "cons": []},
+        "improvement_suggestions": ["由于技术原因无法提供详细建议"],
+        "overall_score": "N/A"
+    }
+
+
+def _attach_sample_data(test_results: List[Dict[str, Any]], test_cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Add the input and expected output of sample test cases to their results.
+    
+    The judge runs test cases in order, so result i belongs to test case i.
+    Hidden test cases are left as they are: students read the LLM feedback,
+    so their data must never reach the prompt. The prompt builder truncates
+    large data to fit the token budget.
+    """
+    enriched = []
+    for i, result in enumerate(test_results):
+        result = dict(result)
+        if i < len(test_cases) and test_cases[i].get("is_sample") and "input" not in result:
+            result["input"] = test_cases[i].get("input", "")
+            result["expected"] = test_cases[i].get("output", "")
+        enriched.append(result)
+    return enriched
+
+
+class LLMEvaluationQueue:
+    """Bounded work queue with a fixed pool of LLM evaluation workers."""
+    
+    def __init__(self, worker_count: int, max_size: int):
+        """Initialize the queue.
+        
+        Args:
+            worker_count: Number of concurrent evaluation workers
+            max_size: Maximum number of queued evaluations
+        """
+        self.worker_count = max(1, worker_count)
+        self.max_size = max_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+    
+    async def start(self) -> None:
+        """Start the workers and re-queue evaluations interrupted by a restart."""
+        if self._workers:
+            return
+        
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.worker_count)
+        ]
+        logger.info("Started %d LLM evaluation workers", self.worker_count)
+        
+        await self._recover_unfinished()
+    
+    async def stop(self) -> None:
+        """Cancel all workers. Unfinished evaluations are recovered on next start."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+    
+    async def enqueue(self, submission_id: str, test_results: Optional[List[Dict[str, Any]]] = None) -> bool:
+        """Queue a submission for LLM evaluation.
+        
+        Args:
+            submission_id: Submission ID
+            test_results: Test results to evaluate against, defaults to the
+                submission's stored test_case_results
+        
+        Returns:
+            bool: True if the submission was queued
+        """
+        await self._set_status(submission_id, LLMEvaluationStatus.PENDING)
+        
+        if self._queue is None:
+            # 队列未启动（例如在脚本中直接调用评测），留给下次启动时恢复
+            return False
+        
+        try:
+            self._queue.put_nowait((submission_id, test_results))
+            return True
+        except asyncio.QueueFull:
+            await self._set_status(
+                submission_id,
+                LLMEvaluationStatus.FAILED,
+                {"llm_evaluation": _evaluation_error_result(RuntimeError("评估队列已满"))}
+            )
+            return False
+    
+    def stats(self) -> Dict[str, int]:
+        """Get queue statistics."""
+        return {
+            "workers": self.worker_count,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": self._running,
+            "completed": self._completed,
+            "failed": self._failed
+        }
+    
+    async def _recover_unfinished(self) -> None:
+        """Re-queue submissions left pending or running by a previous process."""
+        cursor = db.db.submissions.find(
+            {"llm_evaluation_status": {"$in": [LLMEvaluationStatus.PENDING, LLMEvaluationStatus.RUNNING]}},
+            {"_id": 1}
+        ).sort("submitted_at", 1).limit(self.max_size)
+        
+        recovered = 0
+        async for submission in cursor:
+            if await self.enqueue(str(submission["_id"])):
+                recovered += 1
+        
+        if recovered:
+            logger.info("Re-queued %d unfinished LLM evaluations", recovered)
+    
+    async def _worker(self, index: int) -> None:
+        """Consume evaluation jobs until cancelled."""
+        while True:
+            submission_id, test_results = await self._queue.get()
+            self._running += 1
+            try:
+                with correlation_scope(submission_id):
+                    await self._evaluate(submission_id, test_results)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("LLM evaluation worker %d failed on %s", index, submission_id)
+            finally:
+                self._running -= 1
+                self._queue.task_done()
+    
+    async def _evaluate(self, submission_id: str, test_results: Optional[List[Dict[str, Any]]]) -> None:
+        """Run the LLM evaluation for one submission and store the result."""
+        submissions_collection = db.db.submissions
+        
+        submission = await submissions_collection.find_one(
+            {"_id": ObjectId(submission_id)},
+            {"code": 1, "problem_id": 1, "test_case_results": 1}
+        )
+        if not submission:
+            return
+        
+        await self._set_status(submission_id, LLMEvaluationStatus.RUNNING)
+        llm_stream_broker.start(submission_id)
+        
+        try:
+            if test_results is None:
+                test_results = submission.get("test_case_results", [])
+            
+            problem = await problem_cache.get(submission["problem_id"])
+            if not problem:
+                raise ValueError("Problem not found")
+            # 评测按顺序运行测试用例，结果i对应测试用例i
+            test_data = await problem_cache.get_test_data(problem)
+            
+            llm_results = await llm_evaluator.evaluate_code(
+                code=submission["code"],
+                problem_description=problem["description"],
+                test_results=_attach_sample_data(test_results, test_data["test_cases"]),
+                problem_revision=problem_revision(problem),
+                on_event=lambda event, data: llm_stream_broker.publish(submission_id, event, data)
+            )
+            
+            status = LLMEvaluationStatus.FAILED if llm_results.get("error") else LLMEvaluationStatus.DONE
+            await self._set_status(submission_id, status, {"llm_evaluation": llm_results})
+            llm_stream_broker.finish(submission_id, status, llm_results)
+            
+            if status == LLMEvaluationStatus.FAILED:
+                self._failed += 1
+            else:
+                self._completed += 1
+        except Exception as e:
+            logger.exception("LLM evaluation failed: %s", e)
+            self._failed += 1
+            error_result = _evaluation_error_result(e)
+            await self._set_status(
+                submission_id,
+                LLMEvaluationStatus.FAILED,
+                {"llm_evaluation": error_result}
+            )
+            llm_stream_broker.finish(submission_id, LLMEvaluationStatus.FAILED, error_result)
+    
+    async def _set_status(self, submission_id: str, status: LLMEvaluationStatus, extra: Optional[Dict[str, Any]] = None) -> None:
+        """Update a submission's LLM evaluation status."""
+        update_data = {"llm_evaluation_status": status}
+        if extra:
+            update_data.update(extra)
+        
+        await db.db.submissions.update_one(
+            {"_id": ObjectId(submission_id)},
+            {"$set": update_data}
+        )
+
+
+# Create a singleton queue instance
+llm_evaluation_queue = LLMEvaluationQueue(
+    settings.LLM_EVALUATION_WORKERS,
+    settings.LLM_EVALUATION_QUEUE_SIZE
+)
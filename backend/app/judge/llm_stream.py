@@ -0,0 +1,202 @@
+"""LLM Evaluation Stream Module.
+
+While a submission is being evaluated, the evaluator publishes its progress
+here: a "step" event when an LLM call (re)starts, "token" events as the model
+generates text, a "section" event when a step's structured result has been
+parsed and finally a "result" event with the persisted evaluation. Clients
+subscribe through the server-sent events endpoint and receive the events
+published so far followed by live ones.
+
+Channels live in process memory. When a submission is evaluated by another
+worker process, one poller per watched submission reads its evaluation status
+every LLM_STREAM_POLL_INTERVAL seconds and sends the stored evaluation as the
+"result" event once it is written, however many clients watch it.
+
+Subscriber queues hold at most LLM_STREAM_QUEUE_SIZE events. When a slow
+client's queue is full, its pending events are replaced by the events
+published so far with consecutive tokens of a step merged; replaying them
+rebuilds the same text, so the client catches up without losing output.
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from bson.objectid import ObjectId
+from pymongo.errors import PyMongoError
+
+from app.db.mongodb import db
+from app.core.config import settings
+from app.models.submission import LLMEvaluationStatus
+
+logger = logging.getLogger(__name__)
+
+
+StreamEvent = Tuple[str, Dict[str, Any]]
+
+# 评估进行中的状态
+EVALUATION_IN_PROGRESS_STATUSES = (LLMEvaluationStatus.PENDING, LLMEvaluationStatus.RUNNING)
+
+
+def compact_events(events: List[StreamEvent]) -> List[StreamEvent]:
+    """Shorten events to the ones needed to rebuild a client's state.
+    
+    Consecutive tokens of a step are merged into one event, and events of a
+    step that was restarted later are dropped, since clients discard a step's
+    text when it restarts.
+    """
+    compacted: List[Tuple[str, Dict[str, Any], List[str]]] = []
+    for event, data in events:
+        step = data.get("step")
+        if event == "step":
+            compacted = [item for item in compacted if item[0] not in ("step", "token") or item[1].get("step") != step]
+        elif event == "token" and compacted and compacted[-1][0] == "token" and compacted[-1][1].get("step") == step:
+            compacted[-1][2].append(data.get("text", ""))
+            continue
+        compacted.append((event, data, [data.get("text", "")] if event == "token" else []))
+    
+    return [
+        (event, {**data, "text": "".join(texts)}) if event == "token" else (event, data)
+        for event, data, texts in compacted
+    ]
+
+
+class _Channel:
+    """Events of one submission's evaluation and their subscribers."""
+    
+    def __init__(self):
+        self.history: List[StreamEvent] = []
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.active = False
+        
+        # 评估在其他工作进程中进行时，从数据库读取结果的轮询任务
+        self.poller: Optional[asyncio.Task] = None
+
+
+class LLMStreamBroker:
+    """In-process publish/subscribe hub for LLM evaluation progress."""
+    
+    PROJECTION = {"llm_evaluation_status": 1, "llm_evaluation": 1}
+    
+    def __init__(self, poll_interval: float, queue_size: int):
+        """Initialize the broker.
+        
+        Args:
+            poll_interval: Seconds between database reads of a submission
+                evaluated by another worker process
+            queue_size: Maximum number of events queued per subscriber
+        """
+        self.poll_interval = poll_interval
+        # 至少能容纳合并后的全部事件：每个步骤的step、token和section事件，以及result
+        self.queue_size = max(queue_size, 16)
+        self._channels: Dict[str, _Channel] = {}
+    
+    def start(self, submission_id: str) -> None:
+        """Mark the start of an evaluation, discarding events of earlier attempts."""
+        channel = self._channels.setdefault(submission_id, _Channel())
+        channel.history.clear()
+        channel.active = True
+    
+    def publish(self, submission_id: str, event: str, data: Dict[str, Any]) -> None:
+        """Publish an event to everyone watching the submission."""
+        channel = self._channels.get(submission_id)
+        if channel is None or not channel.active:
+            return
+        
+        item = (event, data)
+        channel.history.append(item)
+        self._send(channel, item)
+    
+    def finish(self, submission_id: str, status: LLMEvaluationStatus, llm_evaluation: Optional[Dict[str, Any]]) -> None:
+        """Publish the final result and close the channel."""
+        self.publish(submission_id, "result", {
+            "llm_evaluation_status": status,
+            "llm_evaluation": llm_evaluation
+        })
+        channel = self._channels.pop(submission_id, None)
+        if channel is not None:
+            channel.active = False
+    
+    def subscribe(self, submission_id: str) -> asyncio.Queue:
+        """Subscribe to a submission's events, replaying those published so far.
+        
+        Must be called from within the event loop.
+        """
+        channel = self._channels.setdefault(submission_id, _Channel())
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        for event in compact_events(channel.history):
+            queue.put_nowait(event)
+        
+        channel.subscribers.add(queue)
+        if channel.poller is None:
+            channel.poller = asyncio.create_task(self._poll(submission_id, channel))
+        return queue
+    
+    def unsubscribe(self, submission_id: str, queue: asyncio.Queue) -> None:
+        """Remove a subscriber and drop the channel if nothing uses it any more."""
+        channel = self._channels.get(submission_id)
+        if channel is None:
+            return
+        
+        channel.subscribers.discard(queue)
+        if channel.subscribers:
+            return
+        
+        if channel.poller is not None:
+            channel.poller.cancel()
+            channel.poller = None
+        if not channel.active:
+            del self._channels[submission_id]
+    
+    def _send(self, channel: _Channel, event: StreamEvent) -> None:
+        for queue in channel.subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # 客户端跟不上时用合并后的历史事件替换其积压的事件
+                replay = compact_events(channel.history)
+                if not channel.history or channel.history[-1] is not event:
+                    replay.append(event)
+                while not queue.empty():
+                    queue.get_nowait()
+                for replayed in replay:
+                    queue.put_nowait(replayed)
+    
+    def _active(self, submission_id: str, channel: _Channel) -> bool:
+        return self._channels.get(submission_id) is channel and bool(channel.subscribers)
+    
+    async def _poll(self, submission_id: str, channel: _Channel) -> None:
+        """Send the stored evaluation once another worker process finished it."""
+        while self._active(submission_id, channel):
+            # 本进程正在评估时事件实时发布，无需读取数据库
+            if not channel.active:
+                try:
+                    submission = await db.db.submissions.find_one({"_id": ObjectId(submission_id)}, self.PROJECTION)
+                except PyMongoError as e:
+                    logger.warning("Could not read the evaluation of submission %s for its watchers: %s", submission_id, e)
+                else:
+                    if submission is None or not self._active(submission_id, channel):
+                        return
+                    status = submission.get("llm_evaluation_status")
+                    if not channel.active and status not in EVALUATION_IN_PROGRESS_STATUSES:
+                        self._send(channel, ("result", {
+                            "llm_evaluation_status": status,
+                            "llm_evaluation": submission.get("llm_evaluation")
+                        }))
+                        return
+            
+            await asyncio.sleep(self.poll_interval)
+    
+    def stats(self) -> Dict[str, int]:
+        """Get stream statistics."""
+        return {
+            "channels": len(self._channels),
+            "subscribers": sum(len(channel.subscribers) for channel in self._channels.values())
+        }
+
+
+# Create a singleton broker instance
+llm_stream_broker = LLMStreamBroker(
+    poll_interval=settings.LLM_STREAM_POLL_INTERVAL,
+    queue_size=settings.LLM_STREAM_QUEUE_SIZE
+)
@@ -0,0 +1,212 @@
+"""Submission Event Module.
+
+The judge publishes every status change of a submission here: "status"
+events when judging starts and when the verdict is known, and a "progress"
+event after each test case with its index, verdict, time and memory. Clients
+watch them through the server-sent events endpoint GET /submissions/{id}/events
+instead of polling the submission, so each change is read from the judge once
+and fanned out to all watchers in memory.
+
+A watcher that subscribes in the middle of judging first receives the latest
+state and progress. Channels live in process memory. When a submission is
+judged by another worker process, one poller per watched submission reads it
+from the database every SUBMISSION_EVENTS_POLL_INTERVAL seconds and fans the
+changes out the same way, however many clients watch it.
+
+Watcher queues hold at most SUBMISSION_EVENTS_QUEUE_SIZE events. Every status
+event carries the full state and every progress event the latest test, so when
+a slow watcher's queue is full its pending events are coalesced into the
+latest status and progress events, which is all it needs to catch up.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Any, Optional, Set, Tuple
+
+from bson.objectid import ObjectId
+from pymongo.errors import PyMongoError
+
+from app.db.mongodb import db
+from app.core.config import settings
+from app.models.submission import JudgeStatus
+
+logger = logging.getLogger(__name__)
+
+
+SubmissionEvent = Tuple[str, Dict[str, Any]]
+
+# 判题进行中的状态，其余状态都是最终结果
+IN_PROGRESS_STATUSES = (JudgeStatus.PENDING, JudgeStatus.JUDGING)
+
+# 状态事件中携带的字段
+STATUS_FIELDS = ("time_used", "memory_used", "error_message")
+
+
+def is_final_status(status: Any) -> bool:
+    """Check whether a status is a verdict, i.e. judging has finished."""
+    return status is not None and status not in IN_PROGRESS_STATUSES
+
+
+class _Channel:
+    """Latest state of one submission and its watchers."""
+    
+    def __init__(self):
+        # 本进程评测时发布的状态和进度
+        self.state: Dict[str, Any] = {}
+        self.progress: Optional[Dict[str, Any]] = None
+        self.subscribers: Set[asyncio.Queue] = set()
+        
+        # 从数据库轮询得到的状态和进度，用于其他进程评测的提交
+        self.poller: Optional[asyncio.Task] = None
+        self.polled_state: Dict[str, Any] = {}
+        self.polled_progress: Optional[Dict[str, Any]] = None
+
+
+class SubmissionEventBroker:
+    """In-process publish/subscribe hub for submission status changes."""
+    
+    PROJECTION = {"status": 1, "progress": 1, **{field: 1 for field in STATUS_FIELDS}}
+    
+    def __init__(self, poll_interval: float, queue_size: int):
+        """Initialize the broker.
+        
+        Args:
+            poll_interval: Seconds between database reads of a submission
+                judged by another worker process
+            queue_size: Maximum number of events queued per watcher
+        """
+        self.poll_interval = poll_interval
+        # 至少能容纳合并后的状态和进度事件
+        self.queue_size = max(queue_size, 2)
+        self._channels: Dict[str, _Channel] = {}
+    
+    def publish_status(self, submission_id: str, status: JudgeStatus, **fields: Any) -> None:
+        """Publish a status change of a submission.
+        
+        Args:
+            submission_id: Submission ID
+            status: The new status
+            **fields: Other changed fields, e.g. time_used or error_message
+        """
+        channel = self._channels.setdefault(submission_id, _Channel())
+        channel.state.update(fields, status=status)
+        self._send(channel, ("status", dict(channel.state)))
+        
+        # 最终结果发出后不再有事件，之后的订阅者直接读取数据库
+        if is_final_status(status):
+            self._channels.pop(submission_id, None)
+    
+    def publish_progress(self, submission_id: str, progress: Dict[str, Any]) -> None:
+        """Publish the result of one test case.
+        
+        Args:
+            submission_id: Submission ID
+            progress: completed and total test counts, and the test's
+                test_case_id, status, time_used and memory_used
+        """
+        channel = self._channels.setdefault(submission_id, _Channel())
+        channel.progress = progress
+        self._send(channel, ("progress", progress))
+    
+    def subscribe(self, submission_id: str) -> asyncio.Queue:
+        """Watch a submission; the queue starts with the latest known state.
+        
+        Must be called from within the event loop.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        channel = self._channels.setdefault(submission_id, _Channel())
+        
+        state = channel.state or channel.polled_state
+        progress = channel.progress if channel.state else channel.polled_progress
+        if state:
+            queue.put_nowait(("status", dict(state)))
+        if progress:
+            queue.put_nowait(("progress", progress))
+        
+        channel.subscribers.add(queue)
+        if channel.poller is None:
+            channel.poller = asyncio.create_task(self._poll(submission_id, channel))
+        return queue
+    
+    def unsubscribe(self, submission_id: str, queue: asyncio.Queue) -> None:
+        """Stop watching a submission."""
+        channel = self._channels.get(submission_id)
+        if channel is None:
+            return
+        
+        channel.subscribers.discard(queue)
+        if channel.subscribers:
+            return
+        
+        if channel.poller is not None:
+            channel.poller.cancel()
+            channel.poller = None
+        if not channel.state and not channel.progress:
+            del self._channels[submission_id]
+    
+    def _send(self, channel: _Channel, event: SubmissionEvent) -> None:
+        for queue in channel.subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._coalesce(queue, event)
+    
+    @staticmethod
+    def _coalesce(queue: asyncio.Queue, event: SubmissionEvent) -> None:
+        """Replace a full queue's events by the latest event of each kind."""
+        latest: Dict[str, SubmissionEvent] = {}
+        while not queue.empty():
+            pending = queue.get_nowait()
+            latest.pop(pending[0], None)
+            latest[pending[0]] = pending
+        latest.pop(event[0], None)
+        latest[event[0]] = event
+        
+        # 保持原有顺序，最终状态仍是最后一个事件
+        for pending in latest.values():
+            queue.put_nowait(pending)
+    
+    def _active(self, submission_id: str, channel: _Channel) -> bool:
+        return self._channels.get(submission_id) is channel and bool(channel.subscribers)
+    
+    async def _poll(self, submission_id: str, channel: _Channel) -> None:
+        """Follow a submission judged elsewhere through the database while it is watched."""
+        while self._active(submission_id, channel):
+            # 本进程正在评测时事件实时发布，无需读取数据库
+            if not channel.state:
+                try:
+                    document = await db.db.submissions.find_one({"_id": ObjectId(submission_id)}, self.PROJECTION)
+                except PyMongoError as e:
+                    logger.warning("Could not read submission %s for its watchers: %s", submission_id, e)
+                else:
+                    # 读取期间本进程可能开始或结束评测，此时以实时事件为准
+                    if document is None or not self._active(submission_id, channel):
+                        return
+                    if not channel.state and self._apply_polled(channel, document):
+                        return
+            
+            await asyncio.sleep(self.poll_interval)
+    
+    def _apply_polled(self, channel: _Channel, document: Dict[str, Any]) -> bool:
+        """Send what changed since the last read; returns whether judging has finished."""
+        # 数据库中的进度每隔一段时间才写入，只发送比已发送进度更新的值
+        progress = document.get("progress")
+        sent_completed = (channel.polled_progress or {}).get("completed", -1)
+        if progress and progress.get("completed", 0) > sent_completed:
+            channel.polled_progress = progress
+            self._send(channel, ("progress", progress))
+        
+        # 只比较状态，判题结果字段随最终状态一起写入
+        status = document.get("status")
+        if status != channel.polled_state.get("status"):
+            channel.polled_state = {field: document[field] for field in STATUS_FIELDS if field in document}
+            channel.polled_state["status"] = status
+            self._send(channel, ("status", dict(channel.polled_state)))
+        return is_final_status(status)
+
+
+# Create a singleton event broker instance
+submission_event_broker = SubmissionEventBroker(
+    poll_interval=settings.SUBMISSION_EVENTS_POLL_INTERVAL,
+    queue_size=settings.SUBMISSION_EVENTS_QUEUE_SIZE
+)
@@ -1,8 +1,19 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.logger import setup_logging, shutdown_logging
+from app.core.security import password_hasher
+
+# Configure logging before importing modules that log at import time
+setup_logging()
+
 from app.api.api_v1.api import api_router
 from app.db.mongodb import connect_to_mongo, close_mongo_connection
+from app.db.indexes import ensure_indexes
+from app.db.problem_cache import problem_cache
+from app.judge.llm_evaluator import llm_evaluator, evaluation_cache, similarity_index
+from app.judge.llm_queue import llm_evaluation_queue
+from app.judge.config_reload import system_config_reloader
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -18,6 +29,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],
 )
 
 # Include API router
@@ -27,10 +39,23 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 @app.on_event("startup")
 async def startup_db_client():
     await connect_to_mongo()
+    await ensure_indexes()
+    await evaluation_cache.ensure_indexes()
+    await similarity_index.ensure_indexes()
+    # Apply LLM settings saved through the admin system config and follow their changes
+    await system_config_reloader.start()
+    await llm_evaluation_queue.start()
+    await problem_cache.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await problem_cache.stop()
+    await system_config_reloader.stop()
+    await llm_evaluation_queue.stop()
+    await llm_evaluator.aclose()
     await close_mongo_connection()
+    password_hasher.shutdown()
+    shutdown_logging()
 
 if __name__ == "__main__":
     import uvicorn
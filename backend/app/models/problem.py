@@ -30,6 +30,7 @@ class Problem(BaseModel):
     sample_test_cases: List[TestCase] = []
     has_special_judge: bool = False
     special_judge_code: Optional[str] = None
+    llm_evaluation_policy: Optional[str] = None  # "eager" / "lazy" / "none"，为空时使用全局评估策略
     submission_count: int = 0
     accepted_count: int = 0
     
@@ -18,6 +18,14 @@ class JudgeStatus(str, Enum):
     COMPILATION_ERROR = "compilation_error"
     SYSTEM_ERROR = "system_error"
 
+class LLMEvaluationStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    ON_DEMAND = "on_demand"  # evaluated when the submission is first viewed
+    SKIPPED = "skipped"  # not evaluated, per the evaluation policy
+
 class TestCaseResult(BaseModel):
     test_case_id: str
     status: JudgeStatus
@@ -39,6 +47,7 @@ class Submission(BaseModel):
     error_message: Optional[str] = None
     test_case_results: List[TestCaseResult] = []
     llm_evaluation: Optional[Dict[str, Any]] = None  # Store LLM evaluation results
+    llm_evaluation_status: Optional[LLMEvaluationStatus] = None  # None until queued for evaluation
     
     class Config:
         schema_extra = {
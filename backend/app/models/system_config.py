@@ -6,6 +6,16 @@ class SystemConfig(BaseModel):
     """系统配置模型，用于存储全局设置"""
     id: Optional[str] = None
     allow_signup: bool = True  # 是否允许注册
+    llm_model_name: Optional[str] = None  # LLM评估使用的模型
+    llm_api_base: Optional[str] = None  # LLM API基础URL
+    llm_temperature: Optional[float] = None  # LLM温度参数
+    llm_request_timeout: Optional[float] = None  # 单次LLM调用超时（秒）
+    llm_evaluation_mode: Optional[str] = None  # LLM评估模式：two_step / single_call
+    llm_policy_default: Optional[str] = None  # 默认评估策略：eager / lazy / none
+    llm_policy_verdicts: Optional[Dict[str, str]] = None  # 按评测结果的评估策略，如 {"accepted": "lazy"}
+    llm_policy_repeat_accepted: Optional[str] = None  # 已通过题目再次通过时的评估策略
+    llm_daily_quota: Optional[int] = None  # 每个用户24小时内的评估次数上限，0表示不限
+    llm_queue_high_watermark: Optional[float] = None  # 评估队列占用比例超过该值时延后即时评估
     created_at: datetime = datetime.utcnow()
     updated_at: datetime = datetime.utcnow()
     
@@ -0,0 +1,27 @@
+from typing import Optional
+from pydantic import BaseModel
+from datetime import datetime
+
+# One user's position in a ranking
+class LeaderboardEntry(BaseModel):
+    rank: Optional[int] = None  # None if the user has not solved any problem in the ranking
+    user_id: str
+    username: Optional[str] = None
+    solved: int = 0
+    last_solved_at: Optional[datetime] = None
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "rank": 3,
+                "user_id": "60d21b4967d0d8992e610c85",
+                "username": "johndoe",
+                "solved": 42,
+                "last_solved_at": "2023-01-01T00:00:00"
+            }
+        }
+
+# Result of recomputing the leaderboard
+class LeaderboardRebuildResult(BaseModel):
+    users: int
+    entries: int
@@ -13,6 +13,7 @@ class ProblemBase(BaseModel):
     memory_limit: int = 256  # MB
     is_public: bool = True
     has_special_judge: bool = False
+    llm_evaluation_policy: Optional[str] = None  # "eager" / "lazy" / "none"，为空时使用全局评估策略
 
 # Schema for creating a problem
 class ProblemCreate(ProblemBase):
@@ -32,11 +33,13 @@ class ProblemUpdate(BaseModel):
     memory_limit: Optional[int] = None
     is_public: Optional[bool] = None
     has_special_judge: Optional[bool] = None
+    llm_evaluation_policy: Optional[str] = None
     test_cases: Optional[List[TestCase]] = None
     sample_test_cases: Optional[List[TestCase]] = None
     special_judge_code: Optional[str] = None
 
-# Schema for problem response
+# Schema for problem response: hidden test cases and the special judge code
+# are only available through the admin test data endpoint
 class Problem(ProblemBase):
     id: str
     custom_id: Optional[str] = None  # 用户自定义的问题ID
@@ -45,7 +48,6 @@ class Problem(ProblemBase):
     author_id: str
     submission_count: int = 0
     accepted_count: int = 0
-    test_cases: List[TestCase] = []  # 添加测试用例字段
     sample_test_cases: List[TestCase] = []
 
     class Config:
@@ -74,3 +76,28 @@ class Problem(ProblemBase):
                 ]
             }
         }
+
+# Schema for problem list items: no description, test data or checker source
+class ProblemSummary(BaseModel):
+    id: str
+    custom_id: Optional[str] = None
+    title: str
+    difficulty: DifficultyLevel
+    tags: List[str] = []
+    is_public: bool = True
+    submission_count: int = 0
+    accepted_count: int = 0
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "id": "60d21b4967d0d8992e610c85",
+                "custom_id": "P1001",
+                "title": "Two Sum",
+                "difficulty": "easy",
+                "tags": ["array", "hash-table"],
+                "is_public": True,
+                "submission_count": 100,
+                "accepted_count": 75
+            }
+        }
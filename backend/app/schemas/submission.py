@@ -1,7 +1,7 @@
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel
 from datetime import datetime
-from app.models.submission import Language, JudgeStatus, TestCaseResult
+from app.models.submission import Language, JudgeStatus, TestCaseResult, LLMEvaluationStatus
 
 # Base Submission Schema
 class SubmissionBase(BaseModel):
@@ -24,6 +24,7 @@ class Submission(SubmissionBase):
     error_message: Optional[str] = None
     test_case_results: List[TestCaseResult] = []
     llm_evaluation: Optional[Dict[str, Any]] = None  # LLM-based code evaluation results
+    llm_evaluation_status: Optional[LLMEvaluationStatus] = None
 
     class Config:
         schema_extra = {
@@ -48,6 +49,7 @@ class Submission(SubmissionBase):
                         "output": "3"
                     }
                 ],
+                "llm_evaluation_status": "done",
                 "llm_evaluation": {
                     "code_standard": {
                         "pros": ["Clear variable naming", "Good code structure"],
@@ -69,7 +71,7 @@ class Submission(SubmissionBase):
             }
         }
 
-# Schema for listing submissions
+# Schema for listing submissions: no code, per-test results or LLM evaluation
 class SubmissionList(BaseModel):
     id: str
     problem_id: str
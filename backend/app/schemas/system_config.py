@@ -1,10 +1,22 @@
-from typing import Optional
+from typing import Optional, Dict
 from pydantic import BaseModel
 from datetime import datetime
 
 # 基础系统配置Schema
 class SystemConfigBase(BaseModel):
     allow_signup: bool = True
+    # LLM评估配置（为空时使用环境变量中的默认值），修改后无需重启即可生效
+    llm_model_name: Optional[str] = None
+    llm_api_base: Optional[str] = None
+    llm_temperature: Optional[float] = None
+    llm_request_timeout: Optional[float] = None
+    llm_evaluation_mode: Optional[str] = None  # "two_step" 或 "single_call"
+    # LLM评估策略："eager"（立即）、"lazy"（首次查看时）或 "none"（不评估）
+    llm_policy_default: Optional[str] = None
+    llm_policy_verdicts: Optional[Dict[str, str]] = None  # 按评测结果覆盖，如 {"accepted": "lazy"}
+    llm_policy_repeat_accepted: Optional[str] = None  # 已通过题目再次通过时
+    llm_daily_quota: Optional[int] = None  # 每个用户24小时内的评估次数上限，0表示不限
+    llm_queue_high_watermark: Optional[float] = None  # 队列占用比例超过该值时延后即时评估
 
 # 创建系统配置的Schema
 class SystemConfigCreate(SystemConfigBase):
@@ -13,6 +25,17 @@ class SystemConfigCreate(SystemConfigBase):
 # 更新系统配置的Schema
 class SystemConfigUpdate(BaseModel):
     allow_signup: Optional[bool] = None
+    llm_model_name: Optional[str] = None
+    llm_api_base: Optional[str] = None
+    llm_temperature: Optional[float] = None
+    llm_request_timeout: Optional[float] = None
+    llm_evaluation_mode: Optional[str] = None  # "two_step" 或 "single_call"
+    # LLM评估策略："eager"（立即）、"lazy"（首次查看时）或 "none"（不评估）
+    llm_policy_default: Optional[str] = None
+    llm_policy_verdicts: Optional[Dict[str, str]] = None  # 按评测结果覆盖，如 {"accepted": "lazy"}
+    llm_policy_repeat_accepted: Optional[str] = None  # 已通过题目再次通过时
+    llm_daily_quota: Optional[int] = None  # 每个用户24小时内的评估次数上限，0表示不限
+    llm_queue_high_watermark: Optional[float] = None  # 队列占用比例超过该值时延后即时评估
 
 # 系统配置响应Schema
 class SystemConfig(SystemConfigBase):
@@ -43,3 +43,14 @@ class User(UserBase):
                 "solved_problems": []
             }
         }
+
+# Result of an admin bulk user import
+class UserImportError(BaseModel):
+    row: int  # 1-based row in the uploaded file, not counting a CSV header
+    username: Optional[str] = None
+    error: str
+
+class UserImportResult(BaseModel):
+    total: int
+    created: int
+    errors: List[UserImportError] = []
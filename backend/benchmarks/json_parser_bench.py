@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""LLM响应JSON解析压测与回归检查
+
+1. 回归检查：fixtures/malformed_llm_responses.jsonl 中的每个格式错误响应
+   都必须解析为对应的 expected，否则以非零状态退出。
+2. 单个响应的解析耗时。
+3. 规模测试：解析不同长度的截断响应，验证耗时随长度线性增长。
+
+用法:
+    python benchmarks/json_parser_bench.py --iterations 2000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.judge.llm_evaluator.utils.json_parser import extract_json  # noqa: E402
+
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "malformed_llm_responses.jsonl")
+
+
+def load_fixtures(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def check_fixtures(fixtures) -> int:
+    """Parse every fixture and report mismatches; returns the failure count."""
+    failures = 0
+    for fixture in fixtures:
+        try:
+            result = extract_json(fixture["response"])
+        except Exception as e:
+            result = f"{type(e).__name__}: {e}"
+        
+        if result != fixture["expected"]:
+            failures += 1
+            print(f"[失败] {fixture['name']}")
+            print(f"  期望: {json.dumps(fixture['expected'], ensure_ascii=False)}")
+            print(f"  实际: {json.dumps(result, ensure_ascii=False, default=str)}")
+    
+    print(f"回归检查: {len(fixtures) - failures}/{len(fixtures)} 通过")
+    return failures
+
+
+def time_call(text: str, iterations: int) -> float:
+    """Average microseconds per extract_json call."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        extract_json(text)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def synthetic_response(items: int) -> str:
+    """A fenced, trailing-comma, truncated response with the given number of suggestions."""
+    suggestions = ",\n".join(f'    "第{i}条建议：把循环边界改为 i <= n，并使用 long long 保存结果"' for i in range(items))
+    text = f'```json\n{{\n  "improvement_suggestions": [\n{suggestions},\n  ],\n  "summary": "总结'
+    return text
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="LLM响应JSON解析压测")
+    parser.add_argument("--fixtures", default=FIXTURES_PATH)
+    parser.add_argument("--iterations", type=int, default=2000, help="每个响应的解析次数")
+    args = parser.parse_args(argv)
+    
+    fixtures = load_fixtures(args.fixtures)
+    failures = check_fixtures(fixtures)
+    
+    print("\n单个响应解析耗时:")
+    for fixture in fixtures:
+        micros = time_call(fixture["response"], args.iterations)
+        print(f"  {fixture['name']:<32} {len(fixture['response']):>6} 字符  {micros:>8.1f} us")
+    
+    print("\n规模测试（容错解析路径）:")
+    for items in (10, 100, 1000, 10000):
+        text = synthetic_response(items)
+        iterations = max(1, args.iterations * 10 // items)
+        micros = time_call(text, iterations)
+        print(f"  {len(text):>9} 字符  {micros:>11.1f} us  {micros / len(text) * 1000:>7.1f} ns/字符")
+    
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
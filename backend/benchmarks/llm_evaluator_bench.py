@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""LLM评估器压测脚本
+
+以指定并发调用 LLMEvaluator.evaluate_code，统计吞吐量、解析成功率和尾延迟。
+默认连接本地桩服务器（benchmarks/llm_stub_server.py），也可以回放录制的响应，
+完全不访问网络。
+
+用法:
+    # 终端1：启动桩服务器，20%的响应为格式错误的JSON
+    python benchmarks/llm_stub_server.py --latency 800 --malformed-rate 0.2
+    
+    # 终端2：200个评估，并发50
+    python benchmarks/llm_evaluator_bench.py --requests 200 --concurrency 50
+    
+    # 录制后离线回放
+    python benchmarks/llm_evaluator_bench.py --record recordings.jsonl
+    python benchmarks/llm_evaluator_bench.py --replay recordings.jsonl
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from collections import Counter
+from typing import Dict, List, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.logger import setup_logging, shutdown_logging  # noqa: E402
+from app.judge.llm_evaluator import (  # noqa: E402
+    llm_evaluator, llm_config, evaluation_cache, similarity_index, llm_scheduler, llm_replay
+)
+from app.judge.llm_evaluator.scheduler import TokenBucket  # noqa: E402
+
+
+PROBLEM_DESCRIPTION = """# 数组求和
+
+给定 n 个整数，输出它们的和。
+
+## 输入格式
+第一行一个整数 n (1 <= n <= 10^5)，第二行 n 个整数，每个数的绝对值不超过 10^9。
+
+## 输出格式
+一个整数，表示所有数的和。
+"""
+
+CODE_TEMPLATE = """#include <iostream>
+using namespace std;
+
+int main() {{
+    int n;
+    cin >> n;
+    int sum = {offset};
+    for (int i = 0; i < n - 1; i++) {{
+        int x;
+        cin >> x;
+        sum += x;
+    }}
+    cout << sum << endl;
+    return 0;
+}}
+"""
+
+TEST_RESULTS = [
+    {"test_case_id": "1", "status": "accepted", "input": "1\n5\n", "expected": "5\n", "output": "5\n"},
+    {"test_case_id": "2", "status": "wrong_answer", "input": "3\n1 2 3\n", "expected": "6\n", "output": "3\n"},
+    {"test_case_id": "3", "status": "wrong_answer", "input": "2\n1000000000 1000000000\n", "expected": "2000000000\n", "output": "1000000000\n"}
+]
+
+
+def classify(result: Dict[str, Any]) -> str:
+    """Classify an evaluation result."""
+    if "error" in result:
+        return "failed"
+    if {"API错误", "API调用错误"} & set(result.get("error_types", [])):
+        return "api_error"
+    if result.get("summary") == "部分评估完成":
+        return "partial"
+    return "ok"
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def run_benchmark(args: argparse.Namespace) -> None:
+    # 桩服务器不校验密钥；关闭缓存和近似重复复用，避免相同或相似代码直接命中
+    llm_config.update(api_base=args.base_url, model_name=args.model, evaluation_mode=args.mode)
+    llm_config.api_key = llm_config.api_key or "stub-key"
+    evaluation_cache.enabled = False
+    similarity_index.enabled = False
+    
+    # 压测时由参数决定调度器的并发上限，不做限流
+    llm_scheduler.max_concurrency = args.llm_concurrency or args.concurrency
+    llm_scheduler._semaphore = None
+    llm_scheduler.requests = TokenBucket(0)
+    llm_scheduler.tokens = TokenBucket(0)
+    
+    if args.replay:
+        llm_replay.configure(llm_replay.MODE_REPLAY, args.replay, simulate_latency=args.replay_latency)
+    elif args.record:
+        llm_replay.configure(llm_replay.MODE_RECORD, args.record)
+    
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+    first_token_latencies: List[float] = []
+    outcomes: Counter = Counter()
+    
+    async def evaluate(index: int) -> None:
+        async with semaphore:
+            started = time.monotonic()
+            first_token = []
+            
+            def on_event(event: str, data: Dict[str, Any]) -> None:
+                if event == "token" and not first_token:
+                    first_token.append(time.monotonic() - started)
+            
+            result = await llm_evaluator.evaluate_code(
+                code=CODE_TEMPLATE.format(offset=index % args.distinct_codes),
+                problem_description=PROBLEM_DESCRIPTION,
+                test_results=TEST_RESULTS,
+                problem_revision="benchmark",
+                on_event=on_event if args.stream else None
+            )
+            latencies.append(time.monotonic() - started)
+            if first_token:
+                first_token_latencies.append(first_token[0])
+            outcomes[classify(result)] += 1
+    
+    # 压测时默认只显示警告；--verbose显示评估器的调试日志
+    setup_logging("DEBUG" if args.verbose else "WARNING")
+    started = time.monotonic()
+    await asyncio.gather(*(evaluate(i) for i in range(args.requests)))
+    await llm_evaluator.aclose()
+    elapsed = time.monotonic() - started
+    
+    total = sum(outcomes.values())
+    print(f"评估数: {total}  并发: {args.concurrency}  模式: {args.mode}  耗时: {elapsed:.2f}s")
+    print(f"吞吐量: {total / elapsed:.2f} 次评估/秒")
+    print(f"解析成功率: {outcomes['ok'] / total:.2%}  结果分布: {dict(outcomes)}")
+    print(
+        "延迟(s): "
+        f"p50={percentile(latencies, 50):.3f} p90={percentile(latencies, 90):.3f} "
+        f"p99={percentile(latencies, 99):.3f} max={max(latencies):.3f}"
+    )
+    if first_token_latencies:
+        print(
+            "首个token延迟(s): "
+            f"p50={percentile(first_token_latencies, 50):.3f} p99={percentile(first_token_latencies, 99):.3f}"
+        )
+    print(f"调度器: {llm_scheduler.stats()}")
+    if llm_replay.mode != llm_replay.MODE_OFF:
+        print(f"录制/回放: {llm_replay.stats()}")
+    shutdown_logging()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="LLM评估器压测")
+    parser.add_argument("--base-url", default="http://127.0.0.1:9001/v1", help="OpenAI兼容的API地址")
+    parser.add_argument("--model", default="stub-model")
+    parser.add_argument("--mode", default="two_step", choices=["two_step", "single_call"])
+    parser.add_argument("--requests", type=int, default=200, help="评估总数")
+    parser.add_argument("--concurrency", type=int, default=50, help="同时进行的评估数")
+    parser.add_argument("--llm-concurrency", type=int, default=0, help="调度器的LLM并发上限，默认与--concurrency相同")
+    parser.add_argument("--distinct-codes", type=int, default=1000, help="不同代码的数量")
+    parser.add_argument("--stream", action="store_true", help="流式生成并统计首个token延迟")
+    parser.add_argument("--record", help="录制请求和响应到该文件")
+    parser.add_argument("--replay", help="从该文件回放响应，不访问网络")
+    parser.add_argument("--replay-latency", action="store_true", help="回放时模拟录制时的延迟")
+    parser.add_argument("--verbose", action="store_true", help="显示评估器的调试日志")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark(parse_args()))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""本地OpenAI兼容的LLM桩服务器
+
+实现 /v1/chat/completions（含流式响应）和 /v1/models，根据提示词类型返回
+错误分析、改进建议或单次结构化评估的JSON。可配置响应延迟、错误率和
+格式错误JSON的注入比例，用于离线压测评估器。
+
+用法:
+    python benchmarks/llm_stub_server.py --port 9001 --latency 800 --jitter 400 --malformed-rate 0.2
+
+然后将 OPENAI_API_BASE（或 LLM_ENDPOINTS 中的 base_url）设置为 http://127.0.0.1:9001/v1。
+"""
+
+import re
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+ERROR_ANALYSIS_RESPONSE = {
+    "error_types": ["WA"],
+    "explanation": "程序在处理边界情况时没有考虑输入为0的情况，导致部分测试用例输出错误。",
+    "error_details": [
+        {
+            "type": "WA",
+            "description": "循环终止条件错误，最后一个元素没有被处理",
+            "test_cases": ["2", "3"]
+        }
+    ]
+}
+
+IMPROVEMENT_RESPONSE = {
+    "improvement_suggestions": [
+        "修正循环的终止条件，确保最后一个元素也被处理",
+        "使用long long存储累加结果，避免整数溢出",
+        "为关键变量使用更有意义的名称，提高代码可读性"
+    ],
+    "summary": "代码整体思路正确，但边界处理存在问题。"
+}
+
+COMBINED_RESPONSE = dict(
+    ERROR_ANALYSIS_RESPONSE,
+    **IMPROVEMENT_RESPONSE,
+    overall_score="72"
+)
+
+
+def choose_response(prompt: str) -> dict:
+    """根据提示词中要求的输出字段选择响应内容"""
+    if '"overall_score"' in prompt:
+        return COMBINED_RESPONSE
+    if '"improvement_suggestions"' in prompt:
+        return IMPROVEMENT_RESPONSE
+    return ERROR_ANALYSIS_RESPONSE
+
+
+def malform(text: str, rng: random.Random) -> str:
+    """把合法的JSON改写成LLM常见的几种错误格式之一"""
+    kind = rng.choice(["fence", "trailing_comma", "polluted_keys", "truncated", "prose"])
+    if kind == "fence":
+        return f"```json\n{text}\n```"
+    if kind == "trailing_comma":
+        return text.replace("\n}", ",\n}").replace("\n  ]", ",\n  ]")
+    if kind == "polluted_keys":
+        return re.sub(r'"(\w+)":', lambda match: f'"\n  {match.group(1)} ":', text)
+    if kind == "truncated":
+        return text[:max(1, int(len(text) * rng.uniform(0.5, 0.95)))]
+    return f"好的，以下是评估结果：\n{text}\n希望对你有帮助。"
+
+
+def create_app(args: argparse.Namespace) -> FastAPI:
+    """创建桩服务器应用"""
+    app = FastAPI(title="LLM Stub Server")
+    rng = random.Random(args.seed)
+    stats = {"requests": 0, "malformed": 0, "errors": 0}
+    
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": args.model, "object": "model", "owned_by": "stub"}]}
+    
+    @app.get("/stats")
+    async def read_stats():
+        return stats
+    
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        
+        await asyncio.sleep(max(0.0, rng.gauss(args.latency, args.jitter) / 1000.0))
+        
+        if rng.random() < args.error_rate:
+            stats["errors"] += 1
+            status_code = rng.choice([429, 500, 503])
+            return JSONResponse(
+                status_code=status_code,
+                content={"error": {"message": "stub injected error", "type": "server_error", "code": status_code}},
+                headers={"retry-after": "1"} if status_code == 429 else None
+            )
+        
+        content = json.dumps(choose_response(prompt), ensure_ascii=False, indent=2)
+        if rng.random() < args.malformed_rate:
+            stats["malformed"] += 1
+            content = malform(content, rng)
+        
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", args.model)
+        
+        if body.get("stream"):
+            async def event_stream():
+                for i in range(0, len(content), args.chunk_size):
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": content[i:i + args.chunk_size]}, "finish_reason": None}]
+                    }
+                    yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                    if args.token_delay:
+                        await asyncio.sleep(args.token_delay / 1000.0)
+                done = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+                }
+                yield f"data: {json.dumps(done)}\n\n"
+                yield "data: [DONE]\n\n"
+            
+            return StreamingResponse(event_stream(), media_type="text/event-stream")
+        
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+    
+    return app
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="本地OpenAI兼容的LLM桩服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--model", default="stub-model")
+    parser.add_argument("--latency", type=float, default=500.0, help="平均响应延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=200.0, help="延迟的标准差（毫秒）")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="返回格式错误JSON的比例")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回429/5xx错误的比例")
+    parser.add_argument("--chunk-size", type=int, default=16, help="流式响应每块的字符数")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="流式响应每块之间的延迟（毫秒）")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,37 @@
+from app.judge.llm_evaluator.cache import EvaluationCache, normalize_code, tokenize_code
+
+
+def test_normalize_code_ignores_whitespace_and_comments():
+    code = "int main() {\n    // read input\n    return 0; /* done */\n}\n"
+    assert normalize_code(code) == normalize_code("int main(){return 0;}")
+
+
+def test_normalize_code_keeps_string_literals():
+    assert normalize_code('s = "a  b";') != normalize_code('s = "a b";')
+    assert normalize_code('s = "// not a comment";') == 's = "// not a comment" ;'
+
+
+def test_multi_character_operators_are_single_tokens():
+    assert tokenize_code("x += 1; p->y; a <<= b; i++") == [
+        "x", "+=", "1", ";", "p", "->", "y", ";", "a", "<<=", "b", ";", "i", "++"
+    ]
+
+
+def test_normalize_code_does_not_merge_operators():
+    assert normalize_code("a--b") != normalize_code("a - -b")
+    assert normalize_code("x+=1") != normalize_code("x+ =1")
+    assert normalize_code("a&&b") != normalize_code("a& &b")
+    assert normalize_code("a--b") == normalize_code("a -- b")
+
+
+def test_make_key_depends_on_every_part():
+    cache = EvaluationCache(ttl_seconds=60, max_entries=10)
+    results = [{"test_case_id": "1", "status": "accepted"}]
+    key = cache.make_key("int x;", "rev1", results, "model", "v1")
+    
+    assert key == cache.make_key("int  x; // same", "rev1", results, "model", "v1")
+    assert key != cache.make_key("int y;", "rev1", results, "model", "v1")
+    assert key != cache.make_key("int x;", "rev2", results, "model", "v1")
+    assert key != cache.make_key("int x;", "rev1", [{"test_case_id": "1", "status": "wrong_answer"}], "model", "v1")
+    assert key != cache.make_key("int x;", "rev1", results, "other", "v1")
+    assert key != cache.make_key("int x;", "rev1", results, "model", "v2")
@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+from app.judge.llm_evaluator.utils.json_parser import direct_json_parse, extract_json
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "fixtures", "malformed_llm_responses.jsonl")
+
+
+def load_fixtures():
+    with open(FIXTURES_PATH, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.mark.parametrize("fixture", load_fixtures(), ids=lambda fixture: fixture["name"])
+def test_malformed_responses(fixture):
+    assert extract_json(fixture["response"]) == fixture["expected"]
+
+
+def test_fenced_block_wins_over_braces_in_prose():
+    text = (
+        "The loop `for(i=0;i<n;i++){s+=a[i];}` overflows.\n"
+        "```json\n{\"summary\": \"use long long\", \"overall_score\": \"60\"}\n```"
+    )
+    assert extract_json(text) == {"summary": "use long long", "overall_score": "60"}
+    assert direct_json_parse(text, ("summary",)) == {"summary": "use long long", "overall_score": "60"}
+
+
+def test_later_object_is_found_after_prose_braces():
+    assert extract_json('Here {bad} then {"a":1}') == {"a": 1}
+
+
+def test_expected_keys_select_the_object():
+    text = 'Input was {"n": 3}. Result: {"error_types": ["WA"], "explanation": "off by one",}'
+    assert extract_json(text, ("error_types", "explanation")) == {"error_types": ["WA"], "explanation": "off by one"}
+    assert extract_json(text) == {"n": 3}
+
+
+def test_braces_in_code_without_a_fence():
+    text = 'Replace `if (x) { y(); }` with a loop.\n{"summary": "ok", "improvement_suggestions": ["loop"]}'
+    assert extract_json(text, ("summary", "improvement_suggestions")) == {
+        "summary": "ok", "improvement_suggestions": ["loop"]
+    }
+
+
+def test_first_candidate_is_returned_when_nothing_matches():
+    assert extract_json('{"other": 1} and {"more": 2}', ("summary",)) == {"other": 1}
+
+
+def test_truncated_fenced_response():
+    text = '```json\n{"summary": "partial", "improvement_suggestions": ["a", "b'
+    assert extract_json(text, ("summary",)) == {"summary": "partial", "improvement_suggestions": ["a", "b"]}
+
+
+def test_arrays_and_errors():
+    assert extract_json("values: [1, 2, 3]") == [1, 2, 3]
+    with pytest.raises(ValueError):
+        extract_json("")
+    with pytest.raises(ValueError):
+        extract_json("no json here")
+    with pytest.raises(ValueError):
+        direct_json_parse("[1, 2]")
+
+
+def test_many_prose_braces():
+    text = "{x} " * 20000 + '{"summary": "x"}'
+    assert extract_json(text, ("summary",)) == {"summary": "x"}
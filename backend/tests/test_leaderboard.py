@@ -0,0 +1,27 @@
+from app.db.leaderboard import GLOBAL_SCOPE, _RankTable, problem_scopes, tag_scope
+
+
+def test_rank_counts_users_with_more_solved_problems():
+    # 1 user solved 10, 2 users solved 7, 5 users solved 3
+    table = _RankTable([(10, 1), (7, 2), (3, 5)])
+
+    assert table.total == 8
+    assert table.rank(11) == 1
+    assert table.rank(10) == 1
+    assert table.rank(8) == 2
+    assert table.rank(7) == 2
+    assert table.rank(3) == 4
+    assert table.rank(1) == 9
+
+
+def test_empty_rank_table():
+    table = _RankTable([])
+
+    assert table.total == 0
+    assert table.rank(5) == 1
+
+
+def test_problem_scopes_are_global_and_unique_sorted_tags():
+    assert problem_scopes({"tags": ["graph", "dp", "graph"]}) == [GLOBAL_SCOPE, tag_scope("dp"), tag_scope("graph")]
+    assert problem_scopes({"tags": None}) == [GLOBAL_SCOPE]
+    assert problem_scopes({}) == [GLOBAL_SCOPE]
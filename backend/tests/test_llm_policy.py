@@ -0,0 +1,135 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from bson.objectid import ObjectId
+
+from app.core.config import settings
+from app.judge import llm_policy
+from app.judge.llm_policy import EvaluationPolicy
+
+USER_ID = str(ObjectId())
+PROBLEM = {"_id": ObjectId()}
+
+
+class FakeUsers:
+    def __init__(self, solved):
+        self.solved = solved
+    
+    async def find_one(self, query, projection=None):
+        return {"_id": query["_id"]} if query["solved_problems"] in self.solved else None
+
+
+class FakeSubmissions:
+    def __init__(self, used):
+        self.used = used
+    
+    async def count_documents(self, query, limit=0):
+        return min(self.used, limit) if limit else self.used
+
+
+class FakeQueue:
+    def __init__(self, queued, max_size=100):
+        self.queued = queued
+        self.max_size = max_size
+    
+    def stats(self):
+        return {"queued": self.queued}
+
+
+@pytest.fixture
+def environment(monkeypatch):
+    fake_db = SimpleNamespace(db=SimpleNamespace(users=FakeUsers(set()), submissions=FakeSubmissions(0)))
+    queue = FakeQueue(0)
+    monkeypatch.setattr(llm_policy, "db", fake_db)
+    monkeypatch.setattr(llm_policy, "llm_evaluation_queue", queue)
+    
+    def configure(solved=False, used=0, queued=0):
+        fake_db.db.users.solved = {str(PROBLEM["_id"])} if solved else set()
+        fake_db.db.submissions.used = used
+        queue.queued = queued
+    return configure
+
+
+def make_policy(**overrides):
+    policy = EvaluationPolicy()
+    policy.apply_system_config({
+        "llm_policy_default": "eager",
+        "llm_policy_verdicts": {},
+        "llm_policy_repeat_accepted": "none",
+        "llm_daily_quota": 0,
+        "llm_queue_high_watermark": 0.8,
+        **overrides
+    })
+    return policy
+
+
+def decide(policy, verdict, problem=PROBLEM):
+    return asyncio.run(policy.decide(problem, USER_ID, verdict))
+
+
+def test_default_applies_without_other_rules(environment):
+    environment()
+    assert decide(make_policy(), "wrong_answer") == ("eager", "default")
+    assert decide(make_policy(llm_policy_default="lazy"), "wrong_answer") == ("lazy", "default")
+
+
+def test_problem_setting_wins_over_verdict_rule(environment):
+    environment()
+    policy = make_policy(llm_policy_verdicts={"wrong_answer": "none"})
+    assert decide(policy, "wrong_answer") == ("none", "verdict")
+    assert decide(policy, "wrong_answer", dict(PROBLEM, llm_evaluation_policy="eager")) == ("eager", "problem")
+
+
+def test_repeat_accepted_only_weakens(environment):
+    environment(solved=True)
+    assert decide(make_policy(), "accepted") == ("none", "repeat_accepted")
+    assert decide(make_policy(llm_policy_repeat_accepted="lazy"), "accepted") == ("lazy", "repeat_accepted")
+    assert decide(make_policy(llm_policy_repeat_accepted="eager"), "accepted") == ("eager", "default")
+    
+    # 规则不会把较弱的决策变强
+    policy = make_policy(llm_policy_default="lazy", llm_policy_repeat_accepted="lazy")
+    assert decide(policy, "accepted") == ("lazy", "repeat_accepted")
+    
+    environment(solved=False)
+    assert decide(make_policy(), "accepted") == ("eager", "default")
+
+
+def test_quota_defers_eager_evaluations(environment):
+    environment(used=5)
+    assert decide(make_policy(llm_daily_quota=5), "wrong_answer") == ("lazy", "quota")
+    assert decide(make_policy(llm_daily_quota=6), "wrong_answer") == ("eager", "default")
+    assert decide(make_policy(llm_daily_quota=5, llm_policy_default="none"), "wrong_answer") == ("none", "default")
+
+
+def test_queue_load_defers_eager_evaluations(environment):
+    environment(queued=80)
+    assert decide(make_policy(), "wrong_answer") == ("lazy", "queue_load")
+    
+    environment(queued=79)
+    assert decide(make_policy(), "wrong_answer") == ("eager", "default")
+    
+    # 配额先于队列负载检查
+    environment(used=1, queued=100)
+    assert decide(make_policy(llm_daily_quota=1), "wrong_answer") == ("lazy", "quota")
+
+
+def test_null_reverts_to_environment_settings():
+    policy = make_policy(llm_policy_default="lazy", llm_policy_verdicts={"accepted": "none"}, llm_daily_quota=3)
+    assert (policy.default, policy.verdicts, policy.daily_quota) == ("lazy", {"accepted": "none"}, 3)
+    
+    policy.apply_system_config({"llm_policy_default": None, "llm_policy_verdicts": None, "llm_daily_quota": None})
+    assert policy.default == settings.LLM_POLICY_DEFAULT
+    assert policy.verdicts == llm_policy._parse_verdict_rules(settings.LLM_POLICY_VERDICTS)
+    assert policy.daily_quota == settings.LLM_DAILY_QUOTA
+
+
+def test_invalid_decisions_are_ignored():
+    policy = make_policy(llm_policy_default="sometimes", llm_policy_verdicts={"accepted": "maybe", "wrong_answer": "lazy"})
+    assert policy.default == settings.LLM_POLICY_DEFAULT
+    assert policy.verdicts == {"wrong_answer": "lazy"}
+
+
+def test_parse_verdict_rules():
+    assert llm_policy._parse_verdict_rules("") == {}
+    assert llm_policy._parse_verdict_rules("accepted:lazy, system_error:none") == {"accepted": "lazy", "system_error": "none"}
@@ -0,0 +1,123 @@
+import time
+import asyncio
+
+import pytest
+
+from app.judge.llm_evaluator import router as router_module
+from app.judge.llm_evaluator.router import LLMEndpoint, LLMRouter
+
+
+@pytest.fixture(autouse=True)
+def no_chat_models(monkeypatch):
+    # 调用直接拿到端点本身，不创建真实的聊天模型
+    monkeypatch.setattr(LLMEndpoint, "get_chat_model", lambda self, http_client: self)
+    monkeypatch.setattr(router_module.llm_config, "_api_key", "")
+
+
+def endpoint(name, **options):
+    options.setdefault("api_key", "sk-test")
+    return LLMEndpoint(name, base_url=f"http://{name}/v1", model=name, **options)
+
+
+def invoke(router, call, verdict=None):
+    async def run():
+        try:
+            return await router.invoke(call, verdict)
+        finally:
+            await router.aclose()
+    return asyncio.run(run())
+
+
+def cooldown(endpoint):
+    return endpoint._cooldown_until - time.monotonic()
+
+
+def test_invoke_fails_over_to_the_next_endpoint():
+    # 权重为0的端点不会被随机选为第一个
+    broken, working = endpoint("broken"), endpoint("working", weight=0)
+    router = LLMRouter([broken, working])
+    called = []
+    
+    async def call(chat_model):
+        called.append(chat_model.name)
+        if chat_model is broken:
+            raise ConnectionError("down")
+        return chat_model.name
+    
+    assert invoke(router, call) == "working"
+    assert called == ["broken", "working"]
+    assert broken.failures == 1 and not broken.healthy
+    assert working.requests == 1 and working.healthy
+
+
+def test_failed_endpoint_cools_down_and_is_tried_last():
+    first, second = endpoint("first"), endpoint("second")
+    router = LLMRouter([first, second])
+    
+    first.record(False, 0.1)
+    assert not first.healthy
+    assert 0 < cooldown(first) <= 2.0
+    assert router.candidates() == [second, first]
+    
+    first.record(False, 0.1)
+    assert 2.0 < cooldown(first) <= 4.0
+    
+    for _ in range(10):
+        first.record(False, 0.1)
+    assert cooldown(first) <= LLMEndpoint.MAX_COOLDOWN
+    
+    first.record(True, 0.1)
+    assert first.healthy
+    assert set(router.candidates()) == {first, second}
+
+
+def test_invoke_raises_the_last_error_when_every_endpoint_fails():
+    router = LLMRouter([endpoint("a"), endpoint("b")])
+    
+    async def call(chat_model):
+        raise ConnectionError(chat_model.name)
+    
+    with pytest.raises(ConnectionError):
+        invoke(router, call)
+    assert all(not candidate.healthy for candidate in router.endpoints)
+
+
+def test_dedicated_endpoints_come_first():
+    general = endpoint("general")
+    dedicated = endpoint("dedicated", verdicts=["Accepted"])
+    other = endpoint("other", verdicts=["wrong_answer"])
+    router = LLMRouter([general, dedicated, other])
+    
+    assert router.candidates("accepted") == [dedicated, general, other]
+    candidates = router.candidates("time_limit_exceeded")
+    assert candidates[0] is general and set(candidates[1:]) == {dedicated, other}
+    assert router.route_models("accepted") == "dedicated"
+    assert router.route_models("time_limit_exceeded") == "general"
+
+
+def test_endpoints_without_a_key_are_skipped():
+    keyed = endpoint("keyed")
+    missing = endpoint("missing", api_key=None)
+    local = endpoint("local", api_key=None, keyless=True)
+    router = LLMRouter([keyed, missing, local])
+    
+    assert set(router.candidates()) == {keyed, local}
+    assert not LLMRouter([missing]).configured
+    
+    async def call(chat_model):
+        return chat_model.name
+    
+    with pytest.raises(RuntimeError):
+        invoke(LLMRouter([missing]), call)
+
+
+def test_from_settings():
+    router = LLMRouter.from_settings(
+        '[{"name": "fast", "model": "small", "verdicts": ["accepted"], "keyless": true}, {"weight": 2}]'
+    )
+    assert [candidate.name for candidate in router.endpoints] == ["fast", "endpoint2"]
+    assert router.endpoints[0].keyless and router.endpoints[0].serves("accepted")
+    assert router.endpoints[1].weight == 2.0
+    
+    assert [candidate.name for candidate in LLMRouter.from_settings("not json").endpoints] == ["default"]
+    assert [candidate.name for candidate in LLMRouter.from_settings("").endpoints] == ["default"]
@@ -0,0 +1,163 @@
+import time
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.judge.llm_evaluator.scheduler import (
+    CircuitBreaker, CircuitOpenError, LLMScheduler, TokenBucket, get_retry_after, is_retryable
+)
+
+
+class APIError(Exception):
+    def __init__(self, status_code=None, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+def make_scheduler(**overrides):
+    options = dict(
+        max_concurrency=2, requests_per_minute=0, tokens_per_minute=0, max_retries=2,
+        base_delay=0.0, max_delay=1.0, failure_threshold=2, recovery_time=0.05
+    )
+    options.update(overrides)
+    return LLMScheduler(**options)
+
+
+def test_token_bucket_waits_for_refill():
+    async def run():
+        bucket = TokenBucket(per_minute=6000)  # 100 per second
+        started = time.monotonic()
+        await bucket.acquire(6000)
+        assert time.monotonic() - started < 0.05
+        
+        await bucket.acquire(10)
+        return time.monotonic() - started
+    
+    assert asyncio.run(run()) >= 0.08
+
+
+def test_token_bucket_clamps_large_requests_and_can_be_disabled():
+    async def run():
+        started = time.monotonic()
+        await TokenBucket(per_minute=600).acquire(10 ** 6)
+        await TokenBucket(per_minute=0).acquire(10 ** 6)
+        return time.monotonic() - started
+    
+    assert asyncio.run(run()) < 0.05
+
+
+def test_circuit_breaker_opens_and_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_time=0.05)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe at a time
+    
+    # 探测失败重新打开熔断器
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_released_probe_allows_another_probe():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_time=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    
+    breaker.release_probe()
+    assert breaker.allow()
+
+
+def test_cancelled_probe_does_not_block_the_circuit():
+    scheduler = make_scheduler(failure_threshold=1, recovery_time=0.0)
+    scheduler.breaker.record_failure()
+    
+    async def run():
+        task = asyncio.create_task(scheduler.run(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        
+        async def answer():
+            return "ok"
+        return await scheduler.run(answer)
+    
+    assert asyncio.run(run()) == "ok"
+    assert scheduler.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_get_retry_after_reads_headers():
+    assert get_retry_after(APIError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert get_retry_after(APIError(429, {"retry-after": "2"})) == 2.0
+    assert get_retry_after(APIError(429, {"retry-after-ms": "250", "retry-after": "9"})) == 0.25
+    assert get_retry_after(APIError(503, {"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) is None
+    assert get_retry_after(APIError(503)) is None
+    assert get_retry_after(ValueError("no response")) is None
+
+
+def test_is_retryable():
+    assert is_retryable(APIError(429))
+    assert is_retryable(APIError(503))
+    assert not is_retryable(APIError(400))
+    assert is_retryable(asyncio.TimeoutError())
+    assert not is_retryable(ValueError("bad prompt"))
+
+
+def test_run_retries_transient_failures():
+    scheduler = make_scheduler(failure_threshold=5)
+    attempts = []
+    
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise APIError(503, {"retry-after-ms": "1"})
+        return "ok"
+    
+    assert asyncio.run(scheduler.run(flaky)) == "ok"
+    assert len(attempts) == 3
+    assert scheduler.retries == 2
+    assert scheduler.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_run_does_not_retry_or_open_on_client_errors():
+    scheduler = make_scheduler(failure_threshold=1)
+    attempts = []
+    
+    async def bad_request():
+        attempts.append(1)
+        raise APIError(400)
+    
+    with pytest.raises(APIError):
+        asyncio.run(scheduler.run(bad_request))
+    assert len(attempts) == 1
+    assert scheduler.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_run_rejects_calls_while_open():
+    scheduler = make_scheduler(max_retries=0, failure_threshold=1, recovery_time=60)
+    
+    async def unavailable():
+        raise APIError(503)
+    
+    with pytest.raises(APIError):
+        asyncio.run(scheduler.run(unavailable))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(scheduler.run(unavailable))
+    assert scheduler.rejected == 1
+    assert not scheduler.available
@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+from bson.objectid import ObjectId
+
+from app.judge import llm_stream
+from app.judge.llm_stream import LLMStreamBroker, compact_events
+from app.models.submission import LLMEvaluationStatus
+
+
+class FakeSubmissions:
+    def __init__(self, document):
+        self.document = document
+        self.reads = 0
+    
+    async def find_one(self, query, projection=None):
+        self.reads += 1
+        return dict(self.document)
+
+
+def drain(queue):
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+def test_compact_events_merges_tokens_and_drops_restarted_steps():
+    events = [
+        ("step", {"step": "analysis"}),
+        ("token", {"step": "analysis", "text": "half"}),
+        ("step", {"step": "analysis"}),  # retry
+        ("token", {"step": "analysis", "text": "a"}),
+        ("token", {"step": "analysis", "text": "b"}),
+        ("section", {"step": "analysis", "data": {"x": 1}}),
+        ("step", {"step": "evaluation"}),
+        ("token", {"step": "evaluation", "text": "c"}),
+    ]
+    assert compact_events(events) == [
+        ("step", {"step": "analysis"}),
+        ("token", {"step": "analysis", "text": "ab"}),
+        ("section", {"step": "analysis", "data": {"x": 1}}),
+        ("step", {"step": "evaluation"}),
+        ("token", {"step": "evaluation", "text": "c"}),
+    ]
+
+
+def test_slow_subscriber_catches_up_without_losing_text():
+    async def run():
+        broker = LLMStreamBroker(poll_interval=60, queue_size=16)
+        broker.start("s1")
+        queue = broker.subscribe("s1")
+        broker.publish("s1", "step", {"step": "evaluation"})
+        for i in range(100):
+            broker.publish("s1", "token", {"step": "evaluation", "text": str(i % 10)})
+        broker.finish("s1", LLMEvaluationStatus.DONE, {"score": 1})
+        
+        events = drain(queue)
+        broker.unsubscribe("s1", queue)
+        return events
+    
+    events = asyncio.run(run())
+    assert len(events) <= 16
+    text = "".join(data["text"] for event, data in events if event == "token")
+    assert text == "0123456789" * 10
+    assert events[-1] == ("result", {"llm_evaluation_status": LLMEvaluationStatus.DONE, "llm_evaluation": {"score": 1}})
+
+
+def test_late_subscriber_receives_compacted_history():
+    async def run():
+        broker = LLMStreamBroker(poll_interval=60, queue_size=16)
+        broker.start("s1")
+        broker.publish("s1", "step", {"step": "evaluation"})
+        for text in "abc":
+            broker.publish("s1", "token", {"step": "evaluation", "text": text})
+        queue = broker.subscribe("s1")
+        events = drain(queue)
+        broker.unsubscribe("s1", queue)
+        return events
+    
+    assert asyncio.run(run()) == [("step", {"step": "evaluation"}), ("token", {"step": "evaluation", "text": "abc"})]
+
+
+def test_watchers_of_a_remote_evaluation_share_one_poller(monkeypatch):
+    submission_id = str(ObjectId())
+    submissions = FakeSubmissions({"llm_evaluation_status": LLMEvaluationStatus.RUNNING})
+    monkeypatch.setattr(llm_stream, "db", SimpleNamespace(db=SimpleNamespace(submissions=submissions)))
+    
+    async def run():
+        broker = LLMStreamBroker(poll_interval=0.01, queue_size=16)
+        queues = [broker.subscribe(submission_id) for _ in range(3)]
+        await asyncio.sleep(0.035)
+        reads_while_running = submissions.reads
+        
+        submissions.document = {"llm_evaluation_status": LLMEvaluationStatus.DONE, "llm_evaluation": {"score": 2}}
+        results = await asyncio.gather(*(asyncio.wait_for(queue.get(), 1) for queue in queues))
+        for queue in queues:
+            broker.unsubscribe(submission_id, queue)
+        return reads_while_running, results, broker.stats()
+    
+    reads_while_running, results, stats = asyncio.run(run())
+    # 三个客户端共用一个轮询任务
+    assert reads_while_running <= 5
+    assert all(result == ("result", {"llm_evaluation_status": "done", "llm_evaluation": {"score": 2}}) for result in results)
+    assert stats == {"channels": 0, "subscribers": 0}
@@ -0,0 +1,133 @@
+import asyncio
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+from bson import json_util
+from bson.objectid import ObjectId
+from fastapi import HTTPException
+
+from app.db.pagination import (
+    LEADERBOARD_SORT, SUBMISSION_SORT, decode_cursor, encode_cursor, fetch_page, keyset_query
+)
+
+
+def raw_token(values):
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def test_cursor_round_trip_keeps_types():
+    document = {"_id": ObjectId(), "submitted_at": datetime(2024, 5, 1, 12, 30, 15, 123000), "code": "..."}
+    token = encode_cursor(document, SUBMISSION_SORT)
+    
+    assert "=" not in token and "+" not in token and "/" not in token
+    assert decode_cursor(token, SUBMISSION_SORT) == [document["submitted_at"], document["_id"]]
+
+
+@pytest.mark.parametrize("token", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"not json").decode("ascii"),
+    raw_token({"submitted_at": 1}),
+    raw_token([1]),
+    raw_token([{"$gt": ""}, 1]),
+    raw_token([[1], 1]),
+])
+def test_invalid_cursors_are_rejected(token):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(token, SUBMISSION_SORT)
+    assert error.value.status_code == 400
+
+
+def test_keyset_query_shape():
+    when, last_id = datetime(2024, 1, 1), ObjectId()
+    token = encode_cursor({"submitted_at": when, "_id": last_id}, SUBMISSION_SORT)
+    
+    assert keyset_query({}, SUBMISSION_SORT, token) == {"$or": [
+        {"submitted_at": {"$lt": when}},
+        {"submitted_at": when, "_id": {"$lt": last_id}}
+    ]}
+    assert keyset_query({"user_id": "u1"}, SUBMISSION_SORT, token) == {"$and": [
+        {"user_id": "u1"},
+        {"$or": [{"submitted_at": {"$lt": when}}, {"submitted_at": when, "_id": {"$lt": last_id}}]}
+    ]}
+    
+    token = encode_cursor({"_id": last_id}, [("_id", 1)])
+    assert keyset_query({}, [("_id", 1)], token) == {"_id": {"$gt": last_id}}
+
+
+def matches(document, query):
+    for field, condition in query.items():
+        if field == "$and":
+            if not all(matches(document, part) for part in condition):
+                return False
+        elif field == "$or":
+            if not any(matches(document, part) for part in condition):
+                return False
+        elif isinstance(condition, dict):
+            (operator, value), = condition.items()
+            if operator == "$gt" and not document[field] > value:
+                return False
+            if operator == "$lt" and not document[field] < value:
+                return False
+        elif document.get(field) != condition:
+            return False
+    return True
+
+
+class FakeFind:
+    def __init__(self, documents):
+        self.documents = documents
+    
+    def sort(self, sort):
+        for field, direction in reversed(sort):
+            self.documents.sort(key=lambda document: document[field], reverse=direction < 0)
+        return self
+    
+    def skip(self, count):
+        self.documents = self.documents[count:]
+        return self
+    
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+    
+    async def to_list(self, length):
+        return self.documents[:length]
+
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+    
+    def find(self, query, projection=None):
+        return FakeFind([dict(document) for document in self.documents if matches(document, query)])
+
+
+def test_paging_visits_every_document_once_with_ties():
+    start = datetime(2024, 1, 1)
+    entries = [
+        {"_id": f"u{i:02d}", "scope": "global", "solved": i % 4, "last_solved_at": start + timedelta(minutes=i % 3)}
+        for i in range(25)
+    ]
+    collection = FakeCollection(entries + [{"_id": "other", "scope": "tag:dp", "solved": 9, "last_solved_at": start}])
+    
+    async def read_all(limit):
+        pages, cursor = [], None
+        while True:
+            documents, cursor = await fetch_page(collection, {"scope": "global"}, LEADERBOARD_SORT, limit, cursor=cursor)
+            pages.append(documents)
+            if cursor is None:
+                return pages
+    
+    pages = asyncio.run(read_all(4))
+    assert [len(page) for page in pages] == [4, 4, 4, 4, 4, 4, 1]
+    
+    visited = [document["_id"] for page in pages for document in page]
+    expected = sorted(entries, key=lambda entry: (-entry["solved"], entry["last_solved_at"], entry["_id"]))
+    assert visited == [entry["_id"] for entry in expected]
+
+
+def test_last_full_page_has_no_cursor():
+    collection = FakeCollection([{"_id": i} for i in range(4)])
+    documents, cursor = asyncio.run(fetch_page(collection, {}, [("_id", 1)], 4))
+    assert len(documents) == 4 and cursor is None
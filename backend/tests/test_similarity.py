@@ -0,0 +1,151 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.judge.llm_evaluator import similarity
+from app.judge.llm_evaluator.similarity import SimilarityIndex, normalized_tokens
+
+SOLUTION = """
+#include <iostream>
+using namespace std;
+int main() {
+    int n; cin >> n;
+    long long total = 0;
+    for (int i = 0; i < n; i++) { int value; cin >> value; total += value; }
+    cout << total << endl;
+    return 0;
+}
+"""
+
+RENAMED = SOLUTION.replace("total", "sum").replace("value", "x")
+
+ONE_LINE_CHANGED = SOLUTION.replace("cout << total << endl;", "cout << total << endl;\n    cout << n << endl;")
+
+UNRELATED = """
+#include <cstdio>
+int gcd(int a, int b) { return b == 0 ? a : gcd(b, a % b); }
+int main() { int a, b; scanf("%d %d", &a, &b); printf("%d\\n", gcd(a, b)); }
+"""
+
+RESULTS = [{"test_case_id": "1", "status": "wrong_answer"}]
+
+
+def make_index(**options):
+    config = dict(threshold=0.8, num_perm=64, bands=16, shingle_size=3, ttl_seconds=3600)
+    config.update(options)
+    return SimilarityIndex(**config)
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+    
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+    
+    def __aiter__(self):
+        self._iterator = iter(self.documents)
+        return self
+    
+    async def __anext__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = []
+    
+    async def insert_one(self, document):
+        self.documents.append(dict(document, _id=len(self.documents)))
+    
+    def find(self, query, projection=None):
+        bands = set(query["bands"]["$in"])
+        return FakeCursor([
+            document for document in self.documents
+            if document["scope"] == query["scope"] and bands & set(document["bands"])
+        ])
+    
+    async def update_one(self, query, update):
+        pass
+
+
+def test_normalized_tokens_replace_user_identifiers():
+    assert normalized_tokens("int total = cnt + 1;") == ["int", "$", "=", "$", "+", "1", ";"]
+    assert normalized_tokens(SOLUTION) == normalized_tokens(RENAMED)
+
+
+def test_signature_similarity():
+    index = make_index()
+    signature = index.signature(SOLUTION)
+    assert len(signature) == 64
+    assert signature == index.signature(RENAMED)
+    assert index.estimate_similarity(signature, index.signature(ONE_LINE_CHANGED)) >= 0.6
+    assert index.estimate_similarity(signature, index.signature(UNRELATED)) < 0.3
+    assert index.estimate_similarity(signature, []) == 0.0
+
+
+def test_signatures_are_stable_across_instances():
+    assert make_index().signature(SOLUTION) == make_index().signature(SOLUTION)
+
+
+def test_band_keys():
+    index = make_index()
+    keys = index.band_keys(index.signature(SOLUTION))
+    assert len(keys) == 16 and len(set(keys)) == 16
+    assert keys == index.band_keys(index.signature(RENAMED))
+    assert not set(keys) & set(index.band_keys(index.signature(UNRELATED)))
+
+
+def test_scope_depends_on_verdicts_and_model():
+    scope = SimilarityIndex.make_scope("p1@r1", RESULTS, "model", "v1")
+    assert scope == SimilarityIndex.make_scope("p1@r1", list(RESULTS), "model", "v1")
+    assert scope != SimilarityIndex.make_scope("p1@r1", [{"test_case_id": "1", "status": "accepted"}], "model", "v1")
+    assert scope != SimilarityIndex.make_scope("p1@r1", RESULTS, "other", "v1")
+    assert scope != SimilarityIndex.make_scope("p1@r2", RESULTS, "model", "v1")
+
+
+def test_find_reuses_a_near_duplicate(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(similarity, "db", SimpleNamespace(db={SimilarityIndex.COLLECTION: collection}))
+    index = make_index()
+    stored = {
+        "error_types": ["WA"],
+        "explanation": "第7行的循环没有处理负数",
+        "error_details": [{"type": "WA", "description": "line 7 overflows", "location": "line 7", "test_cases": ["1"]}],
+        "improvement_suggestions": ["检查输入"],
+        "summary": "思路正确"
+    }
+    
+    async def run():
+        await index.add(SOLUTION, "p1@r1", RESULTS, "model", "v1", stored)
+        reused, _ = await index.find(RENAMED, "p1@r1", RESULTS, "model", "v1")
+        other_scope, _ = await index.find(RENAMED, "p1@r1", RESULTS, "other", "v1")
+        unrelated, _ = await index.find(UNRELATED, "p1@r1", RESULTS, "model", "v1")
+        return reused, other_scope, unrelated
+    
+    reused, other_scope, unrelated = asyncio.run(run())
+    assert other_scope is None and unrelated is None
+    assert reused["reused_similarity"] == 1.0
+    assert reused["error_types"] == ["WA"]
+    assert "第7行" not in reused["explanation"]
+    assert reused["error_details"] == [{"type": "WA", "description": "相应位置 overflows", "test_cases": ["1"]}]
+    assert reused["summary"].startswith("思路正确")
+    assert index.stats()["by_problem"]["p1"] == {"lookups": 3, "reused": 1, "reuse_ratio": 0.3333}
+
+
+def test_adapt_keeps_the_stored_result_unchanged():
+    stored = {"error_details": [{"type": "WA", "location": "line 3"}], "summary": "s"}
+    SimilarityIndex.adapt(stored, 0.95)
+    assert stored == {"error_details": [{"type": "WA", "location": "line 3"}], "summary": "s"}
+
+
+def test_problem_stats_are_bounded(monkeypatch):
+    monkeypatch.setattr(SimilarityIndex, "MAX_TRACKED_PROBLEMS", 3)
+    index = make_index()
+    for problem in ("a", "b", "c", "a", "d"):
+        index._problem_stats(f"{problem}@r1")["lookups"] += 1
+    assert list(index._by_problem) == ["c", "a", "d"]
+    assert index._by_problem["a"]["lookups"] == 2
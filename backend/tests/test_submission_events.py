@@ -0,0 +1,52 @@
+import asyncio
+
+from app.judge.submission_events import SubmissionEventBroker
+from app.models.submission import JudgeStatus
+
+
+def drain(queue):
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+def test_full_queue_coalesces_to_latest_status_and_progress():
+    async def scenario():
+        broker = SubmissionEventBroker(poll_interval=60, queue_size=4)
+        broker.publish_status("s1", JudgeStatus.JUDGING)
+        queue = broker.subscribe("s1")
+        
+        for completed in range(1, 11):
+            broker.publish_progress("s1", {"completed": completed, "total": 10})
+        broker.publish_status("s1", JudgeStatus.ACCEPTED, time_used=12)
+        
+        events = drain(queue)
+        broker.unsubscribe("s1", queue)
+        return events
+    
+    events = asyncio.run(scenario())
+    assert len(events) <= 4
+    assert events[-2:] == [
+        ("progress", {"completed": 10, "total": 10}),
+        ("status", {"status": JudgeStatus.ACCEPTED, "time_used": 12})
+    ]
+
+
+def test_queue_below_capacity_keeps_every_event():
+    async def scenario():
+        broker = SubmissionEventBroker(poll_interval=60, queue_size=8)
+        broker.publish_status("s1", JudgeStatus.JUDGING)
+        queue = broker.subscribe("s1")
+        broker.publish_progress("s1", {"completed": 1, "total": 2})
+        broker.publish_progress("s1", {"completed": 2, "total": 2})
+        
+        events = drain(queue)
+        broker.unsubscribe("s1", queue)
+        return events
+    
+    assert asyncio.run(scenario()) == [
+        ("status", {"status": JudgeStatus.JUDGING}),
+        ("progress", {"completed": 1, "total": 2}),
+        ("progress", {"completed": 2, "total": 2})
+    ]
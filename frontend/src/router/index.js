@@ -30,6 +30,12 @@ const routes = [
     component: () => import('../views/SubmissionDetailView.vue'),
     meta: { requiresAuth: true }
   },
+  {
+    path: '/leaderboard',
+    name: 'leaderboard',
+    component: () => import('../views/LeaderboardView.vue'),
+    meta: { requiresAuth: true }
+  },
   {
     path: '/login',
     name: 'login',
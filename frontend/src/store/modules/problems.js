@@ -45,11 +45,6 @@ const actions = {
     try {
       const response = await api.get(`/problems/${id}`)
       
-      // 确保test_cases是数组
-      if (!response.data.test_cases) {
-        response.data.test_cases = [];
-      }
-      
       commit('SET_CURRENT_PROBLEM', response.data)
       commit('SET_LOADING', false, { root: true })
       return response.data
@@ -60,6 +55,17 @@ const actions = {
     }
   },
   
+  async fetchProblemTestData({ commit }, id) {
+    // 测试数据和特判代码只对管理员开放，不放入题目详情
+    try {
+      const response = await api.get(`/problems/${id}/test-data`)
+      return response.data
+    } catch (error) {
+      commit('SET_ERROR', error.response?.data?.detail || '获取测试数据失败', { root: true })
+      return null
+    }
+  },
+  
   async createProblem({ commit }, problemData) {
     commit('SET_LOADING', true, { root: true })
     try {
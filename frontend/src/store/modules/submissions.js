@@ -1,25 +1,95 @@
 import api from '@/services/api'
 
+// Aborts the open AI evaluation stream, if any
+let llmStreamController = null
+// Aborts the open submission status stream, if any
+let statusStreamController = null
+
+// Parse one server-sent event block into { event, data }
+const parseSSEEvent = (block) => {
+  let event = 'message'
+  const dataLines = []
+  
+  block.split('\n').forEach(line => {
+    if (line.startsWith('event:')) {
+      event = line.slice(6).trim()
+    } else if (line.startsWith('data:')) {
+      dataLines.push(line.slice(5).trim())
+    }
+  })
+  
+  if (!dataLines.length) {
+    return null
+  }
+  return { event, data: JSON.parse(dataLines.join('\n')) }
+}
+
+// Read a server-sent events stream and call onEvent for every event.
+// EventSource cannot send the Authorization header, so the stream is read with fetch
+const readEventStream = async (url, signal, onEvent) => {
+  const response = await fetch(url, {
+    headers: {
+      'Accept': 'text/event-stream',
+      'Authorization': `Bearer ${localStorage.getItem('token')}`
+    },
+    signal
+  })
+  if (!response.ok) {
+    throw new Error(`HTTP ${response.status}`)
+  }
+  
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) {
+      break
+    }
+    
+    buffer += decoder.decode(value, { stream: true })
+    const blocks = buffer.split('\n\n')
+    buffer = blocks.pop()
+    
+    for (const block of blocks) {
+      const message = parseSSEEvent(block)
+      if (message) {  // skip keep-alive comments
+        onEvent(message)
+      }
+    }
+  }
+}
+
 // Initial state
 const state = {
   submissions: [],
   currentSubmission: null,
-  totalSubmissions: 0
+  totalSubmissions: 0,
+  // Continuation token of the next page, null on the last page
+  nextCursor: null,
+  // Partial AI evaluation streamed while it is being generated
+  llmStream: null
 }
 
 // Getters
 const getters = {
   allSubmissions: state => state.submissions,
   currentSubmission: state => state.currentSubmission,
-  totalSubmissions: state => state.totalSubmissions
+  totalSubmissions: state => state.totalSubmissions,
+  nextCursor: state => state.nextCursor,
+  llmStream: state => state.llmStream
 }
 
 // Actions
 const actions = {
-  async fetchSubmissions({ commit }, { skip = 0, limit = 20, problemId = null, status = null }) {
+  async fetchSubmissions({ commit, state }, { skip = 0, limit = 20, problemId = null, status = null, cursor = null }) {
     commit('SET_LOADING', true, { root: true })
     try {
-      let url = `/submissions?skip=${skip}&limit=${limit}`
+      // 有游标时按游标翻页，不受页数深度影响
+      let url = cursor
+        ? `/submissions?cursor=${encodeURIComponent(cursor)}&limit=${limit}`
+        : `/submissions?skip=${skip}&limit=${limit}`
       
       if (problemId) {
         url += `&problem_id=${problemId}`
@@ -34,18 +104,22 @@ const actions = {
       // 确保接收到的提交记录数组不为空
       if (response.data && response.data.length > 0) {
         commit('SET_SUBMISSIONS', response.data)
+        commit('SET_NEXT_CURSOR', response.headers['x-next-cursor'] || null)
       } else {
         // 尝试再次获取所有提交记录，不用相同的筛选条件
         if (problemId) {
           const retryResponse = await api.get(`/submissions?skip=${skip}&limit=${limit}`)
           commit('SET_SUBMISSIONS', retryResponse.data)
+          commit('SET_NEXT_CURSOR', retryResponse.headers['x-next-cursor'] || null)
         }
       }
       
       commit('SET_LOADING', false, { root: true })
+      return state.nextCursor
     } catch (error) {
       commit('SET_LOADING', false, { root: true })
       commit('SET_ERROR', error.response?.data?.detail || 'Failed to fetch submissions', { root: true })
+      return null
     }
   },
   
@@ -80,36 +154,108 @@ const actions = {
     }
   },
   
-  async pollSubmissionStatus({ commit, dispatch }, id) {
-    const pollInterval = 2000 // 2 seconds
-    let attempts = 0
-    const maxAttempts = 30 // 1 minute max
+  async watchSubmissionStatus({ commit, dispatch }, id) {
+    // Judging progress is pushed by the server; resolves with the submission once judged
+    dispatch('stopStatusStream')
+    const controller = new AbortController()
+    statusStreamController = controller
+    let judged = false
     
-    const poll = async () => {
-      try {
-        const response = await api.get(`/submissions/${id}`)
-        const submission = response.data
-        
-        commit('SET_CURRENT_SUBMISSION', submission)
-        
-        // If still judging, continue polling
-        if (submission.status === 'pending' || submission.status === 'judging') {
-          if (attempts < maxAttempts) {
-            attempts++
-            setTimeout(poll, pollInterval)
-          } else {
-            commit('SET_ERROR', 'Judging is taking longer than expected', { root: true })
-          }
+    try {
+      await readEventStream(`/api/v1/submissions/${id}/events`, controller.signal, (message) => {
+        if (message.event === 'status') {
+          commit('SET_SUBMISSION_STATUS', { id, ...message.data })
+          judged = message.data.status !== 'pending' && message.data.status !== 'judging'
+        } else if (message.event === 'progress') {
+          commit('SET_SUBMISSION_STATUS', { id, progress: message.data })
         }
-        
-        return submission
-      } catch (error) {
-        commit('SET_ERROR', error.response?.data?.detail || 'Failed to get submission status', { root: true })
+      })
+    } catch (error) {
+      if (error.name === 'AbortError') {
         return null
       }
+      console.error('Submission status stream failed', error)
+      judged = true  // fall back to whatever is stored
+    } finally {
+      if (statusStreamController === controller) {
+        statusStreamController = null
+      }
+    }
+    
+    if (!judged) {
+      return null
+    }
+    
+    // One fetch for the per-test results; the AI evaluation is streamed once the verdict is known
+    const submission = await dispatch('fetchSubmission', id)
+    if (submission && (submission.llm_evaluation_status === 'pending' || submission.llm_evaluation_status === 'running')) {
+      dispatch('streamLLMEvaluation', id)
+    }
+    return submission
+  },
+  
+  stopStatusStream() {
+    if (statusStreamController) {
+      statusStreamController.abort()
+      statusStreamController = null
     }
+  },
+  
+  async streamLLMEvaluation({ commit, dispatch }, id) {
+    dispatch('stopLLMStream')
+    const controller = new AbortController()
+    llmStreamController = controller
+    commit('START_LLM_STREAM', id)
     
-    return poll()
+    try {
+      await readEventStream(`/api/v1/submissions/${id}/llm-stream`, controller.signal, (message) => {
+        if (message.event === 'step') {
+          commit('SET_LLM_STREAM_STEP', message.data.step)
+        } else if (message.event === 'token') {
+          commit('APPEND_LLM_STREAM_TEXT', message.data.text)
+        } else if (message.event === 'section') {
+          commit('SET_LLM_STREAM_SECTION', message.data)
+        } else if (message.event === 'result') {
+          commit('FINISH_LLM_STREAM', { id, ...message.data })
+        }
+      })
+    } catch (error) {
+      if (error.name !== 'AbortError') {
+        // Fall back to fetching the stored evaluation
+        console.error('AI evaluation stream failed', error)
+        commit('CLEAR_LLM_STREAM')
+        dispatch('fetchSubmission', id)
+      }
+    } finally {
+      if (llmStreamController === controller) {
+        llmStreamController = null
+      }
+    }
+  },
+  
+  async requestLLMEvaluation({ commit, dispatch }, id) {
+    // Start an evaluation deferred until the submission is viewed, then stream it
+    try {
+      const response = await api.post(`/submissions/${id}/llm-evaluation`)
+      const status = response.data.llm_evaluation_status
+      commit('SET_LLM_EVALUATION_STATUS', { id, status })
+      
+      if (status === 'pending' || status === 'running') {
+        dispatch('streamLLMEvaluation', id)
+      }
+      return status
+    } catch (error) {
+      commit('SET_ERROR', error.response?.data?.detail || 'Failed to request AI evaluation', { root: true })
+      return null
+    }
+  },
+  
+  stopLLMStream({ commit }) {
+    if (llmStreamController) {
+      llmStreamController.abort()
+      llmStreamController = null
+    }
+    commit('CLEAR_LLM_STREAM')
   }
 }
 
@@ -119,11 +265,53 @@ const mutations = {
     state.submissions = submissions
     state.totalSubmissions = submissions.length
   },
+  SET_NEXT_CURSOR(state, cursor) {
+    state.nextCursor = cursor
+  },
   SET_CURRENT_SUBMISSION(state, submission) {
     state.currentSubmission = submission
   },
   CLEAR_CURRENT_SUBMISSION(state) {
     state.currentSubmission = null
+  },
+  SET_SUBMISSION_STATUS(state, { id, ...fields }) {
+    if (state.currentSubmission && state.currentSubmission.id === id) {
+      state.currentSubmission = { ...state.currentSubmission, ...fields }
+    }
+  },
+  SET_LLM_EVALUATION_STATUS(state, { id, status }) {
+    if (state.currentSubmission && state.currentSubmission.id === id) {
+      state.currentSubmission = { ...state.currentSubmission, llm_evaluation_status: status }
+    }
+  },
+  START_LLM_STREAM(state, submissionId) {
+    state.llmStream = { submissionId, step: null, text: '', sections: {} }
+  },
+  SET_LLM_STREAM_STEP(state, step) {
+    if (state.llmStream) {
+      // A step (re)starts from scratch, e.g. after a retry
+      state.llmStream.step = step
+      state.llmStream.text = ''
+    }
+  },
+  APPEND_LLM_STREAM_TEXT(state, text) {
+    if (state.llmStream) {
+      state.llmStream.text += text
+    }
+  },
+  SET_LLM_STREAM_SECTION(state, { step, data }) {
+    if (state.llmStream) {
+      state.llmStream.sections = { ...state.llmStream.sections, [step]: data }
+    }
+  },
+  FINISH_LLM_STREAM(state, { id, llm_evaluation_status, llm_evaluation }) {
+    if (state.currentSubmission && state.currentSubmission.id === id) {
+      state.currentSubmission = { ...state.currentSubmission, llm_evaluation_status, llm_evaluation }
+    }
+    state.llmStream = null
+  },
+  CLEAR_LLM_STREAM(state) {
+    state.llmStream = null
   }
 }
 